@@ -1,14 +1,22 @@
 from django.contrib import admin
-from .models import Application
+from .models import Application, DistributionRound, HouseholdCluster, HouseholdClusterMember, QueuedSubmission
+
+
+@admin.register(DistributionRound)
+class DistributionRoundAdmin(admin.ModelAdmin):
+    list_display = ['name', 'opens_on', 'closes_on', 'status', 'restriction_days', 'one_application_per_phone']
+    list_filter = ['status']
+    # Closing goes through close_round, which also archives
+    readonly_fields = ['status', 'closed_at', 'archived_at', 'created_at', 'updated_at']
 
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = [
         'reference_number', 'get_full_name', 'phone', 'selected_package', 
-        'status', 'created_at'
+        'status', 'round', 'created_at'
     ]
-    list_filter = ['status', 'selected_package', 'employment_status', 'created_at']
+    list_filter = ['round', 'status', 'selected_package', 'employment_status', 'created_at']
     search_fields = ['reference_number', 'first_name', 'last_name', 'phone', 'email']
     readonly_fields = ['reference_number', 'created_at', 'updated_at']
     fieldsets = [
@@ -27,10 +35,30 @@ class ApplicationAdmin(admin.ModelAdmin):
                       'transportation_help', 'delivery_request']
         }),
         ('Status', {
-            'fields': ['status', 'reviewed_by', 'reviewed_at', 'review_notes']
+            'fields': ['round', 'status', 'reviewed_by', 'reviewed_at', 'review_notes']
         }),
         ('System Info', {
             'fields': ['created_at', 'updated_at'],
             'classes': ['collapse']
         })
     ]
+
+
+class HouseholdClusterMemberInline(admin.TabularInline):
+    model = HouseholdClusterMember
+    raw_id_fields = ['application']
+    extra = 0
+
+
+@admin.register(HouseholdCluster)
+class HouseholdClusterAdmin(admin.ModelAdmin):
+    list_display = ['id', 'member_count', 'best_score', 'updated_at']
+    inlines = [HouseholdClusterMemberInline]
+
+
+@admin.register(QueuedSubmission)
+class QueuedSubmissionAdmin(admin.ModelAdmin):
+    """Submissions still in the write-behind queue, and any the drain could not insert"""
+    list_display = ['reference_number', 'phone', 'received_at', 'error']
+    search_fields = ['reference_number', 'phone']
+    readonly_fields = ['reference_number', 'phone', 'payload', 'received_at', 'error']
@@ -0,0 +1,60 @@
+"""Async versions of the public application endpoints (see core.async_api)"""
+from asgiref.sync import sync_to_async
+
+from core.async_api import json_response, public_api
+from core.config import aget_setting
+from core.throttling import PUBLIC_THROTTLES
+from pickups.models import Pickup
+
+from . import submission_queue
+from .models import Application, outside_archived_rounds
+from .views import (
+    PHONE_NOT_FOUND, application_status, archived_application, archived_status, can_user_apply,
+    invalid_status_lookup, queued_status, reference_not_found,
+)
+
+
+@public_api(['POST'], PUBLIC_THROTTLES)
+async def check_application_status(request):
+    """Check application status by phone number OR reference number - anonymous endpoint"""
+    phone_number = request.data.get('phone', '').strip()
+    reference_number = request.data.get('reference', '').strip()
+    
+    invalid = invalid_status_lookup(phone_number, reference_number)
+    if invalid:
+        return json_response(invalid, status=400)
+    
+    queue_enabled = await aget_setting('ASYNC_SUBMISSIONS', False)
+    if reference_number:
+        recent_application = await Application.objects.filter(reference_number=reference_number).afirst()
+        if not recent_application:
+            queued = queue_enabled and await sync_to_async(submission_queue.find_queued)(reference_number=reference_number)
+            if queued:
+                return json_response(queued_status(queued))
+            archived = await sync_to_async(archived_application)(reference_number)
+            if archived:
+                return json_response(archived_status(archived))
+            return json_response(reference_not_found(reference_number), status=404)
+    else:
+        recent_application = await Application.objects.filter(
+            outside_archived_rounds(), phone=phone_number
+        ).order_by('-created_at').afirst()
+        
+        queued = queue_enabled and await sync_to_async(submission_queue.find_queued)(phone=phone_number)
+        if queued and (not recent_application or queued['received_at'] > recent_application.created_at.isoformat()):
+            return json_response(queued_status(queued))
+    
+    if not recent_application:
+        return json_response(PHONE_NOT_FOUND, status=404)
+    
+    can_apply, restriction_info = await sync_to_async(can_user_apply)(recent_application.phone)
+    
+    pickup = pickup_expired = None
+    if recent_application.status == 'APPROVED':
+        pickup = await Pickup.objects.filter(application_id=recent_application.id).afirst()
+        if pickup:
+            pickup_expired = pickup.expired_after(await aget_setting('QR_CODE_EXPIRY_DAYS', 7))
+    
+    return json_response(application_status(
+        recent_application, can_apply, restriction_info, pickup, pickup_expired
+    ))
@@ -0,0 +1,267 @@
+"""
+Household de-duplication across phone numbers.
+
+Every application gets blocking keys: the Soundex code of the surname
+combined with each distinctive address token, plus a name-only key.
+Only applications that share a key are scored against each other, so the
+work grows with block sizes rather than with the square of the table.
+Pairs scoring at least ``HOUSEHOLD_DEDUP['THRESHOLD']`` are merged into
+``HouseholdCluster`` rows.
+
+Keys are stored, so each run (``manage.py dedup_households``) only keys
+and scores the applications that have none yet.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Application, HouseholdBlockKey, HouseholdCluster, HouseholdClusterMember
+
+ADDRESS_ABBREVIATIONS = {
+    'st': 'street', 'str': 'street', 'rd': 'road', 'ave': 'avenue', 'cl': 'close',
+    'cres': 'crescent', 'est': 'estate', 'opp': 'opposite', 'jn': 'junction', 'jct': 'junction',
+}
+# Too common to tell households apart
+ADDRESS_STOPWORDS = {
+    'street', 'road', 'avenue', 'close', 'crescent', 'estate', 'lane', 'way', 'off', 'along',
+    'opposite', 'behind', 'beside', 'near', 'by', 'junction', 'area', 'the', 'of', 'and', 'house',
+    'flat', 'block', 'plot', 'no', 'number', 'ibadan', 'oyo', 'state', 'nigeria', 'lga', 'via',
+    'after', 'before', 'at', 'in', 'new', 'old', 'layout', 'phase',
+}
+SOUNDEX_CODES = {
+    letter: code
+    for code, letters in {'1': 'bfpv', '2': 'cgjkqsxz', '3': 'dt', '4': 'l', '5': 'mn', '6': 'r'}.items()
+    for letter in letters
+}
+ADDRESS_KEYS_PER_APPLICATION = 4
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def get_options():
+    options = {'THRESHOLD': 0.75, 'MAX_BLOCK_SIZE': 500, 'CHUNK_SIZE': 1000}
+    options.update(getattr(settings, 'HOUSEHOLD_DEDUP', {}))
+    return options
+
+
+def normalize_text(value):
+    ascii_text = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return _NON_ALNUM_RE.sub(' ', ascii_text.lower()).strip()
+
+
+def soundex(word):
+    letters = [letter for letter in normalize_text(word) if letter.isalpha()]
+    if not letters:
+        return '0000'
+    codes = []
+    previous = SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        code = SOUNDEX_CODES.get(letter)
+        if code and code != previous:
+            codes.append(code)
+        if letter not in 'hw':
+            previous = code
+    return (letters[0].upper() + ''.join(codes) + '000')[:4]
+
+
+def address_tokens(address):
+    tokens = set()
+    for token in normalize_text(address).split():
+        token = ADDRESS_ABBREVIATIONS.get(token, token)
+        if token in ADDRESS_STOPWORDS or (len(token) < 3 and not token.isdigit()):
+            continue
+        tokens.add(token)
+    return tokens
+
+
+def features(application):
+    """What scoring needs from an application values() row"""
+    surname = normalize_text(application['last_name']).split()
+    surname = surname[-1] if surname else ''
+    tokens = address_tokens(application['address'])
+    return {
+        'first_name': normalize_text(application['first_name']),
+        'surname': surname,
+        'surname_code': soundex(surname),
+        'first_name_code': soundex(application['first_name']),
+        'phone': re.sub(r'\D', '', application['phone'] or '')[-10:],
+        'address_tokens': tokens,
+        'house_numbers': {token for token in tokens if token.isdigit()},
+    }
+
+
+def blocking_keys(feature):
+    # Numbers first (they separate houses on one street), then the longest words
+    tokens = sorted(feature['address_tokens'], key=lambda token: (not token.isdigit(), -len(token), token))
+    keys = {f"a:{feature['surname_code']}:{token}"[:64] for token in tokens[:ADDRESS_KEYS_PER_APPLICATION]}
+    # Catches the same person applying from a different address
+    keys.add(f"n:{feature['surname_code']}:{feature['first_name_code']}")
+    return keys
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+def score(first, second, threshold=0.0):
+    """
+    0-1 likelihood that two applications come from the same household;
+    0 as soon as the address overlap rules out reaching ``threshold``.
+    """
+    tokens = first['address_tokens'] | second['address_tokens']
+    address = len(first['address_tokens'] & second['address_tokens']) / len(tokens) if tokens else 0.0
+    if first['house_numbers'] and second['house_numbers'] and not first['house_numbers'] & second['house_numbers']:
+        # Same street, different house
+        address *= 0.5
+    if 0.35 + 0.45 * address + 0.2 < threshold:
+        # Skip the string comparisons, by far the most expensive part
+        return 0.0
+    if first['surname'] == second['surname']:
+        surname = 1.0
+    else:
+        surname = similarity(first['surname'], second['surname'])
+        if first['surname_code'] == second['surname_code']:
+            surname = max(surname, 0.85)
+    same_person = 1.0 if first['phone'] and first['phone'] == second['phone'] else similarity(
+        first['first_name'], second['first_name']
+    )
+    return 0.35 * surname + 0.45 * address + 0.2 * same_person
+
+
+FEATURE_FIELDS = ['id', 'first_name', 'last_name', 'phone', 'address']
+
+
+def _load_features(application_ids):
+    found = {}
+    ids = list(application_ids)
+    for start in range(0, len(ids), 1000):
+        for row in Application.objects.filter(id__in=ids[start:start + 1000]).values(*FEATURE_FIELDS):
+            found[row['id']] = features(row)
+    return found
+
+
+def _link(matches):
+    """Merge matched pairs into clusters, joining or merging existing ones"""
+    best = defaultdict(float)
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second, pair_score in matches:
+        best[first] = max(best[first], pair_score)
+        best[second] = max(best[second], pair_score)
+        parent[find(first)] = find(second)
+
+    existing = {
+        member.application_id: member
+        for member in HouseholdClusterMember.objects.filter(application_id__in=list(best))
+    }
+    # Applications already clustered together stay in one component
+    for application_id, member in existing.items():
+        parent[find(application_id)] = find(('cluster', member.cluster_id))
+    components = defaultdict(list)
+    for application_id in best:
+        components[find(application_id)].append(application_id)
+
+    touched = set()
+    for application_ids in components.values():
+        cluster_ids = sorted({existing[a].cluster_id for a in application_ids if a in existing})
+        if cluster_ids:
+            target = cluster_ids[0]
+            if cluster_ids[1:]:
+                HouseholdClusterMember.objects.filter(cluster_id__in=cluster_ids[1:]).update(cluster_id=target)
+                HouseholdCluster.objects.filter(id__in=cluster_ids[1:]).delete()
+        else:
+            target = HouseholdCluster.objects.create().id
+        touched.add(target)
+        new_members = []
+        for application_id in application_ids:
+            member = existing.get(application_id)
+            if member is None:
+                new_members.append(HouseholdClusterMember(
+                    cluster_id=target, application_id=application_id, score=best[application_id]
+                ))
+            elif best[application_id] > member.score:
+                HouseholdClusterMember.objects.filter(id=member.id).update(score=best[application_id])
+        HouseholdClusterMember.objects.bulk_create(new_members)
+
+    for cluster in HouseholdCluster.objects.filter(id__in=touched).annotate(
+        count=Count('members'), top=Max('members__score')
+    ):
+        cluster.member_count = cluster.count
+        cluster.best_score = cluster.top
+        cluster.save(update_fields=['member_count', 'best_score', 'updated_at'])
+    return len(touched)
+
+
+def run(full=False, threshold=None, chunk_size=None, max_block_size=None, progress=None):
+    """Key and score every application without blocking keys; returns run statistics"""
+    options = get_options()
+    threshold = options['THRESHOLD'] if threshold is None else threshold
+    chunk_size = chunk_size or options['CHUNK_SIZE']
+    max_block_size = max_block_size or options['MAX_BLOCK_SIZE']
+    stats = {'applications': 0, 'comparisons': 0, 'matches': 0, 'clusters_touched': 0, 'oversized_blocks': 0}
+
+    if full:
+        HouseholdClusterMember.objects.all().delete()
+        HouseholdCluster.objects.all().delete()
+        HouseholdBlockKey.objects.all().delete()
+
+    while True:
+        chunk = list(
+            Application.objects.filter(household_block_keys__isnull=True)
+            .order_by('created_at').values(*FEATURE_FIELDS)[:chunk_size]
+        )
+        if not chunk:
+            return stats
+        chunk_features = {row['id']: features(row) for row in chunk}
+        chunk_keys = {application_id: blocking_keys(feature) for application_id, feature in chunk_features.items()}
+
+        with transaction.atomic():
+            HouseholdBlockKey.objects.bulk_create([
+                HouseholdBlockKey(key=key, application_id=application_id)
+                for application_id, keys in chunk_keys.items() for key in keys
+            ], ignore_conflicts=True)
+
+            blocks = defaultdict(set)
+            all_keys = set().union(*chunk_keys.values())
+            for key, application_id in HouseholdBlockKey.objects.filter(key__in=all_keys).values_list(
+                'key', 'application_id'
+            ):
+                blocks[key].add(application_id)
+            for key in [key for key, members in blocks.items() if len(members) > max_block_size]:
+                stats['oversized_blocks'] += 1
+                del blocks[key]
+
+            pairs = set()
+            for application_id, keys in chunk_keys.items():
+                for key in keys:
+                    for other_id in blocks.get(key, ()):
+                        if other_id != application_id:
+                            pairs.add(tuple(sorted((application_id, other_id), key=str)))
+
+            known = dict(chunk_features)
+            known.update(_load_features({other for pair in pairs for other in pair} - known.keys()))
+            matches = []
+            for first, second in pairs:
+                pair_score = score(known[first], known[second], threshold)
+                if pair_score >= threshold:
+                    matches.append((first, second, round(pair_score, 3)))
+            stats['clusters_touched'] += _link(matches)
+
+        stats['applications'] += len(chunk)
+        stats['comparisons'] += len(pairs)
+        stats['matches'] += len(matches)
+        if progress:
+            progress(stats)
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.models import DistributionRound
+from applications.rounds import archive_queued, close_round
+
+
+class Command(BaseCommand):
+    help = 'Close a distribution round and move its applications, pickups and notifications to cold storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('round_id', type=int, nargs='?')
+        parser.add_argument('--no-archive', action='store_true', help='Only stop the round taking applications')
+        parser.add_argument('--batch-size', type=int, help='Applications archived per transaction')
+        parser.add_argument(
+            '--queued', action='store_true',
+            help='Archive the rounds closed through the API instead of ROUND_ID'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='With --queued, keep running, checking every INTERVAL seconds (default: once and exit)'
+        )
+
+    def progress(self, moved):
+        self.stdout.write(', '.join(f'{table}: {count}' for table, count in moved.items()))
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            return self.archive_queued(options)
+        if options['round_id'] is None:
+            raise CommandError('Pass a ROUND_ID, or --queued.')
+        try:
+            distribution_round = DistributionRound.objects.get(id=options['round_id'])
+        except DistributionRound.DoesNotExist:
+            raise CommandError(f"No distribution round {options['round_id']}.")
+
+        moved = close_round(
+            distribution_round, archive=not options['no_archive'],
+            batch_size=options['batch_size'], progress=self.progress
+        )
+        total = sum(moved.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{distribution_round.name} is {distribution_round.get_status_display().lower()}; archived {total} rows.'
+        ))
+
+    def archive_queued(self, options):
+        while True:
+            for distribution_round, moved in archive_queued(options['batch_size'], progress=self.progress).items():
+                self.stdout.write(self.style.SUCCESS(
+                    f'{distribution_round.name} is archived; moved {sum(moved.values())} rows.'
+                ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,140 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from applications.models import Application, parse_household_count
+
+FIELDS = ['family_size', 'children_count', 'elderly_count']
+# The model's MaxValueValidator; larger values are clamped and reported
+MAX_COUNT = 99
+
+
+def text_columns():
+    """The household count columns that are still stored as text"""
+    table = Application._meta.db_table
+    with connection.cursor() as cursor:
+        description = connection.introspection.get_table_description(cursor, table)
+    types = {
+        column.name: connection.introspection.get_field_type(column.type_code, column)
+        for column in description
+    }
+    return [name for name in FIELDS if types.get(name) in ('CharField', 'TextField')]
+
+
+def normalize(row):
+    """Parsed counts for one row plus the fields that could not be stored as given (unparseable or over 99)"""
+    parsed = {name: parse_household_count(row[name]) for name in FIELDS}
+    for name in ('children_count', 'elderly_count'):
+        # Left blank means none
+        if parsed[name] is None and not str(row[name] or '').strip():
+            parsed[name] = 0
+    rejected = [name for name in FIELDS if parsed[name] is None or parsed[name] > MAX_COUNT]
+    for name in FIELDS:
+        if parsed[name] is not None:
+            parsed[name] = min(parsed[name], MAX_COUNT)
+    for name in ('children_count', 'elderly_count'):
+        if parsed[name] is None:
+            parsed[name] = 0
+    if parsed['family_size'] is None or parsed['family_size'] < 1:
+        if 'family_size' not in rejected:
+            rejected.append('family_size')
+        # At least the applicant plus the dependants they did tell us about
+        parsed['family_size'] = min(MAX_COUNT, max(1, parsed['children_count'] + parsed['elderly_count']))
+    return parsed, rejected
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert Application.family_size, children_count and elderly_count from text to '
+        'integer columns, normalizing existing rows in chunks and reporting unparseable or out-of-range ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per transaction (default: 5000)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+        parser.add_argument('--report', help='Write unparseable and out-of-range rows to this CSV file')
+
+    def handle(self, *args, **options):
+        columns = text_columns()
+        if not columns:
+            self.stdout.write(self.style.SUCCESS('Household counts are already integer columns.'))
+            return
+
+        problems = []
+        scanned = updated = 0
+        for chunk in self.chunks(options['chunk_size']):
+            changes = []
+            for row in chunk:
+                parsed, rejected = normalize(row)
+                for name in rejected:
+                    problems.append([row['id'], row['reference_number'], name, row[name], parsed[name]])
+                if any(str(row[name]) != str(parsed[name]) for name in FIELDS):
+                    changes.append([str(parsed[name]) for name in FIELDS] + [row['id']])
+            scanned += len(chunk)
+            updated += len(changes)
+            if changes and not options['dry_run']:
+                self.write_chunk(changes)
+            self.stdout.write(f'Scanned {scanned} rows, {updated} normalized...')
+
+        self.report(problems, options['report'])
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {updated} of {scanned} rows would be normalized; no changes written.')
+            return
+
+        with connection.schema_editor() as editor:
+            for name in columns:
+                old_field = models.CharField(max_length=10)
+                old_field.set_attributes_from_name(name)
+                old_field.model = Application
+                editor.alter_field(Application, old_field, Application._meta.get_field(name))
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {', '.join(columns)} to integers ({updated} of {scanned} rows normalized)."
+        ))
+
+    def chunks(self, size):
+        """Raw column values in primary key order, ``size`` rows at a time"""
+        qn = connection.ops.quote_name
+        select = (
+            f"SELECT {qn('id')}, {qn('reference_number')}, {', '.join(qn(name) for name in FIELDS)} "
+            f"FROM {qn(Application._meta.db_table)}"
+        )
+        names = ['id', 'reference_number'] + FIELDS
+        last_id = None
+        while True:
+            with connection.cursor() as cursor:
+                if last_id is None:
+                    cursor.execute(f"{select} ORDER BY {qn('id')} LIMIT %s", [size])
+                else:
+                    cursor.execute(f"{select} WHERE {qn('id')} > %s ORDER BY {qn('id')} LIMIT %s", [last_id, size])
+                rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]['id']
+
+    def write_chunk(self, changes):
+        qn = connection.ops.quote_name
+        assignments = ', '.join(f'{qn(name)} = %s' for name in FIELDS)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {qn(Application._meta.db_table)} SET {assignments} WHERE {qn('id')} = %s", changes
+            )
+
+    def report(self, problems, path):
+        if not problems:
+            self.stdout.write('Every row parsed cleanly.')
+            return
+        self.stdout.write(self.style.WARNING(
+            f'{len(problems)} unparseable or out-of-range values (stored value shown):'
+        ))
+        for application_id, reference, name, raw, stored in problems[:20]:
+            self.stdout.write(f'  {reference or application_id}: {name}={raw!r} -> {stored}')
+        if len(problems) > 20:
+            self.stdout.write(f'  ... and {len(problems) - 20} more')
+        if path:
+            with open(path, 'w', newline='') as report:
+                writer = csv.writer(report)
+                writer.writerow(['id', 'reference_number', 'field', 'raw_value', 'stored_value'])
+                writer.writerows(problems)
+            self.stdout.write(f'Full list written to {path}')
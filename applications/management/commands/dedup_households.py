@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from applications import dedup
+
+
+class Command(BaseCommand):
+    help = (
+        'Flag applications that look like the same household across phone numbers. '
+        'Only applications not seen by an earlier run are processed unless --full is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Drop all keys and clusters and start over')
+        parser.add_argument('--threshold', type=float, help='Match score needed to cluster (default: setting)')
+        parser.add_argument('--chunk-size', type=int, help='Applications per batch (default: setting)')
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(
+                f"{stats['applications']} applications, {stats['comparisons']} comparisons, "
+                f"{stats['matches']} matches..."
+            )
+
+        stats = dedup.run(
+            full=options['full'],
+            threshold=options['threshold'],
+            chunk_size=options['chunk_size'],
+            progress=progress,
+        )
+        if stats['oversized_blocks']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {stats['oversized_blocks']} blocks larger than MAX_BLOCK_SIZE"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['applications']} applications: {stats['matches']} matches, "
+            f"{stats['clusters_touched']} household clusters created or updated."
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications import submission_queue
+
+
+class Command(BaseCommand):
+    help = 'Insert queued application submissions in batches (write-behind mode)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, draining every INTERVAL seconds (default: drain once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            started = time.perf_counter()
+            inserted, rejected, failed = submission_queue.drain()
+            if inserted or failed or not interval:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Inserted {inserted} applications ({rejected} rejected by the '
+                        f'restriction rules) in {elapsed:.2f}s'
+                    )
+                )
+            if failed:
+                self.stderr.write(self.style.ERROR(
+                    f'{failed} queued submissions could not be inserted; see the QueuedSubmission '
+                    'rows with an error in the admin (their applicants are told to resubmit)'
+                ))
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from applications.models import Application
+from packages.models import Package
+
+
+class Command(BaseCommand):
+    help = (
+        'Add the Application.package foreign key if the column is missing and backfill it '
+        'from selected_package, in chunks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per UPDATE (default: 5000)')
+
+    def handle(self, *args, **options):
+        field = Application._meta.get_field('package')
+        with connection.cursor() as cursor:
+            columns = [
+                column.name for column in
+                connection.introspection.get_table_description(cursor, Application._meta.db_table)
+            ]
+        if field.column not in columns:
+            with connection.schema_editor() as editor:
+                editor.add_field(Application, field)
+            self.stdout.write(f'Added {Application._meta.db_table}.{field.column}.')
+
+        linked = 0
+        for package_id, package_type in Package.objects.values_list('id', 'package_type'):
+            unlinked = Application.objects.filter(package__isnull=True, selected_package=package_type)
+            while True:
+                ids = list(unlinked.values_list('id', flat=True)[:options['chunk_size']])
+                if not ids:
+                    break
+                linked += Application.objects.filter(id__in=ids).update(package_id=package_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Linked {linked} applications to their package.'))
+        orphans = (
+            Application.objects.filter(package__isnull=True)
+            .values('selected_package').annotate(count=Count('id')).order_by('-count')
+        )
+        for row in orphans:
+            self.stdout.write(self.style.WARNING(
+                f"{row['count']} applications reference unknown package '{row['selected_package']}'"
+            ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from applications.models import Application
+from applications.priority import score_expression
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute every priority_score with the current PRIORITY_SCORING weights in a single '
+        'UPDATE, adding the column and its index first if they are missing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', help='Only rescore applications with this status')
+
+    def handle(self, *args, **options):
+        table = Application._meta.db_table
+        field = Application._meta.get_field('priority_score')
+        index = next(index for index in Application._meta.indexes if index.name == 'application_round_priority_idx')
+        with connection.cursor() as cursor:
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        if field.column not in columns:
+            with connection.schema_editor() as editor:
+                editor.add_field(Application, field)
+            self.stdout.write(f'Added {table}.{field.column}.')
+        # Checked after add_field, which rebuilds the table with its indexes on SQLite
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        if Application._meta.get_field('round').column not in columns:
+            self.stdout.write('Run setup_distribution_rounds to add the round column and the priority index.')
+        elif index.name not in constraints:
+            with connection.schema_editor() as editor:
+                editor.add_index(Application, index)
+            self.stdout.write(f'Added index {index.name}.')
+
+        queryset = Application.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        updated = queryset.update(priority_score=score_expression())
+        self.stdout.write(self.style.SUCCESS(f'Rescored {updated} applications.'))
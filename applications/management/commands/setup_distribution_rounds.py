@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from django.utils import timezone
+
+from applications.models import Application, DistributionRound
+from pickups.models import Pickup
+
+# Global indexes replaced by the round-scoped ones, by table
+REPLACED_INDEXES = {
+    Application: [
+        models.Index(fields=['status', 'created_at']),
+        models.Index(fields=['phone']),
+        models.Index(fields=['status', '-priority_score', 'created_at'], name='application_priority_idx'),
+    ],
+    Pickup: [
+        models.Index(fields=['status']),
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Add the distribution round columns and round-scoped indexes on databases created before rounds '
+        'existed, dropping the global indexes they replace, and optionally file existing rows under a round'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--legacy-round',
+            help='Name of a closed round to create for applications and pickups that have no round yet'
+        )
+
+    def handle(self, *args, **options):
+        for model, replaced in REPLACED_INDEXES.items():
+            self.add_round_column(model)
+            self.replace_indexes(model, replaced)
+
+        if options['legacy_round']:
+            today = timezone.localdate()
+            first = Application.objects.filter(round__isnull=True).order_by('created_at').first()
+            distribution_round, created = DistributionRound.objects.get_or_create(
+                name=options['legacy_round'],
+                defaults={
+                    'opens_on': timezone.localdate(first.created_at) if first else today,
+                    'closes_on': today,
+                    'status': 'CLOSED',
+                    'closed_at': timezone.now(),
+                }
+            )
+            applications = Application.objects.filter(round__isnull=True).update(round=distribution_round)
+            pickups = Pickup.objects.filter(round__isnull=True).update(
+                round=models.Subquery(
+                    Application.objects.filter(id=models.OuterRef('application_id')).values('round')[:1]
+                )
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Created' if created else 'Using'} round {distribution_round.name}: "
+                f'filed {applications} applications and {pickups} pickups.'
+            ))
+
+    def add_round_column(self, model):
+        field = model._meta.get_field('round')
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        if field.column not in columns:
+            with connection.schema_editor() as editor:
+                editor.add_field(model, field)
+            self.stdout.write(f'Added {table}.{field.column}.')
+
+    def replace_indexes(self, model, replaced):
+        # Checked after add_field, which rebuilds the table with its indexes on SQLite
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        for index in model._meta.indexes:
+            index_columns = [model._meta.get_field(name.lstrip('-')).column for name in index.fields]
+            if index.name in constraints or not set(index_columns) <= set(columns):
+                continue
+            with connection.schema_editor() as editor:
+                editor.add_index(model, index)
+            self.stdout.write(f'Added index {index.name}.')
+        for index in replaced:
+            if not index.name:
+                index.set_name_with_model(model)
+            if index.name in constraints:
+                with connection.schema_editor() as editor:
+                    editor.remove_index(model, index)
+                self.stdout.write(f'Dropped index {index.name}.')
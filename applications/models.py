@@ -1,9 +1,118 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
+from core import version_stamps
+from core.config import get_setting
 from core.models import TimeStampedModel, ConfigurationSettings
+import re
 import uuid
 
+HOUSEHOLD_COUNT_RE = re.compile(r'^\s*(\d{1,3})\s*\+?\s*$')
+
+
+def parse_household_count(value):
+    """Household counts as the form sends them ('4', '10+') to an int, or None"""
+    if isinstance(value, int):
+        return value
+    match = HOUSEHOLD_COUNT_RE.match(str(value or ''))
+    return int(match.group(1)) if match else None
+
+
+CURRENT_ROUND_KEY = 'distribution_round:current'
+# Bumped on every round change, so each worker's cached current round follows within seconds
+ROUNDS_STAMP = 'distribution_rounds'
+
+
+def _rounds_check_seconds():
+    return getattr(settings, 'DISTRIBUTION_ROUNDS', {}).get('VERSION_CHECK_SECONDS', 5)
+
+
+class DistributionRound(TimeStampedModel):
+    """
+    One distribution cycle. Applications and pickups belong to a round, the
+    working set is the current round, and closed rounds move to cold storage.
+    """
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('CLOSED', 'Closed'),
+        # Closed, and waiting for `close_round --queued` to archive it
+        ('ARCHIVING', 'Archiving'),
+        ('ARCHIVED', 'Archived'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    opens_on = models.DateField()
+    closes_on = models.DateField(null=True, blank=True, help_text='Last day applications are accepted')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    
+    # Eligibility rules within the round
+    restriction_days = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text='Overrides APPLICATION_RESTRICTION_DAYS within this round'
+    )
+    one_application_per_phone = models.BooleanField(
+        default=False, help_text='Each phone number may apply once per round, whatever the outcome'
+    )
+    
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Distribution Round'
+        verbose_name_plural = 'Distribution Rounds'
+        ordering = ['-opens_on']
+    
+    def __str__(self):
+        return self.name
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(lambda: version_stamps.bump(ROUNDS_STAMP))
+    
+    @classmethod
+    def current(cls):
+        """
+        The latest round not yet archived, which scopes eligibility, status
+        checks and supervisor views; None until rounds are in use
+        """
+        key = f'{CURRENT_ROUND_KEY}:{version_stamps.get(ROUNDS_STAMP, _rounds_check_seconds())}'
+        cached = cache.get(key)
+        if cached is None:
+            cached = cls.objects.exclude(status='ARCHIVED').order_by('-opens_on', '-id').first() or False
+            cache.set(key, cached, 60)
+        return cached or None
+    
+    @classmethod
+    async def acurrent(cls):
+        key = f'{CURRENT_ROUND_KEY}:{await version_stamps.aget(ROUNDS_STAMP, _rounds_check_seconds())}'
+        cached = await cache.aget(key)
+        if cached is None:
+            cached = await cls.objects.exclude(status='ARCHIVED').order_by('-opens_on', '-id').afirst() or False
+            await cache.aset(key, cached, 60)
+        return cached or None
+    
+    @property
+    def is_accepting_applications(self):
+        today = timezone.localdate()
+        return (
+            self.status == 'OPEN' and self.opens_on <= today
+            and (self.closes_on is None or today <= self.closes_on)
+        )
+
+
+def round_filter(distribution_round, prefix=''):
+    """Filter kwargs selecting the rows of a round (rows from before rounds when None)"""
+    if distribution_round is None:
+        return {f'{prefix}round__isnull': True}
+    return {f'{prefix}round': distribution_round}
+
+
+def outside_archived_rounds(prefix=''):
+    """Q selecting the rows still in the live tables: open and closed rounds, and rows from before rounds"""
+    return models.Q(**{f'{prefix}round__isnull': True}) | ~models.Q(**{f'{prefix}round__status': 'ARCHIVED'})
+
 
 class Application(TimeStampedModel):
     STATUS_CHOICES = [
@@ -17,6 +126,14 @@ class Application(TimeStampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     reference_number = models.CharField(max_length=20, unique=True, blank=True)
     
+    round = models.ForeignKey(
+        DistributionRound,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='applications'
+    )
+    
     # Step 1: Personal Information
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -25,9 +142,10 @@ class Application(TimeStampedModel):
     address = models.TextField()
     
     # Step 2: Family Details
-    family_size = models.CharField(max_length=10)
-    children_count = models.CharField(max_length=10, default='0')
-    elderly_count = models.CharField(max_length=10, default='0')
+    # The form's top options ('10+', '5+', '3+') are stored as their lower bound
+    family_size = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(99)])
+    children_count = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(99)])
+    elderly_count = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(99)])
     employment_status = models.CharField(max_length=50)
     special_needs = models.TextField(blank=True)
     tec_member = models.CharField(
@@ -37,7 +155,14 @@ class Application(TimeStampedModel):
     )
     
     # Step 3: Package Selection
-    selected_package = models.CharField(max_length=50)
+    selected_package = models.CharField(max_length=50)  # package_type slug, kept for API compatibility
+    package = models.ForeignKey(
+        'packages.Package',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='applications'
+    )
     package_flexibility = models.BooleanField(default=False)
     
     # Step 4: Pickup Schedule
@@ -63,14 +188,24 @@ class Application(TimeStampedModel):
     reviewed_at = models.DateTimeField(null=True, blank=True)
     review_notes = models.TextField(blank=True)
     
+    # Need priority, see applications.priority; recomputed on every save
+    priority_score = models.IntegerField(default=0)
+    
     class Meta:
         verbose_name = 'Application'
         verbose_name_plural = 'Applications'
         ordering = ['-created_at']
+        # Scoped to the round: closed rounds leave these indexes when they are archived
         indexes = [
-            models.Index(fields=['status', 'created_at']),
-            models.Index(fields=['phone']),
+            models.Index(fields=['round', 'status', 'created_at'], name='application_round_status_idx'),
+            models.Index(fields=['round', 'phone', 'created_at'], name='application_round_phone_idx'),
             models.Index(fields=['reference_number']),
+            # Eligibility and phone status lookups span every live round
+            models.Index(fields=['phone', 'created_at'], name='application_phone_idx'),
+            # Serves the ?order=priority review queue
+            models.Index(
+                fields=['round', 'status', '-priority_score', 'created_at'], name='application_round_priority_idx'
+            ),
         ]
     
     def __str__(self):
@@ -82,6 +217,17 @@ class Application(TimeStampedModel):
     def save(self, *args, **kwargs):
         if not self.reference_number:
             self.reference_number = self.generate_reference_number()
+            # Never one already handed out to a queued submission; the queue is
+            # drained empty before it is switched off, so only check while it is on
+            for _ in range(10 if get_setting('ASYNC_SUBMISSIONS', False) else 0):
+                if not QueuedSubmission.objects.filter(reference_number=self.reference_number).exists():
+                    break
+                self.reference_number = self.generate_reference_number()
+        from .priority import score
+        self.priority_score = score(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority_score' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'priority_score']
         super().save(*args, **kwargs)
     
     def generate_reference_number(self):
@@ -90,3 +236,55 @@ class Application(TimeStampedModel):
         timestamp = timezone.now().strftime('%y%m')
         random_part = get_random_string(4, '0123456789')
         return f"{prefix}{timestamp}{random_part}"
+
+
+class HouseholdCluster(TimeStampedModel):
+    """Applications the dedup job believes come from one household"""
+    member_count = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField(default=0)
+    
+    class Meta:
+        verbose_name = 'Household Cluster'
+        verbose_name_plural = 'Household Clusters'
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"Household cluster {self.pk} ({self.member_count} applications)"
+
+
+class HouseholdClusterMember(models.Model):
+    cluster = models.ForeignKey(HouseholdCluster, on_delete=models.CASCADE, related_name='members')
+    application = models.OneToOneField(Application, on_delete=models.CASCADE, related_name='household_membership')
+    score = models.FloatField(help_text='Best match score against another member')
+    
+    def __str__(self):
+        return f"{self.application} in cluster {self.cluster_id}"
+
+
+class HouseholdBlockKey(models.Model):
+    """Blocking keys per application; only applications sharing a key are compared"""
+    key = models.CharField(max_length=64, db_index=True)
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='household_block_keys')
+    
+    class Meta:
+        unique_together = ['key', 'application']
+    
+    def __str__(self):
+        return self.key
+
+
+class QueuedSubmission(models.Model):
+    """
+    A submission accepted into the write-behind queue (applications.submission_queue);
+    these rows are the queue. The unique reference number is reserved with the row,
+    which answers status lookups until drain_submissions inserts the application and
+    deletes it, or records why it could not.
+    """
+    reference_number = models.CharField(max_length=20, unique=True)
+    phone = models.CharField(max_length=15, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True, help_text='Why the drain could not insert it')
+    
+    def __str__(self):
+        return self.reference_number
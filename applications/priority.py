@@ -0,0 +1,82 @@
+"""
+Need-priority scoring for the review queue.
+
+The score is a weighted sum of household and situation signals, with the
+weights in ``PRIORITY_SCORING['WEIGHTS']``. It is computed in Python when
+an application is saved and as one SQL expression when everything is
+rescored after a weight change (``manage.py rescore_applications``); both
+forms are built from the same weights and must stay in step.
+"""
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Least
+
+
+def get_options():
+    options = {
+        'WEIGHTS': {
+            'per_member': 2,
+            'per_child': 3,
+            'per_elderly': 4,
+            'special_needs': 10,
+            'emergency_package': 15,
+            'unemployed': 8,
+        },
+        'MAX_COUNTED_MEMBERS': 10,
+        'AUTO_APPROVE_PACKAGES': ['emergency'],
+        'AUTO_APPROVE_MIN_SCORE': 40,
+    }
+    options.update(getattr(settings, 'PRIORITY_SCORING', {}))
+    return options
+
+
+def score(application):
+    options = get_options()
+    weights = options['WEIGHTS']
+    cap = options['MAX_COUNTED_MEMBERS']
+    total = (
+        weights['per_member'] * min(application.family_size or 0, cap)
+        + weights['per_child'] * min(application.children_count or 0, cap)
+        + weights['per_elderly'] * min(application.elderly_count or 0, cap)
+    )
+    if (application.special_needs or '') != '':
+        total += weights['special_needs']
+    if application.selected_package == 'emergency':
+        total += weights['emergency_package']
+    if application.employment_status == 'unemployed':
+        total += weights['unemployed']
+    return total
+
+
+def score_expression():
+    """``score()`` as a database expression, for set-based rescoring"""
+    options = get_options()
+    weights = options['WEIGHTS']
+    cap = Value(options['MAX_COUNTED_MEMBERS'])
+
+    def flag(weight, **condition):
+        return Case(When(then=Value(weight), **condition), default=Value(0), output_field=IntegerField())
+
+    return (
+        Least(F('family_size'), cap) * weights['per_member']
+        + Least(F('children_count'), cap) * weights['per_child']
+        + Least(F('elderly_count'), cap) * weights['per_elderly']
+        + Case(When(special_needs='', then=Value(0)), default=Value(weights['special_needs']),
+               output_field=IntegerField())
+        + flag(weights['emergency_package'], selected_package='emergency')
+        + flag(weights['unemployed'], employment_status='unemployed')
+    )
+
+
+def qualifies_for_auto_approval(application):
+    """Pending emergency applications scoring above the bar, while stock lasts"""
+    from core.config import get_setting
+
+    if not get_setting('AUTO_APPROVE_EMERGENCY', False) or application.status != 'PENDING':
+        return False
+    options = get_options()
+    if application.selected_package not in options['AUTO_APPROVE_PACKAGES']:
+        return False
+    if application.priority_score < options['AUTO_APPROVE_MIN_SCORE']:
+        return False
+    return application.package is not None and application.package.is_available
@@ -0,0 +1,104 @@
+"""
+Closing and archiving distribution rounds.
+
+``close_round`` stops a round taking applications, then moves its
+applications, pickups and notifications to the cold ``*_archive`` tables
+(see core.cold_storage) in batches, so the round-scoped indexes only cover
+live rounds. Dedup keys and cluster memberships of archived applications
+are derived data and are deleted rather than archived. The close endpoint
+only closes the round and marks it ``ARCHIVING`` (``queue_archive``);
+``close_round --queued`` archives those rounds off the request path.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.cold_storage import ensure_cold_table, move_to_cold
+from notifications.models import Notification
+from pickups.models import Pickup
+
+from .models import Application, DistributionRound, HouseholdBlockKey, HouseholdCluster, HouseholdClusterMember
+
+ARCHIVED_MODELS = [Notification, Pickup, Application]
+
+
+def get_options():
+    options = {'ARCHIVE_BATCH_SIZE': 1000}
+    options.update(getattr(settings, 'DISTRIBUTION_ROUNDS', {}))
+    return options
+
+
+def close_round(distribution_round, archive=True, batch_size=None, progress=None):
+    """Close ``distribution_round`` and, unless told otherwise, archive it; returns rows moved per table"""
+    if distribution_round.status == 'OPEN':
+        distribution_round.status = 'CLOSED'
+        distribution_round.closed_at = timezone.now()
+        distribution_round.save(update_fields=['status', 'closed_at', 'updated_at'])
+    if not archive or distribution_round.status == 'ARCHIVED':
+        return {}
+    return archive_round(distribution_round, batch_size, progress)
+
+
+def queue_archive(distribution_round):
+    """Close ``distribution_round`` now and leave archiving it to ``close_round --queued``"""
+    if distribution_round.status == 'OPEN':
+        distribution_round.closed_at = timezone.now()
+    distribution_round.status = 'ARCHIVING'
+    distribution_round.save(update_fields=['status', 'closed_at', 'updated_at'])
+
+
+def archive_queued(batch_size=None, progress=None):
+    """Archive every round queued by queue_archive, oldest first; returns {round: rows moved per table}"""
+    return {
+        distribution_round: archive_round(distribution_round, batch_size, progress)
+        for distribution_round in DistributionRound.objects.filter(status='ARCHIVING').order_by('closed_at', 'id')
+    }
+
+
+def archive_round(distribution_round, batch_size=None, progress=None):
+    batch_size = batch_size or get_options()['ARCHIVE_BATCH_SIZE']
+    for model in ARCHIVED_MODELS:
+        ensure_cold_table(model)
+
+    moved = {model._meta.db_table: 0 for model in ARCHIVED_MODELS}
+    clusters = set()
+    while True:
+        ids = list(
+            Application.objects.filter(round=distribution_round).order_by().values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # Children first: nothing may point at an application once it is gone
+            # Including those in months already rotated out of the notification table
+            for notifications in Notification.objects.partitions(application_id__in=ids):
+                moved[Notification._meta.db_table] += move_to_cold(notifications, Notification)
+            moved[Pickup._meta.db_table] += move_to_cold(Pickup.objects.filter(application_id__in=ids))
+            members = HouseholdClusterMember.objects.filter(application_id__in=ids)
+            clusters.update(members.values_list('cluster_id', flat=True))
+            members.delete()
+            HouseholdBlockKey.objects.filter(application_id__in=ids).delete()
+            moved[Application._meta.db_table] += move_to_cold(Application.objects.filter(id__in=ids))
+        if progress:
+            progress(moved)
+
+    with transaction.atomic():
+        _recount_clusters(clusters)
+        distribution_round.status = 'ARCHIVED'
+        distribution_round.archived_at = timezone.now()
+        distribution_round.save(update_fields=['status', 'archived_at', 'updated_at'])
+    return moved
+
+
+def _recount_clusters(cluster_ids):
+    for cluster in HouseholdCluster.objects.filter(id__in=cluster_ids).annotate(
+        count=Count('members'), top=Max('members__score')
+    ):
+        if cluster.count < 2:
+            # A household of one is no longer a possible duplicate
+            cluster.delete()
+            continue
+        cluster.member_count = cluster.count
+        cluster.best_score = cluster.top
+        cluster.save(update_fields=['member_count', 'best_score', 'updated_at'])
@@ -1,22 +1,44 @@
 from rest_framework import serializers
-from .models import Application
+from packages.models import active_package_ids
+from .models import Application, parse_household_count
+
+
+class HouseholdCountField(serializers.IntegerField):
+    """Accepts the form's select values, including the open-ended '10+' options"""
+
+    def to_internal_value(self, data):
+        parsed = parse_household_count(data)
+        return super().to_internal_value(data if parsed is None else parsed)
 
 
 class ApplicationSerializer(serializers.ModelSerializer):
+    package_name = serializers.CharField(source='package.name', read_only=True, default=None)
+    possible_duplicates = serializers.SerializerMethodField()
+
     class Meta:
         model = Application
         fields = [
             'id', 'reference_number', 'first_name', 'last_name', 'phone', 'email', 'address',
             'family_size', 'children_count', 'elderly_count', 'employment_status', 
-            'special_needs', 'tec_member', 'selected_package', 'package_flexibility',
+            'special_needs', 'tec_member', 'selected_package', 'package', 'package_name', 'package_flexibility',
             'preferred_date', 'preferred_time', 'alternative_date', 'alternative_time',
-            'transportation_help', 'delivery_request', 'terms_agreement', 'status', 'created_at'
+            'transportation_help', 'delivery_request', 'terms_agreement', 'status', 'created_at',
+            'possible_duplicates', 'priority_score', 'round'
         ]
-        read_only_fields = ['id', 'reference_number', 'status', 'created_at']
+        read_only_fields = ['id', 'reference_number', 'package', 'status', 'created_at', 'priority_score', 'round']
+    
+    def get_possible_duplicates(self, obj):
+        """Other applications in this one's household cluster"""
+        membership = getattr(obj, 'household_membership', None)
+        return membership.cluster.member_count - 1 if membership else 0
 
 
 class ApplicationSubmissionSerializer(serializers.ModelSerializer):
     """Serializer for anonymous application submission"""
+    family_size = HouseholdCountField(min_value=1, max_value=99)
+    children_count = HouseholdCountField(min_value=0, max_value=99, required=False)
+    elderly_count = HouseholdCountField(min_value=0, max_value=99, required=False)
+
     class Meta:
         model = Application
         fields = [
@@ -43,6 +65,14 @@ class ApplicationSubmissionSerializer(serializers.ModelSerializer):
         if value not in ['yes', 'no']:
             raise serializers.ValidationError("Please select your TEC membership status.")
         return value
+    
+    def validate(self, attrs):
+        # The slug stays the input; the FK is what reports and scans join on
+        package_id = active_package_ids().get(attrs.get('selected_package'))
+        if package_id is None:
+            raise serializers.ValidationError({'selected_package': 'Please select an available package.'})
+        attrs['package_id'] = package_id
+        return attrs
 
 
 class ApplicationReviewSerializer(serializers.ModelSerializer):
@@ -0,0 +1,209 @@
+"""
+Write-behind queue for application submissions.
+
+When ``ASYNC_SUBMISSIONS`` is switched on (RELIEF_APP_CONFIG or a runtime
+ConfigurationSettings override), ``submit_application`` validates the
+payload and runs the usual eligibility check, then inserts one narrow
+``QueuedSubmission`` row and answers 202. That row is the queue: its
+unique constraint reserves the reference number and its commit makes the
+submission durable. The ``drain_submissions`` command later takes the
+oldest rows in batches, resolves eligibility for a whole batch with one
+query and inserts the applications with ``bulk_create``, dated when they
+were received.
+
+Queued submissions are visible to status lookups as ``RECEIVED`` through
+their row until they are inserted. One the drain cannot insert (its
+package was withdrawn meanwhile, say) keeps its row with the reason, and
+status lookups report it as rejected.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import priority
+from .models import Application, DistributionRound, QueuedSubmission, outside_archived_rounds
+
+logger = logging.getLogger('applications')
+
+
+def _options():
+    options = {
+        'BATCH_SIZE': 500,
+        'REFERENCE_ATTEMPTS': 20,
+    }
+    options.update(getattr(settings, 'SUBMISSION_QUEUE', {}))
+    return options
+
+
+class ReferenceNumbersExhausted(Exception):
+    pass
+
+
+def _insert_sql():
+    """One statement that queues a row unless an application already holds its reference number"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ('reference_number', 'phone', 'payload', 'received_at', 'error'))
+    return (
+        f"INSERT INTO {quote(QueuedSubmission._meta.db_table)} ({columns}) "
+        f"SELECT %s, %s, %s, %s, %s WHERE NOT EXISTS ("
+        f"SELECT 1 FROM {quote(Application._meta.db_table)} WHERE {quote('reference_number')} = %s)"
+    )
+
+
+def enqueue(payload):
+    """
+    Queue a validated, eligible submission under a fresh reference number;
+    returns its QueuedSubmission row (unsaved copy), committed
+    """
+    payload_field = QueuedSubmission._meta.get_field('payload')
+    received_at_field = QueuedSubmission._meta.get_field('received_at')
+    for _ in range(_options()['REFERENCE_ATTEMPTS']):
+        queued = QueuedSubmission(
+            reference_number=Application().generate_reference_number(), phone=payload['phone'], payload=payload
+        )
+        try:
+            # Its own transaction, so a clash never spoils an enclosing one
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(_insert_sql(), [
+                    queued.reference_number, queued.phone,
+                    payload_field.get_db_prep_value(payload, connection),
+                    received_at_field.get_db_prep_value(queued.received_at, connection),
+                    queued.error, queued.reference_number,
+                ])
+                inserted = cursor.rowcount
+        except IntegrityError:
+            # Another worker queued this number first
+            continue
+        if inserted:
+            return queued
+    logger.error('No free reference number after %s attempts', _options()['REFERENCE_ATTEMPTS'])
+    raise ReferenceNumbersExhausted('No free reference number found; the month\'s numbers are running out.')
+
+
+def find_queued(reference_number=None, phone=None):
+    """The newest queued submission for a reference or phone, if any; one indexed query"""
+    queryset = QueuedSubmission.objects.filter(
+        **({'reference_number': reference_number} if reference_number else {'phone': phone})
+    )
+    queued = queryset.order_by('-received_at').first()
+    if queued is None:
+        return None
+    return {
+        'reference_number': queued.reference_number,
+        'received_at': queued.received_at.isoformat(),
+        'payload': queued.payload,
+        'error': queued.error,
+    }
+
+
+def _latest_by_phone(phones):
+    """Most recent existing application per phone outside archived rounds, in a single query"""
+    latest = {}
+    queryset = Application.objects.filter(
+        outside_archived_rounds(), phone__in=phones
+    ).select_related('pickup').order_by('phone', '-created_at')
+    for application in queryset:
+        latest.setdefault(application.phone, application)
+    return latest
+
+
+def _build_batch(queued):
+    """(applications to insert, [(queued row, why it cannot be inserted)])"""
+    from .serializers import ApplicationSubmissionSerializer
+    from .views import check_recent_application, restriction_message
+
+    distribution_round = DistributionRound.current()
+    latest = _latest_by_phone({submission.phone for submission in queued})
+    taken = set(
+        Application.objects.filter(
+            reference_number__in=[submission.reference_number for submission in queued]
+        ).values_list('reference_number', flat=True)
+    )
+    applications, failures = [], []
+    for submission in queued:
+        if submission.reference_number in taken:
+            # Checked when queued, so only a synchronous save racing the queue gets here;
+            # the applicant holds this number, so never re-key it
+            failures.append((submission, 'Its reference number is already used by another application.'))
+            continue
+        serializer = ApplicationSubmissionSerializer(data=submission.payload)
+        if not serializer.is_valid():
+            # Validated before queueing; a catalog change since (a withdrawn package) gets here
+            failures.append((submission, '; '.join(
+                f"{field}: {' '.join(str(message) for message in messages)}"
+                for field, messages in serializer.errors.items()
+            )))
+            continue
+        application = Application(
+            reference_number=submission.reference_number,
+            round=distribution_round,
+            **serializer.validated_data
+        )
+        # Dated when it was accepted, so the restriction window and reports count from then
+        application.created_at = submission.received_at
+        # bulk_create skips save(), which normally does this
+        application.priority_score = priority.score(application)
+        # Eligibility was checked when it was queued; this catches two queued from one phone
+        can_apply, restriction_info = check_recent_application(latest.get(application.phone), distribution_round)
+        if not can_apply:
+            application.status = 'REJECTED'
+            application.reviewed_at = timezone.now()
+            application.review_notes = restriction_message(restriction_info)
+        else:
+            # Later submissions in the same batch see this one as the most recent
+            latest[application.phone] = application
+        applications.append(application)
+    return applications, failures
+
+
+def drain_batch(batch_size=None):
+    """
+    Insert the oldest pending submissions in one transaction; returns
+    (inserted, rejected, failed), all zero once the queue is empty
+    """
+    from .views import auto_approve_if_eligible
+
+    with transaction.atomic():
+        # Concurrent drainers on PostgreSQL take disjoint batches
+        queued = list(
+            QueuedSubmission.objects.select_for_update(skip_locked=True)
+            .filter(error='').order_by('received_at', 'id')[:batch_size or _options()['BATCH_SIZE']]
+        )
+        if not queued:
+            return 0, 0, 0
+        applications, failures = _build_batch(queued)
+        received_at = {application.pk: application.created_at for application in applications}
+        Application.objects.bulk_create(applications)
+        if applications:
+            # bulk_create stamps auto_now_add fields with the current time
+            Application.objects.filter(pk__in=received_at).update(
+                created_at=Case(*[When(pk=pk, then=Value(moment)) for pk, moment in received_at.items()])
+            )
+            for application in applications:
+                application.created_at = received_at[application.pk]
+        for application in applications:
+            auto_approve_if_eligible(application)
+        # Status lookups find the application itself from now on
+        QueuedSubmission.objects.filter(
+            reference_number__in=[application.reference_number for application in applications]
+        ).delete()
+        for submission, error in failures:
+            logger.error('Queued submission %s could not be inserted: %s', submission.reference_number, error)
+            submission.error = error
+            submission.save(update_fields=['error'])
+    rejected = sum(1 for application in applications if application.status == 'REJECTED')
+    return len(applications), rejected, len(failures)
+
+
+def drain():
+    """Drain every pending submission; returns (inserted, rejected, failed)"""
+    totals = [0, 0, 0]
+    while True:
+        counts = drain_batch()
+        if not any(counts):
+            return tuple(totals)
+        for index, count in enumerate(counts):
+            totals[index] += count
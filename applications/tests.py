@@ -1,3 +1,348 @@
-from django.test import TestCase
+import csv
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, models
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import audit
+from core.cold_storage import cold_model, cold_table_exists
+from core.models import VersionStamp
+from packages import forecast
+from packages.models import Package
+from pickups.models import Pickup
+
+from . import dedup, priority, rounds, submission_queue
+from .management.commands import convert_household_counts
+from .models import ROUNDS_STAMP, Application, DistributionRound, HouseholdClusterMember, QueuedSubmission
+from .views import auto_approve_if_eligible, can_user_apply
+
+
+class HouseholdDedupTests(TestCase):
+    def apply(self, first_name, last_name, phone, address):
+        return Application.objects.create(
+            first_name=first_name, last_name=last_name, phone=phone, address=address,
+            family_size=4, employment_status='unemployed', tec_member='no',
+            selected_package='small_basic', preferred_date=timezone.now().date(),
+            preferred_time='morning', terms_agreement=True,
+        )
+
+    def test_household_across_phones_is_clustered_incrementally(self):
+        first = self.apply('Adaeze', 'Okafor', '08011111111', '12 Ring Road, Ibadan')
+        self.apply('Ibrahim', 'Bello', '08022222222', '12 Ring Road, Ibadan')
+        self.apply('Ngozi', 'Okafor', '08033333333', '40 Ring Road, Ibadan')
+        self.assertEqual(dedup.run()['matches'], 0)
+
+        second = self.apply('Chidi', 'OKAFOR', '08144444444', '12, Ring Rd. Ibadan')
+        stats = dedup.run()
+        self.assertEqual(stats['applications'], 1)
+        self.assertEqual(stats['matches'], 1)
+        clustered = set(HouseholdClusterMember.objects.values_list('application_id', flat=True))
+        self.assertEqual(clustered, {first.id, second.id})
+        self.assertEqual(second.household_membership.cluster.member_count, 2)
+
+
+class PriorityScoreTests(TestCase):
+    def apply(self, phone, **overrides):
+        values = dict(
+            first_name='Amina', last_name='Yusuf', phone=phone, address='3 Oke Ado, Ibadan',
+            family_size=3, employment_status='employed', tec_member='no',
+            selected_package='small_basic', preferred_date=timezone.now().date(),
+            preferred_time='morning', terms_agreement=True,
+        )
+        values.update(overrides)
+        return Application.objects.create(**values)
+
+    def test_rescore_matches_score_at_save(self):
+        self.apply('08011111111')
+        self.apply('08022222222', family_size=14, children_count=6, elderly_count=2, special_needs='Wheelchair',
+                   employment_status='unemployed', selected_package='emergency')
+        saved = dict(Application.objects.values_list('id', 'priority_score'))
+        with self.settings(PRIORITY_SCORING={'WEIGHTS': {key: 0 for key in priority.get_options()['WEIGHTS']}}):
+            Application.objects.update(priority_score=priority.score_expression())
+        self.assertEqual(set(Application.objects.values_list('priority_score', flat=True)), {0})
+
+        Application.objects.update(priority_score=priority.score_expression())
+        self.assertEqual(dict(Application.objects.values_list('id', 'priority_score')), saved)
+        # 2*10 + 3*6 + 4*2 + 10 + 15 + 8
+        self.assertEqual(max(saved.values()), 79)
+
+    @override_settings(RELIEF_APP_CONFIG={'AUTO_APPROVE_EMERGENCY': True})
+    def test_emergency_auto_approval(self):
+        package = Package.objects.create(
+            name='Emergency', package_type='emergency', cash_amount=5000,
+            total_quantity=5, available_quantity=5, items_included={},
+        )
+        urgent = self.apply('08033333333', family_size=8, children_count=5, selected_package='emergency',
+                            package=package, employment_status='unemployed')
+        routine = self.apply('08044444444', selected_package='emergency', package=package)
+        self.assertIsNotNone(auto_approve_if_eligible(urgent))
+        self.assertIsNone(auto_approve_if_eligible(routine))
+        self.assertEqual(urgent.status, 'APPROVED')
+        self.assertIsNone(urgent.reviewed_by)
+
+
+class DistributionRoundTests(TransactionTestCase):
+    # Cold tables are created on first archive, which SQLite cannot do inside a test transaction
+
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        self.round = DistributionRound.objects.create(
+            name='October', opens_on=today - timedelta(days=5), closes_on=today + timedelta(days=5),
+            one_application_per_phone=True,
+        )
+        self.addCleanup(self.empty_cold_tables)
+
+    def empty_cold_tables(self):
+        # Unmanaged, so the test flush leaves them alone
+        for model in rounds.ARCHIVED_MODELS:
+            if cold_table_exists(model):
+                cold_model(model).objects.all().delete()
+
+    def apply(self, phone, distribution_round):
+        return Application.objects.create(
+            first_name='Ada', last_name='Obi', phone=phone, address='3 Ring Road, Ibadan',
+            family_size=2, employment_status='employed', tec_member='no', selected_package='small_basic',
+            preferred_date=timezone.localdate(), preferred_time='morning', terms_agreement=True,
+            status='APPROVED', round=distribution_round,
+        )
+
+    def test_eligibility_is_per_round_and_closing_archives(self):
+        self.assertEqual(DistributionRound.current(), self.round)
+        earlier = self.apply('08033333333', None)
+        # An application from before the round is not held to its once-per-phone rule
+        self.assertTrue(can_user_apply(earlier.phone)[0])
+        application = self.apply('08033333333', self.round)
+        self.assertFalse(can_user_apply(earlier.phone)[0])
+        Pickup.objects.create(
+            application=application, scheduled_date=application.preferred_date, scheduled_time='morning'
+        )
+
+        moved = rounds.close_round(self.round, batch_size=1)
+        self.assertEqual(moved['applications_application'], 1)
+        self.assertEqual(moved['pickups_pickup'], 1)
+        self.assertEqual(Application.objects.get().id, earlier.id)
+        self.assertFalse(Pickup.objects.exists())
+        self.assertEqual(cold_model(Application).objects.get().reference_number, application.reference_number)
+        self.assertIsNone(DistributionRound.current())
+
+        response = self.client.post('/api/applications/check-status/', {'reference': application.reference_number})
+        self.assertTrue(response.json()['application']['archived'])
+
+    def test_closing_through_the_api_queues_the_archive(self):
+        application = self.apply('08066666666', self.round)
+        self.apply('08077777777', None)
+        self.client.force_login(User.objects.create_user('supervisor', is_staff=True))
+        # The close is audited; write it while its user still exists
+        self.addCleanup(audit.flush)
+        response = self.client.post(f'/api/applications/rounds/{self.round.id}/close/')
+        self.assertEqual(response.status_code, 202)
+        self.round.refresh_from_db()
+        self.assertEqual(self.round.status, 'ARCHIVING')
+        self.assertFalse(self.round.is_accepting_applications)
+        self.assertTrue(Application.objects.filter(pk=application.pk).exists())
+
+        call_command('close_round', queued=True, stdout=StringIO())
+        self.round.refresh_from_db()
+        self.assertEqual(self.round.status, 'ARCHIVED')
+        self.assertFalse(Application.objects.filter(pk=application.pk).exists())
+
+        # Archived rounds still count towards the forecast and can be reported on
+        today = timezone.localdate()
+        self.assertEqual(forecast.daily_counts(['small_basic'], today, today)[1].tolist(), [[2]])
+        report = self.client.get(f'/api/applications/demographics/?round={self.round.id}').json()['data']
+        self.assertEqual(report['totals']['applications'], 1)
+        report = self.client.get('/api/applications/demographics/?round=all').json()['data']
+        self.assertEqual(report['totals']['applications'], 1)
+
+    def test_other_workers_round_changes_are_seen_within_the_check_interval(self):
+        self.assertEqual(DistributionRound.current(), self.round)
+        # Another worker archives the round; this one still holds the old stamp
+        DistributionRound.objects.filter(pk=self.round.pk).update(status='ARCHIVED')
+        VersionStamp.objects.update_or_create(name=ROUNDS_STAMP, defaults={'version': 1})
+        self.assertEqual(DistributionRound.current(), self.round)
+        with self.settings(DISTRIBUTION_ROUNDS={'VERSION_CHECK_SECONDS': 0}):
+            self.assertIsNone(DistributionRound.current())
+
+    def test_the_restriction_window_spans_live_rounds(self):
+        today = timezone.localdate()
+        earlier_round = DistributionRound.objects.create(
+            name='September', opens_on=today - timedelta(days=20), closes_on=today - timedelta(days=10),
+            status='CLOSED',
+        )
+        earlier = self.apply('08055555555', earlier_round)
+        Application.objects.filter(pk=earlier.pk).update(status='PICKED_UP')
+        self.assertEqual(DistributionRound.current(), self.round)
+        self.assertFalse(can_user_apply(earlier.phone)[0])
+
+        response = self.client.post('/api/applications/check-status/', {'phone': earlier.phone})
+        self.assertEqual(response.json()['application']['reference_number'], earlier.reference_number)
+        self.assertFalse(response.json()['can_apply'])
+
+        Application.objects.filter(pk=earlier.pk).update(created_at=timezone.now() - timedelta(days=30))
+        self.assertTrue(can_user_apply(earlier.phone)[0])
+
+
+class HouseholdCountTests(TransactionTestCase):
+    # The conversion alters columns, which SQLite cannot do inside a test transaction
+
+    def apply(self, phone, **fields):
+        return Application.objects.create(
+            first_name='Tunde', last_name='Bello', phone=phone, address='5 Dugbe, Ibadan',
+            employment_status='unemployed', tec_member='no', selected_package='small_basic',
+            preferred_date=timezone.localdate(), preferred_time='morning', terms_agreement=True,
+            **{'family_size': 1, **fields}
+        )
+
+    def test_text_counts_are_converted_with_bad_values_clamped_and_reported(self):
+        with connection.schema_editor() as editor:
+            for name in convert_household_counts.FIELDS:
+                text_field = models.CharField(max_length=10)
+                text_field.set_attributes_from_name(name)
+                text_field.model = Application
+                editor.alter_field(Application, Application._meta.get_field(name), text_field)
+        clean = self.apply('08011112222', family_size=4, children_count=2)
+        messy = self.apply('08011113333')
+        table = connection.ops.quote_name(Application._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET family_size = %s, children_count = %s, elderly_count = %s WHERE id = %s",
+                ['lots', '150', ' ', Application._meta.pk.get_db_prep_value(messy.pk, connection)]
+            )
+
+        report = tempfile.NamedTemporaryFile(suffix='.csv')
+        self.addCleanup(report.close)
+        call_command('convert_household_counts', report=report.name, stdout=StringIO())
+        self.assertEqual(convert_household_counts.text_columns(), [])
+        messy.refresh_from_db()
+        self.assertEqual((messy.family_size, messy.children_count, messy.elderly_count), (99, 99, 0))
+        clean.refresh_from_db()
+        self.assertEqual((clean.family_size, clean.children_count, clean.elderly_count), (4, 2, 0))
+        with open(report.name) as lines:
+            rows = list(csv.DictReader(lines))
+        self.assertEqual(
+            [(row['field'], row['raw_value']) for row in rows], [('family_size', 'lots'), ('children_count', '150')]
+        )
+
+
+class DemographicsReportTests(TestCase):
+    def setUp(self):
+        package = Package.objects.create(
+            name='Small', package_type='small_basic', cash_amount=5000,
+            total_quantity=10, available_quantity=10, items_included={},
+        )
+        for phone, family_size, children_count in (('08020000001', 4, 2), ('08020000002', 6, 3)):
+            Application.objects.create(
+                first_name='Kemi', last_name='Ade', phone=phone, address='9 Mokola, Ibadan',
+                family_size=family_size, children_count=children_count, elderly_count=1,
+                employment_status='unemployed', tec_member='no', selected_package='small_basic',
+                package=package, preferred_date=timezone.localdate(), preferred_time='morning',
+                terms_agreement=True,
+            )
+        self.user = User.objects.create_user('reporter')
+
+    def test_totals_and_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/applications/demographics/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        data = self.client.get('/api/applications/demographics/?period=day').json()['data']
+        self.assertEqual(data['totals'], {
+            'applications': 2, 'people': 10, 'children': 5, 'elderly': 2,
+            'average_family_size': 5.0, 'cash_value': 10000,
+        })
+        self.assertEqual(data['family_size_distribution'], [
+            {'family_size': 4, 'applications': 1}, {'family_size': 6, 'applications': 1}
+        ])
+        self.assertEqual(len(data['by_period']), 1)
+        self.assertEqual(self.client.get('/api/applications/demographics/?period=year').status_code, 400)
+
+
+@override_settings(RELIEF_APP_CONFIG={'ASYNC_SUBMISSIONS': True})
+class SubmissionQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.package = Package.objects.create(
+            name='Small', package_type='small_basic', cash_amount=5000,
+            total_quantity=10, available_quantity=10, items_included={},
+        )
+
+    def submit(self, phone, first_name='Bola', expected_status=202):
+        response = self.client.post('/api/applications/submit/', {
+            'first_name': first_name, 'last_name': 'Ade', 'phone': phone, 'address': '7 Bodija, Ibadan',
+            'family_size': 3, 'employment_status': 'unemployed', 'tec_member': 'no',
+            'selected_package': 'small_basic', 'preferred_date': timezone.localdate().isoformat(),
+            'preferred_time': 'morning', 'terms_agreement': True,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, expected_status)
+        return response.json().get('reference_number')
+
+    def status_of(self, **lookup):
+        return self.client.post('/api/applications/check-status/', lookup).json()['application']
+
+    def test_queued_submissions_are_looked_up_then_drained(self):
+        first = self.submit('08011111111')
+        second = self.submit('08022222222', first_name='Tunde')
+        self.assertEqual(self.status_of(reference=first)['status'], 'RECEIVED')
+        self.assertEqual(self.status_of(phone='08022222222')['reference_number'], second)
+        received_at = timezone.now() - timedelta(days=2)
+        QueuedSubmission.objects.filter(reference_number=first).update(received_at=received_at)
+
+        self.assertEqual(submission_queue.drain_batch(batch_size=1), (1, 0, 0))
+        self.assertEqual(submission_queue.drain(), (1, 0, 0))
+        self.assertEqual(set(Application.objects.values_list('reference_number', flat=True)), {first, second})
+        self.assertEqual(Application.objects.get(reference_number=first).created_at, received_at)
+        self.assertFalse(QueuedSubmission.objects.exists())
+        self.assertEqual(self.status_of(reference=second)['status'], 'PENDING')
+
+        # Restricted applicants are told straight away, not queued and rejected later
+        self.submit('08011111111', expected_status=400)
+        self.assertFalse(QueuedSubmission.objects.exists())
+
+    def test_a_submission_that_can_no_longer_be_inserted_is_kept_and_reported(self):
+        reference_number = self.submit('08033333333')
+        Package.objects.update(is_active=False)
+        cache.clear()
+        self.assertEqual(submission_queue.drain(), (0, 0, 1))
+        self.assertFalse(Application.objects.exists())
+        self.assertIn('selected_package', QueuedSubmission.objects.get(reference_number=reference_number).error)
+        status = self.status_of(reference=reference_number)
+        self.assertEqual(status['status'], 'REJECTED')
+
+    def test_reference_numbers_are_reserved_once(self):
+        with mock.patch.object(Application, 'generate_reference_number', return_value='GCR26100001'):
+            submission_queue.enqueue({'phone': '08044444444'})
+            with self.assertRaises(submission_queue.ReferenceNumbersExhausted):
+                submission_queue.enqueue({'phone': '08055555555'})
+
+    def test_synchronous_saves_check_queued_numbers_only_while_queueing(self):
+        self.submit('08088888888', expected_status=202)
+        queued = QueuedSubmission.objects.get().reference_number
+        details = {
+            'first_name': 'Ada', 'last_name': 'Obi', 'address': '1 Ring Road', 'family_size': 2,
+            'employment_status': 'employed', 'tec_member': 'no', 'selected_package': 'small_basic',
+            'preferred_date': timezone.localdate(), 'preferred_time': 'morning', 'terms_agreement': True,
+        }
+        with mock.patch.object(Application, 'generate_reference_number', side_effect=[queued, 'GCR26100003']):
+            application = Application.objects.create(phone='08099999999', **details)
+        self.assertEqual(application.reference_number, 'GCR26100003')
+        # Just the insert with the queue off
+        with override_settings(RELIEF_APP_CONFIG={'ASYNC_SUBMISSIONS': False}), self.assertNumQueries(1):
+            Application.objects.create(phone='08010101010', **details)
+
+    def test_reference_numbers_held_by_an_application_are_skipped(self):
+        self.submit('08066666666', expected_status=202)
+        submission_queue.drain()
+        taken = Application.objects.get().reference_number
+        with mock.patch.object(Application, 'generate_reference_number', side_effect=[taken, 'GCR26100002']):
+            queued = submission_queue.enqueue({'phone': '08077777777'})
+        self.assertEqual(queued.reference_number, 'GCR26100002')
+        self.assertEqual(QueuedSubmission.objects.get().reference_number, 'GCR26100002')
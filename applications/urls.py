@@ -1,11 +1,16 @@
 from django.urls import path
-from . import views
+from core.async_api import pick_view
+from . import async_views, views
 
 urlpatterns = [
     path('submit/', views.submit_application, name='submit_application'),
-    path('check-status/', views.check_application_status, name='check_application_status'),
+    path('check-status/', pick_view(views.check_application_status, async_views.check_application_status), name='check_application_status'),
     path('list/', views.ApplicationListView.as_view(), name='application_list'),
+    path('demographics/', views.demographics_report, name='demographics_report'),
+    path('rounds/', views.distribution_rounds, name='distribution_rounds'),
+    path('rounds/<int:round_id>/close/', views.close_distribution_round, name='close_distribution_round'),
     path('<uuid:pk>/', views.ApplicationDetailView.as_view(), name='application_detail'),
     path('<uuid:application_id>/approve/', views.approve_application, name='approve_application'),
     path('<uuid:application_id>/reject/', views.reject_application, name='reject_application'),
+    path('<uuid:application_id>/duplicates/', views.household_duplicates, name='household_duplicates'),
 ]
\ No newline at end of file
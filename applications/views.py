@@ -1,13 +1,68 @@
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
 from django.utils import timezone
-from django.conf import settings
+from django.utils.dateparse import parse_date
+from core import audit, metrics
+from core.config import get_setting
+from core.throttling import PUBLIC_THROTTLES
 from datetime import timedelta
-from .models import Application
+from .models import Application, DistributionRound, HouseholdClusterMember, outside_archived_rounds, round_filter
+from . import priority, rounds, submission_queue
 from .serializers import ApplicationSerializer, ApplicationSubmissionSerializer, ApplicationReviewSerializer
 import re
 
+# Fields whose before/after values go into the review audit entry
+REVIEW_FIELDS = ['status', 'reviewed_by', 'reviewed_at', 'review_notes']
+
+REPORT_PERIODS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+HOUSEHOLD_TOTALS = {
+    'applications': Count('id'),
+    'people': Sum('family_size'),
+    'children': Sum('children_count'),
+    'elderly': Sum('elderly_count'),
+    'average_family_size': Avg('family_size'),
+    'cash_value': Sum('package__cash_amount'),
+}
+
+
+def grant_approval(application, request, reviewer, notes, **audit_info):
+    """Approve a pending application and schedule its pickup"""
+    from pickups.models import Pickup
+    
+    before = audit.snapshot(application, REVIEW_FIELDS)
+    application.status = 'APPROVED'
+    application.reviewed_by = reviewer
+    application.reviewed_at = timezone.now()
+    application.review_notes = notes
+    application.save()
+    
+    pickup = Pickup.objects.create(
+        application=application,
+        scheduled_date=application.preferred_date,
+        scheduled_time=application.preferred_time
+    )
+    audit.record(
+        request, 'APPROVE', application, audit.diff(before, application),
+        pickup_code=pickup.pickup_code, **audit_info
+    )
+    metrics.REVIEWS.labels(decision='approved').inc()
+    return pickup
+
+
+def auto_approve_if_eligible(application, request=None):
+    """Approve emergency applications that meet the AUTO_APPROVE criteria; returns the pickup or None"""
+    if not priority.qualifies_for_auto_approval(application):
+        return None
+    return grant_approval(
+        application, request, None,
+        f'Auto-approved: emergency application with priority score {application.priority_score}.',
+        auto_approved=True
+    )
+
 
 def is_valid_nigerian_phone(phone):
     """
@@ -36,19 +91,43 @@ def can_user_apply(phone_number):
     1. No recent application within restriction days (21 days default)
     2. Exception: If last application was REJECTED
     3. Exception: If last approved application expired and wasn't picked up
+    The window spans every round not yet archived; the current round may
+    shorten or lengthen it and add its once-per-phone rule.
     """
-    restriction_days = settings.RELIEF_APP_CONFIG.get('APPLICATION_RESTRICTION_DAYS', 21)
-    cutoff_date = timezone.now().date() - timedelta(days=restriction_days)
-    
+    distribution_round = DistributionRound.current()
     # Get the most recent application for this phone number
     recent_application = Application.objects.filter(
-        phone=phone_number
+        outside_archived_rounds(), phone=phone_number
     ).order_by('-created_at').first()
     
+    return check_recent_application(recent_application, distribution_round)
+
+
+def check_recent_application(recent_application, distribution_round=None):
+    """
+    Apply the can_user_apply rules to an already-fetched most recent
+    application (None if the phone has never applied)
+    """
+    restriction_days = get_setting('APPLICATION_RESTRICTION_DAYS', 21)
+    if distribution_round is not None and distribution_round.restriction_days is not None:
+        restriction_days = distribution_round.restriction_days
+    cutoff_date = timezone.now().date() - timedelta(days=restriction_days)
+    
     if not recent_application:
         # No previous applications, user can apply
         return True, None
     
+    if (
+        distribution_round is not None and distribution_round.one_application_per_phone
+        and recent_application.round_id == distribution_round.id
+    ):
+        return False, {
+            'recent_application': recent_application,
+            'days_remaining': None,
+            'restriction_days': restriction_days,
+            'round': distribution_round
+        }
+    
     # If the most recent application is older than restriction period, allow
     if recent_application.created_at.date() <= cutoff_date:
         return True, None
@@ -80,8 +159,29 @@ def can_user_apply(phone_number):
     }
 
 
+def restriction_message(restriction_info):
+    """Explain to the applicant why a recent application blocks a new one"""
+    recent_app = restriction_info['recent_application']
+    days_remaining = restriction_info['days_remaining']
+    restriction_days = restriction_info['restriction_days']
+    
+    if restriction_info.get('round'):
+        return f"You have already applied in {restriction_info['round'].name} (Ref: {recent_app.reference_number}). Each household can apply once per round."
+    
+    # Create detailed error message based on application status
+    if recent_app.status == 'PENDING':
+        return f"You have a pending application (Ref: {recent_app.reference_number}) submitted on {recent_app.created_at.strftime('%Y-%m-%d')}. Please wait for review before applying again."
+    elif recent_app.status == 'APPROVED':
+        return f"You have an approved application (Ref: {recent_app.reference_number}) from {recent_app.created_at.strftime('%Y-%m-%d')}. Please collect your package first, or wait {days_remaining} more days to apply again."
+    elif recent_app.status == 'PICKED_UP':
+        return f"You recently collected a relief package on {recent_app.created_at.strftime('%Y-%m-%d')}. You can apply again after {days_remaining} more days (every {restriction_days} days limit)."
+    else:
+        return f"You have a recent application from {recent_app.created_at.strftime('%Y-%m-%d')}. You can apply again in {days_remaining} days."
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(PUBLIC_THROTTLES)
 def submit_application(request):
     """Anonymous application submission endpoint"""
     serializer = ApplicationSubmissionSerializer(data=request.data)
@@ -89,6 +189,7 @@ def submit_application(request):
         # Validate phone number format
         phone_number = serializer.validated_data.get('phone')
         if not is_valid_nigerian_phone(phone_number):
+            metrics.SUBMISSIONS.labels(outcome='invalid').inc()
             return Response({
                 'success': False,
                 'message': 'Please enter a valid Nigerian phone number.',
@@ -97,7 +198,15 @@ def submit_application(request):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if user can apply before saving
+        distribution_round = DistributionRound.current()
+        if distribution_round is not None and not distribution_round.is_accepting_applications:
+            metrics.SUBMISSIONS.labels(outcome='closed').inc()
+            return Response({
+                'success': False,
+                'message': f'{distribution_round.name} is not accepting applications. Please check back for the next distribution round.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Check if user can apply before saving (or queueing)
         can_apply, restriction_info = can_user_apply(phone_number)
         
         if not can_apply:
@@ -105,16 +214,8 @@ def submit_application(request):
             recent_app = restriction_info['recent_application']
             days_remaining = restriction_info['days_remaining']
             restriction_days = restriction_info['restriction_days']
-            
-            # Create detailed error message based on application status
-            if recent_app.status == 'PENDING':
-                message = f"You have a pending application (Ref: {recent_app.reference_number}) submitted on {recent_app.created_at.strftime('%Y-%m-%d')}. Please wait for review before applying again."
-            elif recent_app.status == 'APPROVED':
-                message = f"You have an approved application (Ref: {recent_app.reference_number}) from {recent_app.created_at.strftime('%Y-%m-%d')}. Please collect your package first, or wait {days_remaining} more days to apply again."
-            elif recent_app.status == 'PICKED_UP':
-                message = f"You recently collected a relief package on {recent_app.created_at.strftime('%Y-%m-%d')}. You can apply again after {days_remaining} more days (every {restriction_days} days limit)."
-            else:
-                message = f"You have a recent application from {recent_app.created_at.strftime('%Y-%m-%d')}. You can apply again in {days_remaining} days."
+            message = restriction_message(restriction_info)
+            metrics.SUBMISSIONS.labels(outcome='restricted').inc()
             
             return Response({
                 'success': False,
@@ -129,8 +230,14 @@ def submit_application(request):
                 'errors': {'phone': [message]}
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if get_setting('ASYNC_SUBMISSIONS', False):
+            metrics.SUBMISSIONS.labels(outcome='queued').inc()
+            return queue_submission(serializer)
+        
         # User can apply, save the application
-        application = serializer.save()
+        application = serializer.save(round=distribution_round)
+        metrics.SUBMISSIONS.labels(outcome='created').inc()
+        auto_approve_if_eligible(application, request)
         
         # Return success response with reference number
         return Response({
@@ -147,6 +254,7 @@ def submit_application(request):
             }
         }, status=status.HTTP_201_CREATED)
     
+    metrics.SUBMISSIONS.labels(outcome='invalid').inc()
     return Response({
         'success': False,
         'message': 'Please correct the errors below.',
@@ -154,9 +262,169 @@ def submit_application(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def queue_submission(serializer):
+    """
+    Accept a validated, eligible submission into the write-behind queue;
+    the drain_submissions command inserts it.
+    """
+    try:
+        queued = submission_queue.enqueue(serializer.data)
+    except submission_queue.ReferenceNumbersExhausted:
+        return Response({
+            'success': False,
+            'message': 'We could not accept your application right now. Please try again shortly.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    reference_number = queued.reference_number
+    validated_data = serializer.validated_data
+    
+    return Response({
+        'success': True,
+        'message': 'Application received! It will be checked and added for review shortly.',
+        'reference_number': reference_number,
+        'data': {
+            'id': None,
+            'reference_number': reference_number,
+            'full_name': f"{validated_data['first_name']} {validated_data['last_name']}",
+            'phone': validated_data['phone'],
+            'selected_package': validated_data['selected_package'],
+            'status': 'RECEIVED'
+        }
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def queued_status(record):
+    """
+    Status lookup body for a submission still waiting in the queue, or one
+    the drain could not insert (which the applicant may submit again)
+    """
+    payload = record['payload']
+    response_data = {
+        'success': True,
+        'application': {
+            'reference_number': record['reference_number'],
+            'full_name': f"{payload['first_name']} {payload['last_name']}",
+            'status': 'REJECTED' if record['error'] else 'RECEIVED',
+            'selected_package': payload['selected_package'],
+            'submitted_date': record['received_at'][:10],
+            'phone': payload['phone']
+        },
+        'can_apply': bool(record['error'])
+    }
+    if record['error']:
+        response_data['application']['review_notes'] = (
+            f"Your application could not be processed ({record['error']}). Please submit it again."
+        )
+    return response_data
+
+
+def archived_application(reference_number):
+    """An application from an archived round, looked up in cold storage"""
+    from core.cold_storage import cold_model, cold_table_exists
+    
+    if not cold_table_exists(Application):
+        return None
+    return cold_model(Application).objects.filter(reference_number=reference_number).first()
+
+
+def archived_status(application):
+    return {
+        'success': True,
+        'application': {
+            'reference_number': application.reference_number,
+            'full_name': f"{application.first_name} {application.last_name}",
+            'status': application.status,
+            'selected_package': application.selected_package,
+            'submitted_date': application.created_at.strftime('%Y-%m-%d'),
+            'phone': application.phone,
+            'archived': True
+        },
+        'can_apply': True
+    }
+
+
+def invalid_status_lookup(phone_number, reference_number):
+    """The 400 body for a status lookup without a usable phone or reference, else None"""
+    if not phone_number and not reference_number:
+        return {
+            'success': False,
+            'message': 'Either phone number or reference number is required.'
+        }
+    
+    # Validate phone number format if provided
+    if phone_number and not is_valid_nigerian_phone(phone_number):
+        return {
+            'success': False,
+            'message': 'Please enter a valid Nigerian phone number (e.g., 08012345678, +2348012345678).',
+            'errors': {'phone': ['Invalid Nigerian phone number format.']}
+        }
+    return None
+
+
+def reference_not_found(reference_number):
+    return {
+        'success': False,
+        'message': f'No application found with reference number: {reference_number}',
+        'can_apply': True
+    }
+
+
+PHONE_NOT_FOUND = {
+    'success': False,
+    'message': 'No application found for this phone number.',
+    'can_apply': True
+}
+
+
+def application_status(application, can_apply, restriction_info, pickup=None, pickup_expired=None):
+    """Status lookup body for an application, shared with the async view"""
+    response_data = {
+        'success': True,
+        'application': {
+            'reference_number': application.reference_number,
+            'full_name': application.get_full_name(),
+            'status': application.status,
+            'selected_package': application.selected_package,
+            'submitted_date': application.created_at.strftime('%Y-%m-%d'),
+            'phone': application.phone
+        },
+        'can_apply': can_apply
+    }
+    
+    # Add pickup information if available
+    if application.status == 'APPROVED' and pickup is not None:
+        response_data['pickup'] = {
+            'pickup_code': pickup.pickup_code,
+            'scheduled_date': pickup.scheduled_date.strftime('%Y-%m-%d'),
+            'scheduled_time': pickup.scheduled_time,
+            'status': pickup.status,
+            'is_expired': pickup_expired
+        }
+    
+    # Add restriction information if user cannot apply
+    if not can_apply and restriction_info:
+        response_data['restriction_info'] = {
+            'days_remaining': restriction_info['days_remaining'],
+            'restriction_days': restriction_info['restriction_days']
+        }
+    return response_data
+
+
+def requested_round(request):
+    """
+    Round filter kwargs for supervisor views: ``?round=<id>``, ``?round=all``,
+    or the current round by default
+    """
+    value = request.query_params.get('round')
+    if value == 'all':
+        return {}
+    if value:
+        return {'round_id': value}
+    return round_filter(DistributionRound.current())
+
+
 class ApplicationListView(generics.ListAPIView):
     """List all applications - for supervisors"""
-    queryset = Application.objects.all()
+    queryset = Application.objects.select_related('package', 'household_membership__cluster')
     serializer_class = ApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -165,16 +433,23 @@ class ApplicationListView(generics.ListAPIView):
         if not self.request.user.is_staff:
             return Application.objects.none()
             
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().filter(**requested_round(self.request))
         status_filter = self.request.query_params.get('status', None)
         if status_filter:
             queryset = queryset.filter(status=status_filter)
+        if self.request.query_params.get('possible_duplicate') in ('1', 'true'):
+            queryset = queryset.filter(household_membership__isnull=False)
+        if self.request.query_params.get('order') == 'priority':
+            # Neediest first; served by application_round_priority_idx when filtered by status.
+            # That is the requested (status, priority_score DESC, created_at) index led by
+            # round, since this list is always scoped to one round
+            return queryset.order_by('-priority_score', 'created_at')
         return queryset.order_by('-created_at')
 
 
 class ApplicationDetailView(generics.RetrieveAPIView):
     """Get single application details - for supervisors"""
-    queryset = Application.objects.all()
+    queryset = Application.objects.select_related('package', 'household_membership__cluster')
     serializer_class = ApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -197,19 +472,7 @@ def approve_application(request, application_id):
                 'message': 'Only pending applications can be approved.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        application.status = 'APPROVED'
-        application.reviewed_by = request.user
-        application.reviewed_at = timezone.now()
-        application.review_notes = request.data.get('notes', '')
-        application.save()
-        
-        # Create pickup record
-        from pickups.models import Pickup
-        pickup = Pickup.objects.create(
-            application=application,
-            scheduled_date=application.preferred_date,
-            scheduled_time=application.preferred_time
-        )
+        pickup = grant_approval(application, request, request.user, request.data.get('notes', ''))
         
         return Response({
             'success': True,
@@ -236,11 +499,14 @@ def reject_application(request, application_id):
                 'message': 'Only pending applications can be rejected.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        before = audit.snapshot(application, REVIEW_FIELDS)
         application.status = 'REJECTED'
         application.reviewed_by = request.user
         application.reviewed_at = timezone.now()
         application.review_notes = request.data.get('notes', '')
         application.save()
+        audit.record(request, 'REJECT', application, audit.diff(before, application))
+        metrics.REVIEWS.labels(decision='rejected').inc()
         
         return Response({
             'success': True,
@@ -256,27 +522,19 @@ def reject_application(request, application_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(PUBLIC_THROTTLES)
 def check_application_status(request):
     """Check application status by phone number OR reference number - anonymous endpoint"""
     phone_number = request.data.get('phone', '').strip()
     reference_number = request.data.get('reference', '').strip()
     
-    if not phone_number and not reference_number:
-        return Response({
-            'success': False,
-            'message': 'Either phone number or reference number is required.'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Validate phone number format if provided
-    if phone_number and not is_valid_nigerian_phone(phone_number):
-        return Response({
-            'success': False,
-            'message': 'Please enter a valid Nigerian phone number (e.g., 08012345678, +2348012345678).',
-            'errors': {'phone': ['Invalid Nigerian phone number format.']}
-        }, status=status.HTTP_400_BAD_REQUEST)
+    invalid = invalid_status_lookup(phone_number, reference_number)
+    if invalid:
+        return Response(invalid, status=status.HTTP_400_BAD_REQUEST)
     
     # Search by reference number first (more specific), then by phone number
     recent_application = None
+    queue_enabled = get_setting('ASYNC_SUBMISSIONS', False)
     
     if reference_number:
         recent_application = Application.objects.filter(
@@ -284,60 +542,212 @@ def check_application_status(request):
         ).first()
         
         if not recent_application:
-            return Response({
-                'success': False,
-                'message': f'No application found with reference number: {reference_number}',
-                'can_apply': True
-            }, status=status.HTTP_404_NOT_FOUND)
+            queued = queue_enabled and submission_queue.find_queued(reference_number=reference_number)
+            if queued:
+                return Response(queued_status(queued))
+            archived = archived_application(reference_number)
+            if archived:
+                return Response(archived_status(archived))
+            return Response(reference_not_found(reference_number), status=status.HTTP_404_NOT_FOUND)
     
     elif phone_number:
-        # Get the most recent application for this phone number
+        # Get the most recent application for this phone number, falling back to earlier live rounds
         recent_application = Application.objects.filter(
-            phone=phone_number
+            outside_archived_rounds(), phone=phone_number
         ).order_by('-created_at').first()
+        
+        # A submission still in the queue is newer than anything in the database
+        queued = queue_enabled and submission_queue.find_queued(phone=phone_number)
+        if queued and (not recent_application or queued['received_at'] > recent_application.created_at.isoformat()):
+            return Response(queued_status(queued))
     
     if not recent_application:
-        return Response({
-            'success': False,
-            'message': 'No application found for this phone number.',
-            'can_apply': True
-        }, status=status.HTTP_404_NOT_FOUND)
+        return Response(PHONE_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
     
     # Check if user can apply for a new application (use phone number from found application)
     can_apply, restriction_info = can_user_apply(recent_application.phone)
     
-    response_data = {
-        'success': True,
-        'application': {
-            'reference_number': recent_application.reference_number,
-            'full_name': recent_application.get_full_name(),
-            'status': recent_application.status,
-            'selected_package': recent_application.selected_package,
-            'submitted_date': recent_application.created_at.strftime('%Y-%m-%d'),
-            'phone': recent_application.phone
-        },
-        'can_apply': can_apply
-    }
-    
-    # Add pickup information if available
+    pickup = None
     if recent_application.status == 'APPROVED':
         try:
             pickup = recent_application.pickup
-            response_data['pickup'] = {
-                'pickup_code': pickup.pickup_code,
-                'scheduled_date': pickup.scheduled_date.strftime('%Y-%m-%d'),
-                'scheduled_time': pickup.scheduled_time,
-                'status': pickup.status,
-                'is_expired': pickup.is_expired
-            }
-        except:
+        except ObjectDoesNotExist:
             pass
     
-    # Add restriction information if user cannot apply
-    if not can_apply and restriction_info:
-        response_data['restriction_info'] = {
-            'days_remaining': restriction_info['days_remaining'],
-            'restriction_days': restriction_info['restriction_days']
+    return Response(application_status(
+        recent_application, can_apply, restriction_info, pickup, pickup.is_expired if pickup else None
+    ))
+
+
+def report_applications(request):
+    """
+    Applications a report covers (see requested_round); ``?round=<id>`` of
+    an archived round reads its cold storage table instead
+    """
+    from core.cold_storage import cold_model, cold_table_exists
+
+    value = request.query_params.get('round', '')
+    if value.isdigit() and cold_table_exists(Application) and DistributionRound.objects.filter(
+        id=value, status='ARCHIVED'
+    ).exists():
+        return cold_model(Application).objects.filter(round_id=value)
+    return Application.objects.filter(**requested_round(request))
+
+
+def grouped_totals(queryset, field):
+    return list(queryset.values(field).annotate(**HOUSEHOLD_TOTALS).order_by(field))
+
+
+def histogram(queryset, field):
+    return list(queryset.values(field).annotate(applications=Count('id')).order_by(field))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def demographics_report(request):
+    """Household size, children and elderly served, aggregated in the database"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    period = request.query_params.get('period', 'month')
+    if period not in REPORT_PERIODS:
+        return Response({
+            'success': False,
+            'message': f"Period must be one of: {', '.join(REPORT_PERIODS)}."
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = report_applications(request)
+    for param, lookup in (('from', 'created_at__date__gte'), ('to', 'created_at__date__lte')):
+        value = request.query_params.get(param)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                return Response({
+                    'success': False,
+                    'message': f"'{param}' must be a date (YYYY-MM-DD)."
+                }, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{lookup: parsed})
+    if request.query_params.get('status'):
+        queryset = queryset.filter(status=request.query_params['status'])
+    if request.query_params.get('package'):
+        queryset = queryset.filter(selected_package=request.query_params['package'])
+
+    by_period = list(
+        queryset.annotate(period=REPORT_PERIODS[period]('created_at'))
+        .values('period').annotate(**HOUSEHOLD_TOTALS).order_by('period')
+    )
+    return Response({
+        'success': True,
+        'data': {
+            'totals': queryset.aggregate(**HOUSEHOLD_TOTALS),
+            'by_package': grouped_totals(queryset, 'selected_package'),
+            'by_status': grouped_totals(queryset, 'status'),
+            'by_period': by_period,
+            'family_size_distribution': histogram(queryset, 'family_size'),
+            'children_distribution': histogram(queryset, 'children_count'),
+            'elderly_distribution': histogram(queryset, 'elderly_count'),
         }
-    
-    return Response(response_data)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def household_duplicates(request, application_id):
+    """Other applications the dedup job placed in this application's household"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    membership = HouseholdClusterMember.objects.filter(application_id=application_id).first()
+    if membership is None:
+        return Response({'success': True, 'duplicates': []})
+
+    others = HouseholdClusterMember.objects.filter(cluster_id=membership.cluster_id).exclude(
+        application_id=application_id
+    ).select_related('application').order_by('-application__created_at')
+    return Response({
+        'success': True,
+        'cluster_id': membership.cluster_id,
+        'duplicates': [
+            {
+                'id': member.application.id,
+                'reference_number': member.application.reference_number,
+                'full_name': member.application.get_full_name(),
+                'phone': member.application.phone,
+                'address': member.application.address,
+                'status': member.application.status,
+                'submitted_date': member.application.created_at.date(),
+                'score': member.score,
+            }
+            for member in others
+        ]
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def distribution_rounds(request):
+    """Distribution rounds with their live application counts"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    current = DistributionRound.current()
+    all_rounds = DistributionRound.objects.annotate(application_count=Count('applications'))
+    return Response({
+        'success': True,
+        'current_round': current.id if current else None,
+        'rounds': [
+            {
+                'id': distribution_round.id,
+                'name': distribution_round.name,
+                'opens_on': distribution_round.opens_on,
+                'closes_on': distribution_round.closes_on,
+                'status': distribution_round.status,
+                'restriction_days': distribution_round.restriction_days,
+                'one_application_per_phone': distribution_round.one_application_per_phone,
+                'application_count': distribution_round.application_count,
+            }
+            for distribution_round in all_rounds
+        ]
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def close_distribution_round(request, round_id):
+    """Close a round now and queue moving its applications and pickups to cold storage"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        distribution_round = DistributionRound.objects.get(id=round_id)
+    except DistributionRound.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Distribution round not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    if distribution_round.status == 'ARCHIVED':
+        return Response({
+            'success': False,
+            'message': 'This round has already been closed and archived.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Archiving moves every row of the round; `close_round --queued` does it off the request path
+    rounds.queue_archive(distribution_round)
+    audit.record(request, 'UPDATE', distribution_round, status=distribution_round.status)
+    return Response({
+        'success': True,
+        'message': f'{distribution_round.name} closed; it will be archived shortly.',
+        'status': distribution_round.status
+    }, status=status.HTTP_202_ACCEPTED)
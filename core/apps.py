@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers the system checks)
+        from .middleware import install_query_observer
+
+        connection_created.connect(install_query_observer, dispatch_uid='core.query_observer')
@@ -0,0 +1,349 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``manage.py build_assets`` (run after collectstatic) writes everything into
+ASSETS['OUTPUT_DIR'] under content-hashed names, each with ``.gz`` and, when
+the ``brotli`` package is installed, ``.br`` siblings:
+
+* the site's own CSS/JS, minified, and its images, re-encoded;
+* one bundle per ``{% pagescript %}`` block in the templates, so a page's
+  script is downloaded once and cached instead of riding along in every
+  HTML response.
+
+``manifest.json`` maps source names to built ones. The ``{% asset %}`` and
+``{% pagescript %}`` tags (core.templatetags.assets) read it and fall back to
+STATIC_URL / an inline ``<script>`` for anything not built, so nothing breaks
+before the first build or when a template changed since the last one.
+``serve_asset`` (core.views) answers ASSETS['URL'] with the best encoding the
+client accepts and a one-year immutable Cache-Control.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings without it
+    brotli = None
+
+COMPRESSIBLE = {'.js', '.css', '.svg', '.json', '.txt'}
+IMAGES = {'.jpg', '.jpeg', '.png'}
+
+_manifest = {'mtime': None, 'data': {'files': {}, 'bundles': {}}}
+
+
+def get_options():
+    options = {
+        'ENABLED': True,
+        'URL': '/assets/',
+        'SOURCE_DIR': Path(settings.BASE_DIR) / 'static',
+        'SOURCE_PATTERNS': ['css/*.css', 'js/*.js', 'images/*'],
+        'OUTPUT_DIR': Path(settings.BASE_DIR) / 'static_dist',
+        'IMAGE_MAX_WIDTH': 1920,
+        'JPEG_QUALITY': 80,
+        'MAX_AGE': 365 * 24 * 3600,
+    }
+    options.update(getattr(settings, 'ASSETS', {}))
+    return options
+
+
+def content_hash(text):
+    if isinstance(text, str):
+        text = text.encode()
+    return hashlib.sha256(text).hexdigest()[:12]
+
+
+# Manifest
+
+def load_manifest():
+    """The current manifest, re-read whenever build_assets rewrites it"""
+    options = get_options()
+    path = Path(options['OUTPUT_DIR']) / 'manifest.json'
+    try:
+        mtime = path.stat().st_mtime if options['ENABLED'] else None
+    except OSError:
+        mtime = None
+    if mtime != _manifest['mtime']:
+        data = {'files': {}, 'bundles': {}}
+        if mtime is not None:
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                pass
+        _manifest.update(mtime=mtime, data=data)
+    return _manifest['data']
+
+
+def manifest_version():
+    """Changes with every build; part of cache keys for rendered pages"""
+    return load_manifest().get('version', '')
+
+
+def asset_url(name):
+    """URL of the built copy of static file ``name``, or None if there is none"""
+    built = load_manifest()['files'].get(name)
+    return get_options()['URL'] + built if built else None
+
+
+def bundle_url(source_hash):
+    built = load_manifest()['bundles'].get(source_hash)
+    return get_options()['URL'] + built if built else None
+
+
+# Minifiers. Conservative: comments and indentation go, line breaks stay so
+# automatic semicolon insertion behaves exactly as in the source.
+
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^') | {''}
+WORD = re.compile(r'[A-Za-z0-9_$]+')
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else'}
+
+
+def minify_js(source):
+    out = []
+    line = []
+    # Stack of open template literals; each entry is the brace depth of the
+    # ${...} expression currently open inside it, or None inside its text
+    templates = []
+    i, n = 0, len(source)
+    last = ''  # last significant token (char or word) outside comments
+
+    def flush_line():
+        text = ''.join(line).strip()
+        if text:
+            out.append(text)
+        line.clear()
+
+    while i < n:
+        c = source[i]
+        in_template_text = templates and templates[-1] is None
+        if in_template_text:
+            if c == '\\':
+                line.append(source[i:i + 2])
+                i += 2
+            elif c == '`':
+                templates.pop()
+                line.append(c)
+                last = '`'
+                i += 1
+            elif source.startswith('${', i):
+                templates[-1] = 0
+                line.append('${')
+                i += 2
+            elif c == '\n':
+                # Newlines inside a template literal are part of the string
+                line.append(c)
+                i += 1
+            else:
+                line.append(c)
+                i += 1
+            continue
+
+        if c in '\'"':
+            j = i + 1
+            while j < n and source[j] != c and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            line.append(source[i:j + 1])
+            last = c
+            i = j + 1
+        elif c == '`':
+            templates.append(None)
+            line.append(c)
+            i += 1
+        elif source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j == -1 else j
+        elif source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            i = n if j == -1 else j + 2
+            line.append(' ')
+        elif c == '/' and (last in REGEX_PRECEDERS or last in REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and source[j].isalnum():
+                j += 1
+            line.append(source[i:j])
+            last = '/re'
+            i = j
+        elif c == '\n':
+            flush_line()
+            i += 1
+        elif c in ' \t\r':
+            if line and line[-1] != ' ':
+                line.append(' ')
+            i += 1
+        else:
+            if templates and c == '{':
+                templates[-1] += 1
+            elif templates and c == '}':
+                if templates[-1] == 0:
+                    templates[-1] = None
+                else:
+                    templates[-1] -= 1
+            match = WORD.match(source, i)
+            if match:
+                line.append(match.group())
+                last = match.group()
+                i = match.end()
+            else:
+                line.append(c)
+                last = c
+                i += 1
+    flush_line()
+    return '\n'.join(out) + '\n'
+
+
+def minify_css(source):
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    for index in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[index], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        parts[index] = re.sub(r'\s*([{};,])\s*', r'\1', text)
+    return ''.join(parts).replace(';}', '}').strip() + '\n'
+
+
+# Build
+
+def compress(path):
+    """Write ``path.gz`` (and ``path.br``) next to ``path``"""
+    data = path.read_bytes()
+    with open(f'{path}.gz', 'wb') as handle:
+        # mtime=0 keeps the output identical between builds
+        with gzip.GzipFile(fileobj=handle, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+    if brotli is not None:
+        Path(f'{path}.br').write_bytes(brotli.compress(data, quality=11))
+
+
+def hashed_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{content_hash(data)}{ext}'
+
+
+def write_output(output_dir, name, data):
+    path = Path(output_dir) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if path.suffix in COMPRESSIBLE:
+        compress(path)
+    return path
+
+
+def optimize_image(path, options):
+    """Re-encode a JPEG/PNG: capped width, progressive/optimized; original bytes if that is not smaller"""
+    from io import BytesIO
+    from PIL import Image
+
+    original = path.read_bytes()
+    with Image.open(path) as image:
+        if image.width > options['IMAGE_MAX_WIDTH']:
+            height = round(image.height * options['IMAGE_MAX_WIDTH'] / image.width)
+            image = image.resize((options['IMAGE_MAX_WIDTH'], height), Image.LANCZOS)
+        buffer = BytesIO()
+        if path.suffix.lower() == '.png':
+            image.save(buffer, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(
+                buffer, 'JPEG', quality=options['JPEG_QUALITY'], optimize=True, progressive=True
+            )
+    data = buffer.getvalue()
+    return data if len(data) < len(original) else original
+
+
+def build_file(source_dir, name, options):
+    """Built bytes of static file ``name``"""
+    path = Path(source_dir) / name
+    suffix = path.suffix.lower()
+    if suffix == '.js':
+        return minify_js(path.read_text()).encode()
+    if suffix == '.css':
+        return minify_css(path.read_text()).encode()
+    if suffix in IMAGES:
+        return optimize_image(path, options)
+    return path.read_bytes()
+
+
+def find_page_scripts():
+    """(template name, source hash, script) for every {% pagescript %} block in the project's templates"""
+    from django.template import engines
+    from django.template.utils import get_app_template_dirs
+    from .templatetags.assets import PageScriptNode
+
+    engine = engines['django']
+    dirs = [*engine.engine.dirs, *get_app_template_dirs('templates')]
+    seen = set()
+    for directory in dirs:
+        for path in sorted(Path(directory).rglob('*.html')):
+            name = path.relative_to(directory).as_posix()
+            if name in seen:
+                continue
+            seen.add(name)
+            template = engine.get_template(name).template
+            for node in template.nodelist.get_nodes_by_type(PageScriptNode):
+                yield name, node.source_hash, node.script
+
+
+def template_slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', os.path.splitext(name)[0].lower()).strip('-')
+
+
+def build(clean=False):
+    """
+    Build every asset into OUTPUT_DIR and swap in the new manifest. Files
+    from earlier builds stay (pages rendered before the swap still link
+    them) unless ``clean``. Returns (manifest, [(name, source bytes, built bytes, path)]).
+    """
+    options = get_options()
+    source_dir, output_dir = Path(options['SOURCE_DIR']), Path(options['OUTPUT_DIR'])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'files': {}, 'bundles': {}}
+    report = []
+
+    for pattern in options['SOURCE_PATTERNS']:
+        for path in sorted(source_dir.glob(pattern)):
+            if not path.is_file():
+                continue
+            name = path.relative_to(source_dir).as_posix()
+            data = build_file(source_dir, name, options)
+            built = hashed_name(name, data)
+            write_output(output_dir, built, data)
+            manifest['files'][name] = built
+            report.append((name, path.stat().st_size, len(data), output_dir / built))
+
+    for template_name, source_hash, script in find_page_scripts():
+        if source_hash in manifest['bundles']:
+            continue
+        data = minify_js(script).encode()
+        # Named after the source hash, which is what {% pagescript %} looks up
+        built = f'bundles/{template_slug(template_name)}.{source_hash}.js'
+        write_output(output_dir, built, data)
+        manifest['bundles'][source_hash] = built
+        report.append((f'{template_name} (page script)', len(script.encode()), len(data), output_dir / built))
+
+    manifest['version'] = content_hash(json.dumps(manifest, sort_keys=True))
+    if clean:
+        keep = {*manifest['files'].values(), *manifest['bundles'].values()}
+        for path in output_dir.rglob('*'):
+            name = path.relative_to(output_dir).as_posix()
+            if path.is_file() and name != 'manifest.json' and re.sub(r'\.(gz|br)$', '', name) not in keep:
+                path.unlink()
+    # Written last and atomically: readers switch to the new build all at once
+    temporary = output_dir / 'manifest.json.tmp'
+    temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(temporary, output_dir / 'manifest.json')
+    return manifest, report
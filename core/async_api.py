@@ -0,0 +1,125 @@
+"""
+Async counterparts of the public DRF endpoints, for ASGI deployments.
+
+DRF views are synchronous, so under ASGI every in-flight request would hold
+a worker thread. The anonymous read endpoints therefore also have async
+versions built on Django's async ORM; ``public_api`` gives them DRF's
+method check, request parsing, throttles and JSON rendering, so both
+versions give the same status codes and bodies (HEAD is allowed wherever GET
+is, and OPTIONS answers with DRF's metadata). ``pick_view`` wires the async version
+when ``ASYNC_PUBLIC_VIEWS`` is on (asgi.py turns it on).
+"""
+import json
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders, formatting
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def pick_view(sync_view, async_view):
+    return async_view if getattr(settings, 'ASYNC_PUBLIC_VIEWS', False) else sync_view
+
+
+def json_response(data, status=200, headers=None):
+    """Render ``data`` as DRF's JSONRenderer does"""
+    return JsonResponse(
+        data, status=status, headers=headers, safe=False, encoder=encoders.JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def parse_data(request):
+    """request.data as DRF would parse it; raises ValueError on malformed JSON"""
+    if request.method in ('GET', 'HEAD'):
+        return {}
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+async def check_throttles(request, throttle_classes):
+    """DRF's throttle check for async views; returns a 429 response or None"""
+    durations = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not await throttle.aallow_request(request, None):
+            durations.append(throttle.wait())
+    if not durations:
+        return None
+    waits = [duration for duration in durations if duration is not None]
+    exc = Throttled(max(waits) if waits else None)
+    headers = {'Retry-After': '%d' % math.ceil(exc.wait)} if exc.wait is not None else None
+    return json_response({'detail': exc.detail}, status=429, headers=headers)
+
+
+def metadata(view):
+    """The body DRF's SimpleMetadata gives an OPTIONS request to a function view"""
+    return {
+        'name': formatting.camelcase_to_spaces(view.__name__),
+        'description': formatting.dedent(view.__doc__ or ''),
+        'renders': [renderer.media_type for renderer in api_settings.DEFAULT_RENDERER_CLASSES],
+        'parses': [parser.media_type for parser in api_settings.DEFAULT_PARSER_CLASSES],
+    }
+
+
+def public_api(methods, throttle_classes=()):
+    """@api_view for async anonymous endpoints, with request.data and throttles"""
+    methods = [*methods, 'HEAD'] if 'GET' in methods and 'HEAD' not in methods else list(methods)
+    allowed = ', '.join([*methods, 'OPTIONS'])
+
+    def decorator(view):
+        options_body = metadata(view)
+
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method == 'OPTIONS':
+                response = await check_throttles(request, throttle_classes) or json_response(options_body)
+            elif request.method not in methods:
+                response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            else:
+                try:
+                    request.data = parse_data(request)
+                except ValueError as exc:
+                    return json_response({'detail': f'JSON parse error - {exc}'}, status=400)
+                response = await check_throttles(request, throttle_classes)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+            response['Allow'] = allowed
+            response['Vary'] = 'Accept'
+            return response
+        return wrapper
+    return decorator
+
+
+async def paginate(request, queryset, serializer_class):
+    """DRF's PageNumberPagination over an async queryset"""
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    page_count = max(1, math.ceil(count / page_size))
+    page = request.GET.get('page', 1)
+    try:
+        page = page_count if page == 'last' else int(page)
+    except (TypeError, ValueError):
+        page = 0
+    if not 1 <= page <= page_count:
+        return json_response({'detail': 'Invalid page.'}, status=404)
+
+    start = (page - 1) * page_size
+    objects = [obj async for obj in queryset[start:start + page_size]]
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return json_response({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < page_count else None,
+        'previous': previous,
+        'results': serializer_class(objects, many=True).data,
+    })
@@ -0,0 +1,133 @@
+"""
+Buffered audit trail.
+
+``record()`` builds an unsaved ``AuditLog`` row with a field-level diff and
+appends it to a per-worker buffer; nothing is written on the request path.
+Entries for work done inside a transaction are only buffered once that
+transaction commits, so rolled-back actions leave no trail. The buffer is
+written with a single ``bulk_create`` once it holds ``MAX_ENTRIES`` rows or
+its oldest row is ``MAX_AGE_SECONDS`` old (checked on every record and at
+the end of every request), and when the worker exits.
+
+Typical use::
+
+    before = audit.snapshot(application, ['status', 'reviewed_by'])
+    ... mutate and save ...
+    audit.record(request, 'APPROVE', application, audit.diff(before, application))
+"""
+import atexit
+import datetime
+import decimal
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.utils import timezone
+
+from .throttling import client_ip
+
+logger = logging.getLogger('relief_app')
+
+_lock = threading.Lock()
+_buffer = []
+_oldest = None
+
+
+def _options():
+    options = {'MAX_ENTRIES': 100, 'MAX_AGE_SECONDS': 2.0}
+    options.update(getattr(settings, 'AUDIT_LOG', {}))
+    return options
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.date, datetime.time, decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def snapshot(instance, fields):
+    """Capture the current values of ``fields`` (FKs by id)"""
+    values = {}
+    for name in fields:
+        attname = instance._meta.get_field(name).attname
+        values[name] = _jsonable(getattr(instance, attname))
+    return values
+
+
+def diff(before, instance):
+    """``{field: [old, new]}`` for the snapshotted fields that changed"""
+    after = snapshot(instance, before)
+    return {name: [before[name], after[name]] for name in before if before[name] != after[name]}
+
+
+def record(request, action, instance, changes=None, **additional_info):
+    """Queue an audit entry for ``action`` on ``instance``"""
+    from .models import AuditLog
+
+    user = getattr(request, 'user', None)
+    entry = AuditLog(
+        # When the action happened, not when the buffer is flushed
+        created_at=timezone.now(),
+        user=user if user is not None and user.is_authenticated else None,
+        action=action,
+        model_name=instance._meta.label,
+        object_id=str(instance.pk),
+        changes=changes or None,
+        ip_address=(client_ip(request) or None) if request is not None else None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:500] if request is not None else '',
+        additional_info=additional_info or None,
+    )
+    transaction.on_commit(lambda: _append(entry))
+
+
+def _append(entry):
+    global _oldest
+    with _lock:
+        if not _buffer:
+            _oldest = time.monotonic()
+        _buffer.append(entry)
+    flush_if_due()
+
+
+def flush_if_due(**kwargs):
+    options = _options()
+    with _lock:
+        due = _buffer and (
+            len(_buffer) >= options['MAX_ENTRIES']
+            or time.monotonic() - _oldest >= options['MAX_AGE_SECONDS']
+        )
+    if due:
+        flush()
+
+
+def flush():
+    """Write every buffered entry with one bulk_create; returns the count"""
+    global _oldest
+    from .models import AuditLog
+
+    with _lock:
+        entries = _buffer[:]
+        _buffer.clear()
+        _oldest = None
+    if not entries:
+        return 0
+    try:
+        AuditLog.objects.bulk_create(entries)
+    except Exception:
+        # Losing the trail must not break the action it describes
+        logger.exception('Could not write %d audit log entries', len(entries))
+        return 0
+    return len(entries)
+
+
+def pending():
+    with _lock:
+        return len(_buffer)
+
+
+request_finished.connect(flush_if_due, dispatch_uid='core.audit.flush_if_due')
+atexit.register(flush)
@@ -0,0 +1,292 @@
+"""
+Micro-benchmarks for the hot paths, driven by ``manage.py benchmark``.
+
+Each benchmark times one workload over data seeded by generate_dataset at
+each of SIZES applications. Examples of a workload: validating the seeded
+phone numbers, or serializing an application list page. The command runs
+in a throwaway test database, so real data is never touched. For every
+benchmark and size it records:
+
+* the fastest of REPEAT runs, in total and per item;
+* the queries one run makes.
+
+A JSON baseline keeps those figures. Any later run fails on a regression
+against it:
+
+* time per item grows by more than TOLERANCE (and by more than
+  MIN_DELTA_US, so noise on sub-microsecond functions does not count);
+* the query count grows at all.
+
+Timings only compare on the machine that saved the baseline. Query counts
+compare anywhere.
+"""
+import itertools
+import platform
+import time
+from unittest import mock
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+BENCHMARKS = {}
+
+
+def get_options():
+    options = {
+        'SIZES': [100, 1000, 5000],
+        'REPEAT': 5,
+        'SAMPLE': 200,
+        'QR_SAMPLE': 10,
+        'TOLERANCE': 0.25,
+        'MIN_DELTA_US': 5,
+        'RESULTS_DIR': Path(settings.BASE_DIR) / 'benchmark_results',
+        'BASELINE': Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json',
+    }
+    options.update(getattr(settings, 'BENCHMARKS', {}))
+    return options
+
+
+def benchmark(name):
+    """
+    Register ``setup(size, options)``. It runs against the seeded data and
+    returns ``(work, items)``: a callable that runs the workload once, and
+    how many items that workload covers.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# Benchmarks
+
+@benchmark('is_valid_nigerian_phone')
+def phone_validation(size, options):
+    from applications.models import Application
+    from applications.views import is_valid_nigerian_phone
+
+    phones = list(Application.objects.values_list('phone', flat=True)[:size])
+    return (lambda: [is_valid_nigerian_phone(phone) for phone in phones]), len(phones)
+
+
+@benchmark('can_user_apply')
+def eligibility(size, options):
+    from applications.models import Application
+    from applications.views import can_user_apply
+
+    # Returning applicants and first-timers
+    phones = list(Application.objects.order_by('id').values_list('phone', flat=True)[:options['SAMPLE'] // 2])
+    phones += [f'0809{index:07d}' for index in range(options['SAMPLE'] - len(phones))]
+    return (lambda: [can_user_apply(phone) for phone in phones]), len(phones)
+
+
+@benchmark('Pickup.generate_qr_code')
+def qr_codes(size, options):
+    from pickups.models import Pickup
+
+    pickups = list(Pickup.objects.select_related('application')[:options['QR_SAMPLE']])
+    return (lambda: [pickup.generate_qr_code() for pickup in pickups]), len(pickups)
+
+
+@benchmark('Pickup.is_expired')
+def expiry(size, options):
+    from pickups.models import Pickup
+
+    pickups = list(Pickup.objects.all()[:size])
+    return (lambda: [pickup.is_expired for pickup in pickups]), len(pickups)
+
+
+@benchmark('package_contents')
+def contents(size, options):
+    from applications.models import Application
+    from pickups.views import package_contents
+
+    applications = list(Application.objects.select_related('package')[:size])
+    return (lambda: [package_contents(application) for application in applications]), len(applications)
+
+
+@benchmark('ApplicationSerializer')
+def application_list(size, options):
+    from applications.serializers import ApplicationSerializer
+    from applications.views import ApplicationListView
+
+    queryset = ApplicationListView.queryset.order_by('-created_at')[:size]
+    return (lambda: ApplicationSerializer(queryset.all(), many=True).data), queryset.count()
+
+
+@benchmark('PickupSerializer')
+def pickup_list(size, options):
+    from pickups.serializers import PickupSerializer
+    from pickups.views import PickupListView
+
+    queryset = PickupListView.queryset.order_by('-id')[:size]
+    return (lambda: PickupSerializer(queryset.all(), many=True).data), queryset.count()
+
+
+@benchmark('CalendarEntrySerializer')
+def calendar_day(size, options):
+    from pickups.models import Pickup
+    from pickups.serializers import CalendarEntrySerializer
+
+    queryset = Pickup.objects.select_related('application__package', 'site').order_by('scheduled_time', 'id')[:size]
+    return (lambda: CalendarEntrySerializer(queryset.all(), many=True).data), queryset.count()
+
+
+@benchmark('PackageListSerializer')
+def package_list(size, options):
+    from packages.serializers import PackageListSerializer
+    from packages.views import PackageListView
+
+    queryset = PackageListView.queryset
+    return (lambda: PackageListSerializer(queryset.all(), many=True).data), queryset.count()
+
+
+# Fresh phones, never restricted, across every run of every submission benchmark. Four
+# random digits a month make reference numbers collide within a few hundred
+# submissions; that limit is not what is measured, so they come from here too
+_submitters = itertools.count(1)
+
+
+def _submissions(options, queued):
+    """Submit SAMPLE fresh applications through the view, synchronously or into the queue"""
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+    from django.utils import timezone
+
+    from applications.models import Application
+    from applications.views import submit_application
+
+    factory = RequestFactory()
+    payload = {
+        'first_name': 'Bola', 'last_name': 'Ade', 'address': '7 Bodija, Ibadan', 'family_size': 3,
+        'employment_status': 'unemployed', 'tec_member': 'no', 'selected_package': 'small_basic',
+        'preferred_date': timezone.localdate().isoformat(), 'preferred_time': 'morning', 'terms_agreement': True,
+    }
+    expected = 202 if queued else 201
+    config = {**settings.RELIEF_APP_CONFIG, 'ASYNC_SUBMISSIONS': queued}
+
+    def work():
+        with override_settings(RELIEF_APP_CONFIG=config), mock.patch.object(
+            Application, 'generate_reference_number', lambda self: f'BENCH{next(_submitters):09d}'
+        ):
+            for _ in range(options['SAMPLE']):
+                request = factory.post('/api/applications/submit/', {
+                    **payload, 'phone': f'0705{next(_submitters):07d}'
+                }, content_type='application/json')
+                response = submit_application(request)
+                assert response.status_code == expected, response.data
+    return work, options['SAMPLE']
+
+
+@benchmark('submit_application')
+def submit_sync(size, options):
+    return _submissions(options, queued=False)
+
+
+@benchmark('submit_application (queued)')
+def submit_queued(size, options):
+    return _submissions(options, queued=True)
+
+
+@benchmark('submit_application (queued + drained)')
+def submit_and_drain(size, options):
+    from applications import submission_queue
+
+    submit, items = _submissions(options, queued=True)
+
+    def work():
+        submit()
+        submission_queue.drain()
+    return work, items
+
+
+# Running
+
+@contextmanager
+def seeded(size):
+    """``size`` generated applications (with their pickups), rolled back afterwards"""
+    with transaction.atomic():
+        call_command('generate_dataset', applications=size, rounds=3, workers=1, seed=0, stdout=StringIO())
+        cache.clear()
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True)
+    cache.clear()
+
+
+def measure(work, items, repeat):
+    # The warm-up fills caches and compiles queries, as in a long-running worker
+    work()
+    # The log keeps only the last 9000 queries; once full it would count none
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as queries:
+        work()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        work()
+        timings.append(time.perf_counter() - started)
+    # Noise only ever adds time, so the fastest run is the steadiest figure
+    fastest = min(timings)
+    return {
+        'items': items,
+        'min_ms': round(fastest * 1000, 3),
+        'median_ms': round(sorted(timings)[len(timings) // 2] * 1000, 3),
+        'per_item_us': round(fastest / max(items, 1) * 1e6, 3),
+        'queries': len(queries),
+    }
+
+
+def run(names=None, sizes=None, repeat=None, progress=None):
+    """{benchmark: {size: figures}} for the named benchmarks (all by default)"""
+    options = get_options()
+    names = names or list(BENCHMARKS)
+    results = {name: {} for name in names}
+    for size in sizes or options['SIZES']:
+        with seeded(size):
+            for name in names:
+                work, items = BENCHMARKS[name](size, options)
+                results[name][str(size)] = measure(work, items, repeat or options['REPEAT'])
+                if progress:
+                    progress(name, size, results[name][str(size)])
+    return results
+
+
+def machine():
+    """Where the figures were taken; timings only compare on the same machine"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'database': connection.vendor,
+    }
+
+
+def compare(baseline, results, tolerance=None, min_delta_us=None):
+    """Regressions of ``results`` against ``baseline``: [(benchmark, size, message)]"""
+    options = get_options()
+    tolerance = options['TOLERANCE'] if tolerance is None else tolerance
+    min_delta_us = options['MIN_DELTA_US'] if min_delta_us is None else min_delta_us
+    regressions = []
+    for name, sizes in results.items():
+        for size, current in sizes.items():
+            before = baseline.get(name, {}).get(size)
+            if before is None:
+                continue
+            if current['queries'] > before['queries']:
+                regressions.append((name, size, f"queries {before['queries']} -> {current['queries']}"))
+            slower = current['per_item_us'] - before['per_item_us']
+            if slower > min_delta_us and current['per_item_us'] > before['per_item_us'] * (1 + tolerance):
+                regressions.append((
+                    name, size,
+                    f"{before['per_item_us']:.1f} -> {current['per_item_us']:.1f} us per item "
+                    f"(+{slower / max(before['per_item_us'], 0.001) * 100:.0f}%)"
+                ))
+    return regressions
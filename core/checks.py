@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def throttle_client_header(app_configs, **kwargs):
+    """THROTTLE_CLIENT_HEADER lets any client pick its own throttle bucket"""
+    if getattr(settings, 'THROTTLE_CLIENT_HEADER', '') and not settings.DEBUG:
+        return [Warning(
+            'THROTTLE_CLIENT_HEADER is set with DEBUG off; anyone can dodge the per-IP throttles with it.',
+            hint='Set it only on a server you are load testing.',
+            id='core.W001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def shared_cache(app_configs, **kwargs):
+    """Page locks and stats, throttles and other cross-worker state live in the cache"""
+    from .page_cache import is_shared_cache
+
+    if not is_shared_cache():
+        return [Warning(
+            "CACHES['default'] keeps a separate cache in every process; workers will not share "
+            'throttle buckets, page-cache render locks or page_cache_stats counters.',
+            hint='Use a shared backend such as RedisCache in production.',
+            id='core.W002',
+        )]
+    return []
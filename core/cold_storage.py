@@ -0,0 +1,67 @@
+"""
+Cold storage tables for rows that leave the working set.
+
+Each model gets one ``<table>_archive`` table with the same columns, created
+on first use and given any columns added to the model since. Rows are moved
+with one ``INSERT ... SELECT`` and one ``DELETE`` per batch, inside the
+caller's transaction, so the hot tables and their indexes only hold live
+data while archived rows stay queryable through ``cold_model()``.
+"""
+from django.db import connection
+
+from .partitioning import _column_list, shadow_model
+
+_cold_models = {}
+
+
+def cold_table(model):
+    return f'{model._meta.db_table}_archive'
+
+
+def cold_model(model):
+    table = cold_table(model)
+    if table not in _cold_models:
+        _cold_models[table] = shadow_model(model, table, f'{model.__name__}Archive')
+    return _cold_models[table]
+
+
+def ensure_cold_table(model):
+    """Create or widen the cold table; call outside a transaction (SQLite cannot alter schema inside one)"""
+    cold = cold_model(model)
+    table = cold_table(model)
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            with connection.schema_editor() as editor:
+                editor.create_model(cold)
+            return
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+    for field in cold._meta.local_fields:
+        if field.column not in columns:
+            with connection.schema_editor() as editor:
+                editor.add_field(cold, field)
+
+
+def cold_table_exists(model):
+    return cold_table(model) in connection.introspection.table_names()
+
+
+def move_to_cold(queryset, model=None):
+    """
+    Copy the rows of ``queryset`` into ``model``'s cold table (by default its
+    own model's; pass the model for rows of a rotated partition table) and
+    delete them; returns the count
+    """
+    source = queryset.model
+    model = model or source
+    qn = connection.ops.quote_name
+    attnames = [field.attname for field in source._meta.local_fields]
+    select_sql, params = queryset.order_by().values_list(*attnames).query.sql_with_params()
+    pk_sql, pk_params = queryset.order_by().values_list('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {qn(cold_table(model))} ({_column_list(model)}) {select_sql}', params)
+        moved = cursor.rowcount
+        # Through a subquery so the DELETE never cascades or loads rows
+        cursor.execute(
+            f'DELETE FROM {qn(source._meta.db_table)} WHERE {qn(source._meta.pk.column)} IN ({pk_sql})', pk_params
+        )
+    return moved
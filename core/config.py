@@ -0,0 +1,124 @@
+"""
+Runtime configuration lookups.
+
+Values come from active ``ConfigurationSettings`` rows and fall back to
+``settings.RELIEF_APP_CONFIG``. All active rows are held in a per-process
+snapshot so hot paths can read tunables without a query. Saving a setting
+bumps a ``VersionStamp`` row (see core.version_stamps), which every worker
+sees whatever the cache backend; each compares its snapshot against it at
+most every ``CONFIG_CACHE_CHECK_SECONDS`` and reloads unconditionally after
+``CONFIG_CACHE_MAX_AGE_SECONDS`` (which bounds staleness for rows changed
+without ``save()``).
+"""
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import version_stamps
+
+CONFIG_STAMP = 'config'
+
+_lock = threading.Lock()
+_snapshot = {
+    'values': None,
+    'version': None,
+    'loaded_at': 0.0,
+    'checked_at': 0.0,
+}
+
+
+def _app_config():
+    return getattr(settings, 'RELIEF_APP_CONFIG', {})
+
+
+def get_version():
+    """Read the current shared version stamp (None if never bumped); one query"""
+    return version_stamps.get(CONFIG_STAMP, 0)
+
+
+def get_loaded_version():
+    """The version this process's snapshot was loaded at, without a query while it is fresh"""
+    get_all()
+    return _snapshot['version']
+
+
+def bump_version():
+    """Invalidate every worker's snapshot, including this one"""
+    version_stamps.bump(CONFIG_STAMP)
+    with _lock:
+        _snapshot['values'] = None
+
+
+def _reload():
+    from .models import ConfigurationSettings
+
+    version = get_version()
+    values = dict(
+        ConfigurationSettings.objects.filter(is_active=True).values_list('key', 'value')
+    )
+    now = time.monotonic()
+    _snapshot.update(values=values, version=version, loaded_at=now, checked_at=now)
+    return values
+
+
+def get_all():
+    """Return the cached ``{key: raw_value}`` map of active settings"""
+    config = _app_config()
+    check_seconds = config.get('CONFIG_CACHE_CHECK_SECONDS', 5)
+    max_age = config.get('CONFIG_CACHE_MAX_AGE_SECONDS', 300)
+    now = time.monotonic()
+
+    values = _snapshot['values']
+    if values is not None and now - _snapshot['loaded_at'] < max_age:
+        if now - _snapshot['checked_at'] < check_seconds:
+            return values
+        _snapshot['checked_at'] = now
+        if get_version() == _snapshot['version']:
+            return values
+
+    with _lock:
+        # Another thread may have refreshed while we waited for the lock
+        if _snapshot['values'] is not None and _snapshot['loaded_at'] >= now:
+            return _snapshot['values']
+        return _reload()
+
+
+def get_raw(key, default=None):
+    """Return the raw string value of an active setting"""
+    return get_all().get(key, default)
+
+
+def _coerce(raw, fallback):
+    """Cast a stored string to the type of its RELIEF_APP_CONFIG fallback"""
+    try:
+        if isinstance(fallback, bool):
+            return raw.strip().lower() in ('1', 'true', 'yes', 'on')
+        if isinstance(fallback, int):
+            return int(raw)
+        if isinstance(fallback, float):
+            return float(raw)
+        if isinstance(fallback, (list, dict)):
+            return json.loads(raw)
+    except (TypeError, ValueError):
+        return fallback
+    return raw
+
+
+def get_setting(key, default=None):
+    """
+    Resolve a runtime tunable: ConfigurationSettings first, then
+    RELIEF_APP_CONFIG, then ``default``.
+    """
+    fallback = _app_config().get(key, default)
+    raw = get_raw(key)
+    if raw is None:
+        return fallback
+    return _coerce(raw, fallback)
+
+
+async def aget_setting(key, default=None):
+    """get_setting for async views; a snapshot reload may query the database"""
+    return await sync_to_async(get_setting)(key, default)
@@ -0,0 +1,389 @@
+"""
+Synthetic applications, pickups, notifications and audit rows at production
+scale, for ``manage.py generate_dataset``.
+
+The applications are spread over ``DistributionRound``s that end with an
+open round running today. Each round has its own shape:
+
+* a submission surge in its first days;
+* status mixes: closed rounds are mostly collected, the open one mostly
+  pending;
+* review and pickup delays, and no-shows;
+* pickups for every approved application, across the active distribution
+  sites;
+* the SMS/email notifications and audit entries the real flow leaves behind.
+
+Phones use the Nigerian networks' prefixes in the formats the form accepts.
+About a third of each later round's applicants applied in an earlier round,
+with the same name, phone and address.
+
+The work is cut into fixed chunks of CHUNK_SIZE applications. Each chunk
+draws from its own ``Random`` seeded with the run's seed and the chunk
+position, so the same seed and ``today`` give the same rows however many
+worker processes share the chunks. Rows are written with batched
+``bulk_create``, or ``COPY`` on PostgreSQL.
+"""
+import bisect
+import io
+import json
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+CHUNK_SIZE = 10000
+ROUND_PREFIX = 'Dataset round'
+ROUND_DAYS = 42          # One round every six weeks...
+APPLICATION_DAYS = 14    # ...taking applications for the first two
+REPEAT_RATE = 0.3        # Share of a later round's applicants seen in an earlier one
+
+FIRST_NAMES = [
+    'Adebayo', 'Adaeze', 'Aisha', 'Babatunde', 'Bisola', 'Chiamaka', 'Chinedu', 'Damilola', 'Emeka',
+    'Fatima', 'Folake', 'Funmilayo', 'Ibrahim', 'Ifeoma', 'Kehinde', 'Kunle', 'Mariam', 'Musa',
+    'Ngozi', 'Obinna', 'Oluwaseun', 'Omolara', 'Segun', 'Taiwo', 'Temitope', 'Tunde', 'Uche',
+    'Yetunde', 'Yusuf', 'Zainab', 'Abiodun', 'Grace', 'Blessing', 'Samuel', 'Esther', 'Joseph',
+]
+LAST_NAMES = [
+    'Adeyemi', 'Afolabi', 'Akinola', 'Okafor', 'Okonkwo', 'Eze', 'Nwosu', 'Bello', 'Abubakar',
+    'Ogunleye', 'Oladipo', 'Olawale', 'Balogun', 'Adewale', 'Ojo', 'Ajayi', 'Oyelaran', 'Adamu',
+    'Lawal', 'Salami', 'Usman', 'Ibekwe', 'Chukwu', 'Fashola', 'Ogundipe', 'Adebisi', 'Alabi',
+]
+STREETS = [
+    'Ring Road', 'Dugbe', 'Bodija', 'Mokola', 'Challenge', 'Iwo Road', 'Agodi', 'Sango', 'Oluyole',
+    'Akobo', 'Apata', 'Ojoo', 'Eleyele', 'Idi-Ape', 'Molete', 'Oke-Ado', 'Jericho', 'Samonda',
+]
+# MTN, Glo, Airtel and 9mobile
+NETWORK_PREFIXES = [
+    '0803', '0806', '0813', '0816', '0810', '0814', '0903', '0906', '0703', '0706', '0704',
+    '0805', '0807', '0815', '0811', '0905', '0802', '0808', '0812', '0701', '0902', '0901',
+    '0907', '0708', '0809', '0817', '0818', '0909', '0908',
+]
+EMPLOYMENT = {
+    'unemployed': 30, 'self_employed': 22, 'part_time': 14, 'full_time': 10,
+    'retired': 10, 'student': 8, 'disabled': 6,
+}
+FAMILY_SIZES = {1: 4, 2: 8, 3: 12, 4: 16, 5: 16, 6: 13, 7: 10, 8: 8, 9: 6, 10: 7}
+SPECIAL_NEEDS = ['Diabetic', 'Hypertension', 'Nursing mother', 'Wheelchair user', 'Sickle cell', 'No pork']
+# (first hour, hours) of each pickup slot
+SLOTS = {'morning': (9, 3), 'afternoon': (13, 3), 'evening': (16, 2)}
+SLOT_WEIGHTS = {'morning': 50, 'afternoon': 35, 'evening': 15}
+CLOSED_ROUND_STATUSES = {'PICKED_UP': 68, 'APPROVED': 10, 'REJECTED': 16, 'PENDING': 6}
+OPEN_ROUND_STATUSES = {'PENDING': 50, 'APPROVED': 28, 'PICKED_UP': 10, 'REJECTED': 12}
+IP_PREFIXES = ['102.89', '105.112', '197.210', '41.58', '129.205']
+USER_AGENTS = [
+    'Mozilla/5.0 (Linux; Android 12; TECNO KG5) AppleWebKit/537.36 Chrome/118.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 11; itel A571W) AppleWebKit/537.36 Chrome/116.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/119.0 Safari/537.36',
+]
+
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def plan_rounds(applications, rounds, today):
+    """(name, opens_on, closes_on, status, first index, stop index) per round, oldest first; later rounds are bigger"""
+    weights = [1 + 0.15 * position for position in range(rounds)]
+    bounds = [round(applications * sum(weights[:position]) / sum(weights)) for position in range(rounds + 1)]
+    planned = []
+    for position in range(rounds):
+        opens_on = today - timedelta(days=10 + ROUND_DAYS * (rounds - 1 - position))
+        current = position == rounds - 1
+        planned.append((
+            f'{ROUND_PREFIX} {position + 1}', opens_on, opens_on + timedelta(days=APPLICATION_DAYS - 1),
+            'OPEN' if current else 'CLOSED', bounds[position], bounds[position + 1],
+        ))
+    return planned
+
+
+def person(seed, applicant):
+    """Name, phone and household of applicant number ``applicant``, the same in every round"""
+    rng = random.Random(f'{seed}:person:{applicant}')
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    network, subscriber = rng.choice(NETWORK_PREFIXES), f'{rng.randrange(10 ** 7):07d}'
+    style = rng.random()
+    # is_valid_nigerian_phone only takes 080/081 numbers in international form
+    if style < 0.85 or network[:3] not in ('080', '081'):
+        phone = network + subscriber
+    elif style < 0.95:
+        phone = f'+234{network[1:]}{subscriber}'
+    else:
+        phone = f'234{network[1:]}{subscriber}'
+    family_size = weighted(rng, FAMILY_SIZES)
+    children = rng.randint(0, max(0, family_size - 1)) if family_size > 1 else 0
+    elderly = min(family_size - children, rng.choices([0, 1, 2], [70, 22, 8])[0])
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'phone': phone,
+        'email': f'{first_name}.{last_name}{rng.randint(1, 99)}@gmail.com'.lower() if rng.random() < 0.3 else '',
+        'address': f'{rng.randint(1, 120)} {rng.choice(STREETS)}, Ibadan',
+        'family_size': family_size,
+        'children_count': children,
+        'elderly_count': elderly,
+        'employment_status': 'retired' if elderly and rng.random() < 0.5 else weighted(rng, EMPLOYMENT),
+        'special_needs': rng.choice(SPECIAL_NEEDS) if rng.random() < 0.12 else '',
+        'tec_member': 'yes' if rng.random() < 0.35 else 'no',
+    }
+
+
+def pickup_code(plan, index):
+    # An odd multiplier permutes the 48-bit space, so codes are unique and look random
+    return f"GCR{(index * 0x9E3779B97F4B + plan['code_offset']) % 2 ** 48:012X}"
+
+
+def at(day, hour, seconds, tz):
+    return datetime.combine(day, time(hour), tzinfo=tz) + timedelta(seconds=seconds)
+
+
+def build_chunk(plan, start, stop):
+    """Unsaved rows for applications ``start`` to ``stop``: {model label: [instances]}"""
+    from applications.models import Application
+    from applications.priority import score
+    from notifications.models import Notification
+    from pickups.models import Pickup
+    from pickups.views import time_display
+    from .models import AuditLog
+
+    rng = random.Random(f"{plan['seed']}:chunk:{start}")
+    tz = timezone.get_current_timezone()
+    now = plan['now']
+    today = now.astimezone(tz).date()
+    round_starts = [planned['first_index'] for planned in plan['rounds']]
+    rows = {'applications.Application': [], 'pickups.Pickup': [], 'notifications.Notification': [], 'core.AuditLog': []}
+
+    def notify(application, moment, message, kind='SMS', recipient=None):
+        failed = rng.random() < 0.035
+        rows['notifications.Notification'].append(Notification(
+            application=application, notification_type=kind, recipient=recipient or application.phone,
+            message=message, status='FAILED' if failed else 'SENT',
+            sent_at=None if failed else moment + timedelta(seconds=rng.randint(2, 40)),
+            error_message=rng.choice(['Gateway timeout', 'Invalid destination', 'Insufficient credit']) if failed else '',
+            created_at=moment, updated_at=moment,
+        ))
+
+    def log(action, instance, moment, user_id, changes, **additional_info):
+        rows['core.AuditLog'].append(AuditLog(
+            user_id=user_id, action=action, model_name=instance._meta.label, object_id=str(instance.pk),
+            changes=changes, additional_info=additional_info or None,
+            ip_address=f'{rng.choice(IP_PREFIXES)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+            user_agent=rng.choice(USER_AGENTS), created_at=moment, updated_at=moment,
+        ))
+
+    for index in range(start, stop):
+        distribution_round = plan['rounds'][bisect.bisect_right(round_starts, index) - 1]
+        current = distribution_round['status'] == 'OPEN'
+        opens_on = distribution_round['opens_on']
+        closes_on = today if current else distribution_round['closes_on']
+
+        repeat = distribution_round['first_index'] > 0 and rng.random() < REPEAT_RATE
+        applicant = person(plan['seed'], rng.randrange(distribution_round['first_index']) if repeat else index)
+        if repeat:
+            applicant['family_size'] = max(1, applicant['family_size'] + rng.choice([-1, 0, 0, 1]))
+            applicant['children_count'] = min(applicant['children_count'], applicant['family_size'] - 1)
+            applicant['elderly_count'] = min(applicant['elderly_count'], applicant['family_size'] - applicant['children_count'])
+
+        # Most submissions land in the first days of a round
+        day = opens_on + timedelta(days=int(rng.betavariate(1.2, 3.0) * ((closes_on - opens_on).days + 1)))
+        created = min(at(day, 7, rng.randrange(15 * 3600), tz), now - timedelta(minutes=rng.randint(1, 120)))
+
+        if applicant['elderly_count'] and rng.random() < 0.6:
+            package_type = 'senior'
+        elif rng.random() < 0.08:
+            package_type = 'emergency'
+        else:
+            package_type = 'small_basic' if applicant['family_size'] <= 3 else 'medium_basic'
+        if package_type not in plan['packages']:
+            package_type = rng.choice(sorted(plan['packages']))
+
+        preferred_time = weighted(rng, SLOT_WEIGHTS)
+        preferred_date = created.date() + timedelta(days=rng.randint(2, 10))
+        status = weighted(rng, OPEN_ROUND_STATUSES if current else CLOSED_ROUND_STATUSES)
+        reviewed_at = None
+        if status != 'PENDING':
+            reviewed_at = created + timedelta(hours=min(240, max(0.2, rng.expovariate(1 / 30))))
+            if reviewed_at > now:
+                status, reviewed_at = 'PENDING', None
+        picked_up_at = None
+        if status == 'PICKED_UP':
+            first_hour, hours = SLOTS[preferred_time]
+            picked_up_at = max(
+                at(preferred_date, first_hour, rng.randrange(hours * 3600), tz), reviewed_at + timedelta(hours=1)
+            )
+            if picked_up_at > now:
+                status, picked_up_at = 'APPROVED', None
+        reviewer_id = rng.choice(plan['reviewers']) if reviewed_at else None
+
+        application = Application(
+            id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            # Seven-digit sequence instead of the form's four random digits, so a million stay unique
+            reference_number=f'GCR{created:%y%m}{index:07d}',
+            round_id=distribution_round['id'],
+            **applicant,
+            selected_package=package_type,
+            package_id=plan['packages'][package_type],
+            package_flexibility=rng.random() < 0.4,
+            preferred_date=preferred_date,
+            preferred_time=preferred_time,
+            alternative_date=preferred_date + timedelta(days=rng.randint(1, 4)) if rng.random() < 0.3 else None,
+            alternative_time=weighted(rng, SLOT_WEIGHTS) if rng.random() < 0.3 else '',
+            transportation_help=rng.random() < 0.1,
+            delivery_request=rng.random() < 0.05,
+            terms_agreement=True,
+            status=status,
+            reviewed_by_id=reviewer_id,
+            reviewed_at=reviewed_at,
+            review_notes=('Approved by supervisor' if status in ('APPROVED', 'PICKED_UP') else 'Incomplete household details')
+            if reviewed_at and rng.random() < 0.5 else '',
+            created_at=created,
+            updated_at=picked_up_at or reviewed_at or created,
+        )
+        application.priority_score = score(application)
+        rows['applications.Application'].append(application)
+        notify(application, created + timedelta(seconds=rng.randint(1, 5)),
+               f'Your relief application {application.reference_number} has been received. '
+               f'We will text you once it is reviewed.')
+
+        if status == 'REJECTED':
+            log('REJECT', application, reviewed_at, reviewer_id, {
+                'status': ['PENDING', 'REJECTED'], 'reviewed_by': [None, reviewer_id],
+                'reviewed_at': [None, str(reviewed_at)],
+            })
+            notify(application, reviewed_at,
+                   f'Your application {application.reference_number} could not be approved this round. '
+                   f'You may apply again in the next round.')
+        if status not in ('APPROVED', 'PICKED_UP'):
+            continue
+
+        if picked_up_at:
+            pickup_status = 'COMPLETED'
+        elif not current:
+            pickup_status = 'NO_SHOW' if rng.random() < 0.8 else 'CANCELLED'
+        elif preferred_date < today:
+            pickup_status = 'NO_SHOW' if rng.random() < 0.6 else 'SCHEDULED'
+        else:
+            pickup_status = 'CONFIRMED' if rng.random() < 0.15 else 'SCHEDULED'
+        pickup = Pickup(
+            id=plan['pickup_id_base'] + index,
+            application=application,
+            pickup_code=pickup_code(plan, index),
+            round_id=distribution_round['id'],
+            site_id=rng.choices(plan['sites'], plan['site_weights'])[0] if plan['sites'] else None,
+            scheduled_date=preferred_date,
+            scheduled_time=preferred_time,
+            status=pickup_status,
+            picked_up_at=picked_up_at,
+            picked_up_by_id=rng.choice(plan['reviewers']) if picked_up_at else None,
+            notes='Package collected via QR scanner' if picked_up_at else '',
+            created_at=reviewed_at,
+            updated_at=picked_up_at or reviewed_at,
+        )
+        rows['pickups.Pickup'].append(pickup)
+        log('APPROVE', application, reviewed_at, reviewer_id, {
+            'status': ['PENDING', 'APPROVED'], 'reviewed_by': [None, reviewer_id],
+            'reviewed_at': [None, str(reviewed_at)],
+        }, pickup_code=pickup.pickup_code)
+        slot = f'{preferred_date:%d %b}, {time_display(preferred_time)}'
+        approval = (
+            f'Your application {application.reference_number} is approved. Pickup code {pickup.pickup_code}: '
+            f'{slot}. Bring this message and a valid ID.'
+        )
+        notify(application, reviewed_at + timedelta(seconds=rng.randint(1, 5)), approval)
+        if application.email:
+            notify(application, reviewed_at + timedelta(seconds=rng.randint(1, 5)), approval, 'EMAIL', application.email)
+        reminder = at(preferred_date - timedelta(days=1), 10, rng.randrange(3600), tz)
+        if pickup_status != 'CANCELLED' and reviewed_at < reminder < now:
+            notify(application, reminder, f'Reminder: collect your relief package tomorrow, {slot}. Code {pickup.pickup_code}.')
+        if picked_up_at:
+            log('PICKUP', pickup, picked_up_at, pickup.picked_up_by_id, {
+                'status': ['SCHEDULED', 'COMPLETED'], 'picked_up_at': [None, str(picked_up_at)],
+                'picked_up_by': [None, pickup.picked_up_by_id],
+            }, **({'via': 'scanner'} if rng.random() < 0.7 else {}))
+    return rows
+
+
+# Writing
+
+@contextmanager
+def keep_timestamps():
+    """Let bulk_create write the generated created_at/updated_at instead of now()"""
+    from django.apps import apps
+
+    fields = [
+        field for model in apps.get_models() for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_value(value):
+    """``value`` in COPY's text format"""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(model, objects):
+    """Write ``objects`` with one COPY ... FROM STDIN (PostgreSQL)"""
+    qn = connection.ops.quote_name
+    # Serial ids the rows do not set come from the sequence
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and getattr(objects[0], field.attname) is None)
+    ]
+    buffer = io.StringIO()
+    for obj in objects:
+        buffer.write('\t'.join(copy_value(getattr(obj, field.attname)) for field in fields) + '\n')
+    sql = f"COPY {qn(model._meta.db_table)} ({', '.join(qn(field.column) for field in fields)}) FROM STDIN"
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            buffer.seek(0)
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def write_chunk(plan, start, stop):
+    """Build and write one chunk in one transaction; returns {model label: rows}"""
+    from django.apps import apps
+
+    rows = build_chunk(plan, start, stop)
+    with keep_timestamps(), transaction.atomic():
+        for label, objects in rows.items():
+            if not objects:
+                continue
+            model = apps.get_model(label)
+            if plan['method'] == 'copy':
+                copy_rows(model, objects)
+            else:
+                model.objects.bulk_create(objects, batch_size=plan['batch_size'])
+    return {label: len(objects) for label, objects in rows.items()}
+
+
+def init_worker():
+    """Process pool initializer: set Django up and drop connections inherited from the parent"""
+    import django
+
+    django.setup()
+    connections.close_all()
+    if connection.vendor == 'sqlite':
+        # Workers take turns at SQLite's single write lock
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout = 120000')
@@ -0,0 +1,115 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Requests to the views named in READ_REPLICAS['URL_NAMES'] read from one of
+the replica aliases, picked once per request. Everything else goes to
+``default``: all writes, reads inside a transaction on the primary, reads
+after the request has written, and requests from pinned clients. A client
+whose request wrote is pinned to the primary for STICKY_SECONDS through a
+cookie, so a status check straight after submitting never lands on a
+replica that has not caught up yet. Keep STICKY_SECONDS above the worst
+replica lag.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http.request import HttpRequest
+
+# Per-request routing state; None outside requests and replica_reads()
+_state = ContextVar('replica_routing', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# A stale session would log a client out or back in
+PRIMARY_APP_LABELS = {'sessions'}
+
+
+def get_options():
+    options = {
+        'ALIASES': [],
+        'URL_NAMES': [],
+        'STICKY_SECONDS': 5,
+        'COOKIE_NAME': 'primary_until',
+    }
+    options.update(getattr(settings, 'READ_REPLICAS', {}))
+    return options
+
+
+def is_pinned(request, options=None):
+    options = options or get_options()
+    try:
+        return float(request.COOKIES.get(options['COOKIE_NAME'], 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def begin_request(request):
+    return _state.set({'replica': None, 'wrote': False, 'pinned': is_pinned(request)})
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def route_reads(url_name):
+    """Send the current request's reads to a replica if its view is listed and the client is not pinned"""
+    state = _state.get()
+    options = get_options()
+    if state is None or state['pinned'] or not options['ALIASES'] or url_name not in options['URL_NAMES']:
+        return
+    state['replica'] = random.choice(options['ALIASES'])
+
+
+def pin_after_write(request, response):
+    """Keep a client that just wrote on the primary for STICKY_SECONDS"""
+    state = _state.get()
+    if state is None or not state['wrote'] or request.method in SAFE_METHODS:
+        return
+    options = get_options()
+    if not options['ALIASES']:
+        return
+    response.set_cookie(
+        options['COOKIE_NAME'], f"{time.time() + options['STICKY_SECONDS']:.3f}",
+        max_age=options['STICKY_SECONDS'], httponly=True, samesite='Lax',
+    )
+
+
+@contextmanager
+def replica_reads(alias=None):
+    """Route reads in this block to ``alias`` (default: a random replica), as for a listed view"""
+    token = begin_request(HttpRequest())
+    _state.get()['replica'] = alias or random.choice(get_options()['ALIASES'])
+    try:
+        yield
+    finally:
+        end_request(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['replica'] is None or state['wrote']:
+            return None
+        if model._meta.app_label in PRIMARY_APP_LABELS:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction on the primary must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state['replica']
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_options()['ALIASES']
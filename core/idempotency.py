@@ -0,0 +1,139 @@
+"""
+Idempotency keys for the mutating API endpoints.
+
+A client that may retry a write sends the same ``Idempotency-Key`` header
+with every attempt. Examples are an applicant submitting over a flaky
+connection, or a scanner confirming a pickup. ``IdempotencyMiddleware``
+(core.middleware) stores the first response in the IdempotencyKey table for
+TTL_SECONDS. A retry is answered from the table with
+``Idempotent-Replayed: true`` and the view does not run again. Keys are
+scoped to the endpoint and the user, or the client address for anonymous
+requests. Reusing a key for a different request body gets 422.
+
+The row is inserted before the view runs, so it also works as a lock across
+workers. A duplicate that arrives while the first request is still running
+gets 409 with Retry-After at once, rather than holding a worker while it
+waits; its retry is answered with the stored response. Some responses mean the write never ran: 401, 403, 429 and
+5xx. Those are not stored, so a retry runs the request. A row left in
+flight for LOCK_SECONDS, for example because its worker died, can be
+claimed again.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .throttling import client_ip
+
+HEADER = 'Idempotency-Key'
+MUTATING_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# The request did not run; a retry should
+UNSTORED_STATUSES = {401, 403, 429}
+
+
+def get_options():
+    options = {
+        'ENABLED': True,
+        'TTL_SECONDS': 24 * 3600,
+        'LOCK_SECONDS': 60,
+        'MAX_KEY_LENGTH': 255,
+    }
+    options.update(getattr(settings, 'IDEMPOTENCY', {}))
+    return options
+
+
+def is_keyed(request):
+    """A write carrying an Idempotency-Key header; cheap, no database access"""
+    return request.method in MUTATING_METHODS and HEADER in request.headers
+
+
+def error_response(status, message, retry_after=None):
+    response = JsonResponse({'success': False, 'message': message}, status=status)
+    if retry_after is not None:
+        response['Retry-After'] = str(retry_after)
+    return response
+
+
+def request_key(request, options):
+    """(scoped key, request hash); ValueError for an unusable header"""
+    client_key = request.headers[HEADER].strip()
+    if not client_key or len(client_key) > options['MAX_KEY_LENGTH']:
+        raise ValueError(f"{HEADER} must be 1 to {options['MAX_KEY_LENGTH']} characters.")
+    user = request.user
+    # Anonymous applicants choosing the same key must not see each other's responses
+    owner = f'user:{user.pk}' if user.is_authenticated else f'ip:{client_ip(request)}'
+    scope = '\n'.join([owner, request.method, request.path, client_key])
+    request_hash = hashlib.sha256(request.get_full_path().encode() + b'\n' + request.body).hexdigest()
+    return hashlib.sha256(scope.encode()).hexdigest(), request_hash
+
+
+def claim(key, request_hash, options):
+    """
+    True if this request now holds ``key`` and should run. The response to
+    send instead: the stored response of an earlier request with the key,
+    422 if it had a different body, or 409 while it is still running.
+    """
+    from .models import IdempotencyKey
+
+    # A second attempt covers the holder releasing the key in between
+    for _ in range(2):
+        now = timezone.now()
+        IdempotencyKey.objects.filter(key=key).filter(
+            Q(expires_at__lte=now)
+            | Q(status_code__isnull=True, created_at__lte=now - timedelta(seconds=options['LOCK_SECONDS']))
+        ).delete()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key, request_hash=request_hash, created_at=now,
+                    expires_at=now + timedelta(seconds=options['TTL_SECONDS']),
+                )
+            return True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None:
+            break
+    else:
+        return in_flight_response()
+
+    if record.request_hash != request_hash:
+        return error_response(422, f'This {HEADER} was already used for a different request.')
+    if record.status_code is None:
+        return in_flight_response()
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type or None)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def in_flight_response():
+    return error_response(
+        409, f'A request with this {HEADER} is still being processed. Please retry shortly.', retry_after=1
+    )
+
+
+def finish(key, response):
+    """Store ``response`` for retries, or release ``key`` if a retry should run the request"""
+    from .models import IdempotencyKey
+
+    records = IdempotencyKey.objects.filter(key=key)
+    if response.streaming or response.status_code >= 500 or response.status_code in UNSTORED_STATUSES:
+        records.delete()
+        return
+    records.update(
+        status_code=response.status_code,
+        content_type=response.get('Content-Type', ''),
+        body=response.content,
+    )
+
+
+def purge():
+    """Delete responses past their TTL; returns how many"""
+    from .models import IdempotencyKey
+
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,298 @@
+"""
+HTTP load-test harness for the core flows, driven by the ``loadtest``
+management command.
+
+Each virtual user runs one scenario in its own thread over a keep-alive
+connection and sends its own ``X-Loadtest-Client`` id. A server started
+with ``THROTTLE_CLIENT_HEADER=X-Loadtest-Client`` keys its per-IP throttles
+on that header, so they see a crowd rather than a single script. Only the standard
+library is used, so the harness runs anywhere the project does.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from base64 import b64encode
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+CLIENT_HEADER = 'X-Loadtest-Client'
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class Recorder:
+    """Thread-safe latency/status collector keyed by endpoint name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def summary(self, elapsed):
+        report = {}
+        for endpoint in sorted(self.latencies):
+            samples = sorted(self.latencies[endpoint])
+            statuses = dict(self.statuses[endpoint])
+            # 0 is a connection error; 4xx responses the scenario expects are not failures
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            throttled = statuses.get(429, 0)
+            report[endpoint] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'error_rate': round(errors / len(samples), 4),
+                'throttled_rate': round(throttled / len(samples), 4),
+                'p50_ms': round(percentile(samples, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+                'max_ms': round(samples[-1] * 1000, 1),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            }
+        return report
+
+
+class HttpClient:
+    """One virtual user's keep-alive connection"""
+
+    def __init__(self, base_url, recorder, client_id, credentials=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.headers = {
+            'Accept': 'application/json',
+            CLIENT_HEADER: client_id,
+        }
+        if credentials:
+            token = b64encode(':'.join(credentials).encode()).decode()
+            self.headers['Authorization'] = f'Basic {token}'
+        self.connection = None
+
+    def request(self, endpoint, method, path, payload=None):
+        """Send a request, record it under ``endpoint``; returns (status, json or None)"""
+        headers = dict(self.headers)
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            raw = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.recorder.record(endpoint, 0, time.perf_counter() - started)
+            return 0, None
+        self.recorder.record(endpoint, status, time.perf_counter() - started)
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Context:
+    """Data shared by all virtual users: seeded references, pickups, phone counter"""
+
+    def __init__(self, references, pickup_codes, rng_seed):
+        self._lock = threading.Lock()
+        self.references = list(references)
+        self.pickup_codes = list(pickup_codes)
+        self.random = random.Random(rng_seed)
+        self._phone_counter = self.random.randrange(10 ** 7)
+
+    def next_phone(self):
+        with self._lock:
+            self._phone_counter = (self._phone_counter + 1) % 10 ** 8
+            return f'080{self._phone_counter:08d}'
+
+    def add_reference(self, reference):
+        with self._lock:
+            self.references.append(reference)
+
+    def random_reference(self):
+        with self._lock:
+            return self.random.choice(self.references) if self.references else None
+
+    def random_pickup_code(self):
+        with self._lock:
+            return self.random.choice(self.pickup_codes) if self.pickup_codes else None
+
+    def take_pickup_code(self):
+        with self._lock:
+            return self.pickup_codes.pop() if self.pickup_codes else None
+
+
+def application_payload(phone, rng):
+    preferred = time.strftime('%Y-%m-%d', time.gmtime(time.time() + 3 * 86400))
+    return {
+        'first_name': rng.choice(['Adaeze', 'Babatunde', 'Chinedu', 'Funke', 'Ibrahim', 'Ngozi']),
+        'last_name': rng.choice(['Okafor', 'Adeyemi', 'Bello', 'Eze', 'Ogunleye', 'Musa']),
+        'phone': phone,
+        'email': '',
+        'address': f'{rng.randint(1, 200)} Ring Road, Ibadan',
+        'family_size': str(rng.randint(1, 9)),
+        'children_count': str(rng.randint(0, 4)),
+        'elderly_count': str(rng.randint(0, 2)),
+        'employment_status': rng.choice(['unemployed', 'self_employed', 'employed']),
+        'special_needs': '',
+        'tec_member': rng.choice(['yes', 'no']),
+        'selected_package': rng.choice(['small_basic', 'medium_basic', 'emergency', 'senior']),
+        'package_flexibility': True,
+        'preferred_date': preferred,
+        'preferred_time': rng.choice(['morning', 'afternoon', 'evening']),
+        'transportation_help': False,
+        'delivery_request': False,
+        'terms_agreement': True,
+    }
+
+
+# Scenarios: each runs one virtual user until ``stop`` is set.
+
+def submit_surge(client, context, stop, think_time):
+    """Applicants hammering the form the moment a round opens"""
+    rng = random.Random(context.random.random())
+    while not stop.is_set():
+        status, body = client.request(
+            'submit_application', 'POST', '/api/applications/submit/',
+            application_payload(context.next_phone(), rng)
+        )
+        if status in (201, 202) and body:
+            context.add_reference(body['reference_number'])
+        stop.wait(think_time)
+
+
+def status_polling(client, context, stop, think_time):
+    """Applicants refreshing their status page"""
+    while not stop.is_set():
+        reference = context.random_reference()
+        if reference:
+            client.request(
+                'check_application_status', 'POST', '/api/applications/check-status/',
+                {'reference': reference}
+            )
+        stop.wait(think_time)
+
+
+def supervisor_review(client, context, stop, think_time):
+    """A supervisor paging through pending applications and deciding each"""
+    rng = random.Random(context.random.random())
+    while not stop.is_set():
+        status, body = client.request(
+            'application_list', 'GET', '/api/applications/list/?status=PENDING'
+        )
+        results = (body or {}).get('results', []) if status == 200 else []
+        if not results:
+            stop.wait(think_time)
+            continue
+        for application in results[:5]:
+            if stop.is_set():
+                break
+            action = 'approve' if rng.random() < 0.8 else 'reject'
+            client.request(
+                f'{action}_application', 'POST',
+                f"/api/applications/{application['id']}/{action}/",
+                {'notes': 'load test'}
+            )
+            stop.wait(think_time)
+
+
+def scanner_station(client, context, stop, think_time):
+    """A scanner verifying and confirming pickups at distribution pace"""
+    while not stop.is_set():
+        client.request('today_pickup_queue', 'GET', '/api/pickups/today-queue/')
+        pickup_code = context.take_pickup_code()
+        if not pickup_code:
+            stop.wait(think_time)
+            continue
+        status, body = client.request(
+            'verify_qr_code', 'POST', '/api/pickups/verify/', {'pickup_code': pickup_code}
+        )
+        # Handing over the package takes a while
+        stop.wait(think_time)
+        if status == 200 and body and body.get('success'):
+            client.request(
+                'confirm_pickup', 'POST', '/api/pickups/confirm/',
+                {'pickup_id': body['data']['pickup_id']}
+            )
+
+
+def public_reads(client, context, stop, think_time):
+    """Anonymous visitors on the read endpoints that have async versions"""
+    rng = random.Random(context.random.random())
+    while not stop.is_set():
+        choice = rng.random()
+        reference = context.random_reference()
+        pickup_code = context.random_pickup_code()
+        if choice < 0.4 and reference:
+            client.request(
+                'check_application_status', 'POST', '/api/applications/check-status/', {'reference': reference}
+            )
+        elif choice < 0.6 and pickup_code:
+            client.request('pickup_status', 'GET', f'/api/pickups/status/{pickup_code}/')
+        elif choice < 0.8:
+            client.request('today_pickup_queue', 'GET', '/api/pickups/today-queue/')
+        else:
+            client.request('available_packages', 'GET', '/api/packages/available/')
+        stop.wait(think_time)
+
+
+SCENARIOS = {
+    'submit': (submit_surge, False, 0.0),
+    'status': (status_polling, False, 1.0),
+    'review': (supervisor_review, True, 2.0),
+    'scanner': (scanner_station, True, 5.0),
+    'public': (public_reads, False, 1.0),
+}
+
+
+def run(base_url, users, duration, context, credentials=None, think_scale=1.0):
+    """
+    Run ``users`` ({scenario: count}) for ``duration`` seconds.
+    Returns the per-endpoint summary and the elapsed wall time.
+    """
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+    clients = []
+    for scenario, count in users.items():
+        function, needs_staff, think_time = SCENARIOS[scenario]
+        for _ in range(count):
+            client = HttpClient(base_url, recorder, str(len(clients)), credentials if needs_staff else None)
+            clients.append(client)
+            threads.append(threading.Thread(
+                target=function, args=(client, context, stop, think_time * think_scale), daemon=True
+            ))
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.close()
+    return recorder.summary(elapsed), elapsed
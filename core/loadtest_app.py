@@ -0,0 +1,36 @@
+"""
+Server entry points for ``benchmark_servers``: the project's WSGI and ASGI
+applications, with ``LOADTEST_DB_LATENCY_MS`` of sleep added to every query
+so a local SQLite database behaves like one across the network.
+"""
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+DB_LATENCY = float(os.environ.get('LOADTEST_DB_LATENCY_MS', 0)) / 1000
+
+
+def add_latency(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def install_latency(sender, connection, **kwargs):
+    if add_latency not in connection.execute_wrappers:
+        connection.execute_wrappers.append(add_latency)
+
+
+if DB_LATENCY:
+    connection_created.connect(install_latency)
+
+
+def __getattr__(name):
+    # Imported lazily: asgi.py switches the settings to the async views
+    if name == 'wsgi_application':
+        from reliefproj.wsgi import application
+        return application
+    if name == 'asgi_application':
+        from reliefproj.asgi import application
+        return application
+    raise AttributeError(name)
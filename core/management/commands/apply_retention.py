@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive partitions older than their retention period to gzip JSONL files '
+        'and drop them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List expired partitions without touching them')
+        parser.add_argument('--archive-dir', help='Where archives are written (default: PARTITIONING setting)')
+
+    def handle(self, *args, **options):
+        archive_dir = options['archive_dir'] or partitioning.get_options()['ARCHIVE_DIR']
+
+        for model, retention_months in partitioning.partitioned_models():
+            table = model._meta.db_table
+            if retention_months is None:
+                continue
+            if not partitioning.uses_native_partitions() and not options['dry_run']:
+                # Expired rows may still be waiting in the live table
+                partitioning.rotate(model)
+
+            expired = partitioning.expired_partitions(model, retention_months)
+            if not expired:
+                self.stdout.write(f'{table}: nothing older than {retention_months} months')
+            for _, name in expired:
+                if options['dry_run']:
+                    self.stdout.write(f'{table}: would archive and drop {name}')
+                    continue
+                path, rows = partitioning.archive_partition(model, name, archive_dir)
+                partitioning.drop_partition(name)
+                self.stdout.write(f'{table}: archived {rows} rows to {path} and dropped {name}')
@@ -0,0 +1,115 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+from core import benchmarks
+from core.management.commands.loadtest import git_commit
+
+
+def parse_list(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the hot functions against generated data at several sizes, in a throwaway test '
+        'database, and fail on regressions against the saved baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', help='Comma-separated benchmarks to run (default: all; see --list)')
+        parser.add_argument('--sizes', help='Comma-separated dataset sizes in applications (default: BENCHMARKS SIZES)')
+        parser.add_argument('--repeat', type=int, help='Timed runs per benchmark; the fastest counts')
+        parser.add_argument('--tolerance', type=float, help='Allowed slowdown per item, e.g. 0.25 for 25%%')
+        parser.add_argument('--baseline', help='Baseline file (default: BENCHMARKS BASELINE)')
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Record these figures in the baseline instead of checking against it'
+        )
+        parser.add_argument('--output', help='Results file (default: benchmark_results/<time>_<commit>.json)')
+        parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in benchmarks.BENCHMARKS:
+                self.stdout.write(name)
+            return
+        settings_options = benchmarks.get_options()
+        names = parse_list(options['only']) if options['only'] else None
+        unknown = set(names or []) - set(benchmarks.BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}. See --list.")
+        try:
+            sizes = [int(size) for size in parse_list(options['sizes'])] if options['sizes'] else None
+        except ValueError:
+            raise CommandError('--sizes takes comma-separated numbers, e.g. 100,1000.')
+
+        self.stdout.write(f"{'benchmark':<38}{'size':>7}{'items':>7}{'min ms':>11}{'us/item':>11}{'queries':>9}")
+        # The real database, cache and media are never touched
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ):
+                results = benchmarks.run(names, sizes, options['repeat'], progress=self.print_row)
+                machine = benchmarks.machine()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        commit = git_commit()
+        result = {
+            'meta': {'commit': commit, 'started_at': timezone.now().isoformat(), **machine},
+            'benchmarks': results,
+        }
+        output = Path(options['output'] or (
+            Path(settings_options['RESULTS_DIR']) / f"{timezone.now():%Y%m%d-%H%M%S}_{commit}.json"
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2))
+        self.stdout.write(f'Results written to {output}')
+
+        baseline_path = Path(options['baseline'] or settings_options['BASELINE'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+        if options['save_baseline']:
+            self.save_baseline(baseline_path, baseline, result)
+            return
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(
+                f'No baseline at {baseline_path}; run with --save-baseline to record one.'
+            ))
+            return
+        self.check_baseline(baseline, result, options['tolerance'])
+
+    def print_row(self, name, size, figures):
+        self.stdout.write(
+            f"{name:<38}{size:>7}{figures['items']:>7}{figures['min_ms']:>11.2f}"
+            f"{figures['per_item_us']:>11.2f}{figures['queries']:>9}"
+        )
+
+    def save_baseline(self, path, baseline, result):
+        # Benchmarks and sizes not run this time keep their earlier figures
+        merged = baseline['benchmarks'] if baseline else {}
+        for name, sizes in result['benchmarks'].items():
+            merged.setdefault(name, {}).update(sizes)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'meta': result['meta'], 'benchmarks': merged}, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+
+    def check_baseline(self, baseline, result, tolerance):
+        meta = baseline['meta']
+        if any(meta.get(key) != result['meta'][key] for key in ('platform', 'processor', 'python', 'database')):
+            self.stdout.write(self.style.WARNING(
+                f"The baseline was taken on {meta.get('platform')} / {meta.get('database')}; "
+                'timings may not compare. Query counts still do.'
+            ))
+        regressions = benchmarks.compare(baseline['benchmarks'], result['benchmarks'], tolerance)
+        if regressions:
+            for name, size, message in regressions:
+                self.stdout.write(self.style.ERROR(f'{name} at {size}: {message}'))
+            raise CommandError(f"{len(regressions)} regression(s) against the baseline from {meta['commit']}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against the baseline from {meta['commit']}."))
@@ -0,0 +1,182 @@
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from applications.models import Application
+from core import loadtest
+from pickups.models import Pickup
+
+from .loadtest import Command as LoadTestCommand, git_commit
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/packages/available/')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(LoadTestCommand):
+    help = (
+        'Compare how many concurrent connections one WSGI worker (gunicorn gthread) and one '
+        'ASGI worker (uvicorn) serve on the public read endpoints within a latency SLO'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--levels', default='25,50,100,200,400',
+            help='Concurrent connections to try, ascending (default: 25,50,100,200,400)'
+        )
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per level (default: 20)')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Seconds between a client\'s requests')
+        parser.add_argument('--threads', type=int, default=4, help='Threads of the WSGI worker (default: 4)')
+        parser.add_argument('--slo-ms', type=float, default=500, help='p99 latency a level must stay under')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0,
+            help='Delay added to every query, to stand in for a database across the network'
+        )
+        parser.add_argument('--servers', default='wsgi,asgi', help='Which servers to run (default: wsgi,asgi)')
+        parser.add_argument(
+            '--seed-data', type=int, default=0,
+            help='Before running, create this many pending and this many approved-for-today applications'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for repeatable runs')
+        parser.add_argument('--output', help='Results file (default: loadtest_results/servers_<time>_<commit>.json)')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['levels'].split(',')]
+        servers = options['servers'].split(',')
+        for server, module in (('wsgi', 'gunicorn'), ('asgi', 'uvicorn')):
+            if server in servers and importlib.util.find_spec(module) is None:
+                raise CommandError(f'{module} is not installed; pip install {module}')
+        if options['seed_data']:
+            self.seed(options['seed_data'])
+
+        results = {}
+        for server in servers:
+            self.stdout.write(f'\n{server.upper()}: one worker')
+            results[server] = self.run_server(server, levels, options)
+
+        commit = git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'started_at': timezone.now().isoformat(),
+                'levels': levels,
+                'duration_s': options['duration'],
+                'think_time_s': options['think_time'],
+                'wsgi_threads': options['threads'],
+                'slo_p99_ms': options['slo_ms'],
+                'db_latency_ms': options['db_latency_ms'],
+            },
+            'servers': results,
+        }
+        output = Path(options['output'] or (
+            Path(settings.BASE_DIR) / 'loadtest_results'
+            / f"servers_{timezone.now():%Y%m%d-%H%M%S}_{commit}.json"
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+        self.stdout.write('')
+        for server, result in results.items():
+            self.stdout.write(
+                f"{server.upper()}: {result['max_connections_within_slo']} concurrent connections "
+                f"per worker within p99 < {options['slo_ms']:.0f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def server_command(self, server, port, threads):
+        if server == 'wsgi':
+            return [
+                sys.executable, '-m', 'gunicorn', 'core.loadtest_app:wsgi_application', '--bind', f'127.0.0.1:{port}',
+                '--workers', '1', '--worker-class', 'gthread', '--threads', str(threads),
+            ]
+        return [
+            sys.executable, '-m', 'uvicorn', 'core.loadtest_app:asgi_application', '--port', str(port),
+            '--workers', '1', '--log-level', 'warning',
+        ]
+
+    def run_server(self, server, levels, options):
+        port = free_port()
+        env = {
+            **os.environ,
+            'ASYNC_PUBLIC_VIEWS': str(server == 'asgi'),
+            'LOADTEST_DB_LATENCY_MS': str(options['db_latency_ms']),
+            # Measure the server, not the load shedder's concurrency cap
+            'LOAD_SHEDDING_MAX_CONCURRENCY': str(max(levels)),
+        }
+        process = subprocess.Popen(
+            self.server_command(server, port, options['threads']), cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_until_ready(port):
+                raise CommandError(f'{server} server did not start on port {port}')
+            return self.run_levels(f'http://127.0.0.1:{port}', levels, options)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def run_levels(self, base_url, levels, options):
+        today = timezone.now().date()
+        references = list(
+            Application.objects.order_by('-created_at').values_list('reference_number', flat=True)[:5000]
+        )
+        pickup_codes = list(Pickup.objects.filter(scheduled_date=today).values_list('pickup_code', flat=True)[:5000])
+
+        header = f"{'conns':>7}{'reqs':>8}{'rps':>8}{'err%':>7}{'p50':>9}{'p99':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows, served = [], 0
+        for level in levels:
+            context = loadtest.Context(references, pickup_codes, options['seed'])
+            endpoints, elapsed = loadtest.run(
+                base_url, {'public': level}, options['duration'], context, think_scale=options['think_time']
+            )
+            row = self.summarize(level, endpoints, elapsed)
+            rows.append(row)
+            self.stdout.write(
+                f"{level:>7}{row['requests']:>8}{row['throughput_rps']:>8.1f}{row['error_rate'] * 100:>7.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            )
+            if row['error_rate'] > 0.01 or row['p99_ms'] > options['slo_ms']:
+                break
+            served = level
+        return {'max_connections_within_slo': served, 'levels': rows}
+
+    def summarize(self, level, endpoints, elapsed):
+        requests = sum(stats['requests'] for stats in endpoints.values())
+        errors = sum(stats['error_rate'] * stats['requests'] for stats in endpoints.values())
+        return {
+            'connections': level,
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 2),
+            'error_rate': round(errors / requests, 4) if requests else 1.0,
+            # Worst endpoint, so one slow view cannot hide behind fast ones
+            'p50_ms': max((stats['p50_ms'] for stats in endpoints.values()), default=0),
+            'p99_ms': max((stats['p99_ms'] for stats in endpoints.values()), default=0),
+            'endpoints': endpoints,
+        }
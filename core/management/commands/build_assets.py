@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core import assets
+
+
+def size(path):
+    return path.stat().st_size if path.exists() else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run collectstatic, then build fingerprinted, minified and precompressed copies of the '
+        'static files and one script bundle per {% pagescript %} block'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-collectstatic', action='store_true', help='Only build the assets')
+        parser.add_argument('--clean', action='store_true', help='Delete files no longer in the manifest')
+
+    def handle(self, *args, **options):
+        if settings.STATIC_ROOT and not options['skip_collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+        if assets.brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed; writing .gz variants only'))
+
+        manifest, report = assets.build(clean=options['clean'])
+
+        self.stdout.write(f"{'asset':<48}{'source':>10}{'built':>10}{'gzip':>10}{'brotli':>10}")
+        totals = [0, 0]
+        for name, source_bytes, built_bytes, path in report:
+            gz, br = size(Path(f'{path}.gz')), size(Path(f'{path}.br'))
+            totals[0] += source_bytes
+            totals[1] += built_bytes
+            self.stdout.write(
+                f"{name:<48}{source_bytes:>10}{built_bytes:>10}{gz if gz else '-':>10}{br if br else '-':>10}"
+            )
+        self.stdout.write(f"{'total':<48}{totals[0]:>10}{totals[1]:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {len(manifest['files'])} files and {len(manifest['bundles'])} page scripts into "
+            f"{assets.get_options()['OUTPUT_DIR']} (manifest {manifest['version']})"
+        ))
@@ -0,0 +1,149 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from applications.models import DistributionRound
+from core import dataset, partitioning
+from packages.models import Package
+from pickups.models import DistributionSite, Pickup
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with realistic synthetic applications, pickups, notifications and '
+        'audit entries over several distribution rounds, for testing at scale'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=10000, help='Applications to create (default: 10000)')
+        parser.add_argument('--rounds', type=int, default=6, help='Distribution rounds to spread them over (default: 6)')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes generating and writing rows (default: one per CPU)'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT (default: 2000)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same rows')
+        parser.add_argument(
+            '--today', type=date.fromisoformat,
+            help='Date the open round is running on (default: today), for repeatable datasets'
+        )
+
+    def handle(self, *args, **options):
+        if options['applications'] < 1 or options['rounds'] < 1:
+            raise CommandError('--applications and --rounds must be at least 1.')
+        if DistributionRound.objects.filter(name__startswith=dataset.ROUND_PREFIX).exists():
+            raise CommandError(
+                f"This database already has '{dataset.ROUND_PREFIX}' rounds; generate into a fresh database."
+            )
+        started = time.perf_counter()
+        plan = self.prepare(options)
+
+        chunks = [
+            (start, min(start + dataset.CHUNK_SIZE, options['applications']))
+            for start in range(0, options['applications'], dataset.CHUNK_SIZE)
+        ]
+        totals = {}
+        if options['workers'] == 1:
+            results = (dataset.write_chunk(plan, start, stop) for start, stop in chunks)
+            self.report_progress(results, totals, options['applications'], started)
+        else:
+            # Workers open their own connections; none may be shared across fork
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=dataset.init_worker) as pool:
+                futures = [pool.submit(dataset.write_chunk, plan, start, stop) for start, stop in chunks]
+                results = (future.result() for future in as_completed(futures))
+                self.report_progress(results, totals, options['applications'], started)
+
+        if connection.vendor == 'postgresql':
+            # Pickup ids were assigned here, not drawn from the sequence
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Pickup]):
+                    cursor.execute(sql)
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        for label, count in totals.items():
+            self.stdout.write(f'{label:<28}{count:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows:,} rows in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s, {plan["method"]}).'
+        ))
+        self.stdout.write(
+            'Run partition_tables to file the notification and audit rows into their monthly partitions, '
+            'and dedup_households to cluster the repeat applicants.'
+        )
+
+    def prepare(self, options):
+        """Create the rounds, reviewers and packages the rows refer to; returns the workers' plan"""
+        today = options['today'] or timezone.localdate()
+        # A fixed clock for --today, so reruns match to the second
+        now = timezone.make_aware(datetime(today.year, today.month, today.day, 12)) if options['today'] else timezone.now()
+        if not Package.objects.exists():
+            call_command('create_sample_packages', stdout=self.stdout)
+
+        reviewers = []
+        for number in range(1, 4):
+            user, created = User.objects.get_or_create(
+                username=f'dataset-reviewer-{number}', defaults={'is_staff': True}
+            )
+            if created:
+                user.set_unusable_password()
+                user.save()
+            reviewers.append(user.id)
+
+        rounds = []
+        for name, opens_on, closes_on, status, first_index, _ in dataset.plan_rounds(
+            options['applications'], options['rounds'], today
+        ):
+            distribution_round = DistributionRound.objects.create(
+                name=name, opens_on=opens_on, closes_on=closes_on, status=status,
+                closed_at=None if status == 'OPEN' else timezone.make_aware(
+                    datetime.combine(closes_on + timedelta(days=1), datetime.min.time())
+                ),
+            )
+            rounds.append({
+                'id': distribution_round.id, 'opens_on': opens_on, 'closes_on': closes_on,
+                'status': status, 'first_index': first_index,
+            })
+
+        if partitioning.uses_native_partitions():
+            oldest = partitioning.month_start(rounds[0]['opens_on'])
+            for model, _ in partitioning.partitioned_models():
+                if partitioning.is_partitioned(model):
+                    partitioning.create_partitions(model, oldest, partitioning.get_options()['MONTHS_AHEAD'])
+
+        sites = list(DistributionSite.objects.filter(is_active=True).order_by('id'))
+        return {
+            'seed': options['seed'],
+            'now': now,
+            'rounds': rounds,
+            'packages': dict(Package.objects.values_list('package_type', 'id')),
+            'reviewers': reviewers,
+            'sites': [site.id for site in sites],
+            # The default site sees about half the pickups
+            'site_weights': [len(sites) if site.is_default else 1 for site in sites],
+            'pickup_id_base': (Pickup.objects.aggregate(last=Max('id'))['last'] or 0) + 1,
+            'code_offset': random.Random(options['seed']).getrandbits(48),
+            'batch_size': options['batch_size'],
+            'method': 'copy' if connection.vendor == 'postgresql' else 'bulk_create',
+        }
+
+    def report_progress(self, results, totals, applications, started):
+        done, reported = 0, 0
+        for counts in results:
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + count
+            done += counts['applications.Application']
+            if done * 10 // applications > reported or done == applications:
+                reported = done * 10 // applications
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{done:>12,} / {applications:,} applications  {elapsed:7.1f} s')
@@ -0,0 +1,217 @@
+import json
+import os
+import subprocess
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.models import Application
+from core import loadtest
+from packages.models import Package
+from pickups.models import Pickup
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def parse_users(value):
+    users = {}
+    for part in value.split(','):
+        name, _, count = part.partition('=')
+        if name not in loadtest.SCENARIOS or not count.isdigit():
+            raise CommandError(
+                f"Invalid --users entry '{part}'. Scenarios: {', '.join(loadtest.SCENARIOS)}"
+            )
+        users[name] = int(count)
+    return users
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running server (runserver or gunicorn on the same database) with '
+        'submit-surge, status-polling, supervisor-review and scanner scenarios'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run (default: 60)')
+        parser.add_argument(
+            '--users',
+            default='submit=20,status=50,review=3,scanner=4',
+            help='Virtual users per scenario (default: submit=20,status=50,review=3,scanner=4)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for repeatable runs')
+        parser.add_argument(
+            '--seed-data',
+            type=int,
+            default=0,
+            help='Before running, create this many pending and this many approved-for-today applications'
+        )
+        parser.add_argument('--username', default='loadtest', help='Staff user for review/scanner scenarios')
+        parser.add_argument(
+            '--password', default=os.environ.get('LOADTEST_PASSWORD'),
+            help='Password for that user (default: $LOADTEST_PASSWORD); it is deactivated after the run'
+        )
+        parser.add_argument(
+            '--allow-production', action='store_true',
+            help='Run even with DEBUG off (creates a staff account and seed rows in that database)'
+        )
+        parser.add_argument(
+            '--think-scale',
+            type=float,
+            default=1.0,
+            help='Multiply every scenario think time (0 for a closed-loop stress run)'
+        )
+        parser.add_argument('--output', help='Results file (default: loadtest_results/<time>_<commit>.json)')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        users = parse_users(options['users'])
+        if not settings.DEBUG and not options['allow_production']:
+            raise CommandError(
+                'DEBUG is off: this may be a production database. Pass --allow-production to load-test it anyway.'
+            )
+        if not options['password']:
+            raise CommandError('Give the staff user a password with --password or $LOADTEST_PASSWORD.')
+        credentials = (options['username'], options['password'])
+        staff_user = self.ensure_staff_user(*credentials)
+        try:
+            self.run_test(users, credentials, options)
+        finally:
+            # Never leave a staff account with a known password behind
+            staff_user.is_active = False
+            staff_user.set_unusable_password()
+            staff_user.save()
+            self.stdout.write(f'Deactivated staff user {staff_user.username}.')
+
+    def run_test(self, users, credentials, options):
+        if options['seed_data']:
+            self.seed(options['seed_data'])
+
+        today = timezone.now().date()
+        context = loadtest.Context(
+            references=Application.objects.order_by('-created_at').values_list('reference_number', flat=True)[:5000],
+            pickup_codes=Pickup.objects.filter(
+                scheduled_date=today, status='SCHEDULED'
+            ).values_list('pickup_code', flat=True),
+            rng_seed=options['seed'],
+        )
+
+        self.stdout.write(
+            f"Running {sum(users.values())} virtual users for {options['duration']:.0f}s "
+            f"against {options['base_url']}..."
+        )
+        endpoints, elapsed = loadtest.run(
+            options['base_url'], users, options['duration'], context,
+            credentials=credentials, think_scale=options['think_scale']
+        )
+
+        commit = git_commit()
+        result = {
+            'meta': {
+                'commit': commit,
+                'started_at': timezone.now().isoformat(),
+                'base_url': options['base_url'],
+                'duration_s': round(elapsed, 2),
+                'users': users,
+                'seed': options['seed'],
+                'think_scale': options['think_scale'],
+            },
+            'endpoints': endpoints,
+        }
+        output = Path(options['output'] or (
+            Path(settings.BASE_DIR) / 'loadtest_results'
+            / f"{timezone.now():%Y%m%d-%H%M%S}_{commit}.json"
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2))
+
+        self.print_report(endpoints)
+        if options['compare']:
+            self.print_comparison(json.loads(Path(options['compare']).read_text()), result)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def ensure_staff_user(self, username, password):
+        user, _ = User.objects.get_or_create(username=username, defaults={'is_staff': True})
+        user.is_staff = user.is_active = True
+        user.set_password(password)
+        user.save()
+        return user
+
+    def seed(self, count):
+        if not Package.objects.exists():
+            call_command('create_sample_packages', stdout=self.stdout)
+        package_ids = dict(Package.objects.values_list('package_type', 'id'))
+        package_types = list(package_ids)
+        today = timezone.now().date()
+        stamp = uuid.uuid4().hex[:6].upper()
+
+        applications = []
+        for index in range(count * 2):
+            approved = index >= count
+            applications.append(Application(
+                reference_number=f'LT{stamp}{index:07d}',
+                first_name='Load',
+                last_name=f'Test {index}',
+                phone=f'070{uuid.uuid4().int % 10 ** 8:08d}',
+                address='Seed data',
+                family_size=4,
+                employment_status='unemployed',
+                tec_member='no',
+                selected_package=package_types[index % len(package_types)],
+                package_id=package_ids[package_types[index % len(package_types)]],
+                preferred_date=today if approved else today + timedelta(days=3),
+                preferred_time='morning',
+                terms_agreement=True,
+                status='APPROVED' if approved else 'PENDING',
+            ))
+        Application.objects.bulk_create(applications, batch_size=1000)
+
+        # bulk_create skips Pickup.save(), so no QR images are rendered for seed rows
+        Pickup.objects.bulk_create([
+            Pickup(
+                application=application,
+                pickup_code=Pickup().generate_pickup_code(),
+                scheduled_date=today,
+                scheduled_time='morning',
+            )
+            for application in applications[count:]
+        ], batch_size=1000)
+        self.stdout.write(f'Seeded {count} pending and {count} approved applications.')
+
+    def print_report(self, endpoints):
+        header = f"{'endpoint':<28}{'reqs':>7}{'rps':>8}{'err%':>7}{'429%':>7}{'p50':>9}{'p95':>9}{'p99':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, stats in endpoints.items():
+            self.stdout.write(
+                f"{name:<28}{stats['requests']:>7}{stats['throughput_rps']:>8.1f}"
+                f"{stats['error_rate'] * 100:>7.1f}{stats['throttled_rate'] * 100:>7.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+            )
+
+    def print_comparison(self, before, after):
+        self.stdout.write(f"\nCompared with {before['meta']['commit']} (p95 ms, rps):")
+        for name, stats in after['endpoints'].items():
+            previous = before['endpoints'].get(name)
+            if not previous:
+                self.stdout.write(f'{name:<28} new endpoint')
+                continue
+            p95_change = (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+            self.stdout.write(
+                f"{name:<28}{previous['p95_ms']:>9.1f} -> {stats['p95_ms']:<9.1f}({p95_change:+.0f}%)"
+                f"{previous['throughput_rps']:>9.1f} -> {stats['throughput_rps']:.1f}"
+            )
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import views  # noqa: F401  (registers the cached pages)
+from core.page_cache import get_stats, is_shared_cache, registered_pages
+
+
+class Command(BaseCommand):
+    help = 'Report hit rates and render time saved by the anonymous page cache'
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+        if is_shared_cache():
+            self.stdout.write(f'Counters and render locks: shared by every worker ({backend}).')
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Counters and render locks: PER-PROCESS ({backend}). Each web worker keeps its own, '
+                'and the figures below are this command\'s process only, not the web workers\'. '
+                'Configure a shared cache (e.g. Redis) to collect them.'
+            ))
+        self.stdout.write(
+            f"{'page':<12}{'hits':>8}{'stale':>8}{'misses':>8}{'hit rate':>10}{'saved (s)':>12}"
+        )
+        for name in registered_pages:
+            stats = get_stats(name)
+            self.stdout.write(
+                f"{name:<12}{stats['hit']:>8}{stats['stale']:>8}{stats['miss']:>8}"
+                f"{stats['hit_rate']:>10.1%}{stats['saved_ms'] / 1000:>12.2f}"
+            )
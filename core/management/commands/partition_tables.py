@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintain the monthly partitions of the append-only tables: on PostgreSQL, convert '
+        'them to partitioned tables and create upcoming partitions; elsewhere, rotate closed '
+        'months out of the live table. Run daily.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            help='PostgreSQL partitions to create past the current month (default: PARTITIONING setting)'
+        )
+
+    def handle(self, *args, **options):
+        months_ahead = options['months_ahead']
+        if months_ahead is None:
+            months_ahead = partitioning.get_options()['MONTHS_AHEAD']
+
+        for model, _ in partitioning.partitioned_models():
+            table = model._meta.db_table
+            if not partitioning.uses_native_partitions():
+                moved = partitioning.rotate(model)
+                for name, rows in moved.items():
+                    self.stdout.write(f'{table}: moved {rows} rows to {name}')
+                if not moved:
+                    self.stdout.write(f'{table}: nothing to rotate')
+                continue
+
+            if not partitioning.is_partitioned(model):
+                self.stdout.write(f'{table}: converting to a partitioned table...')
+                partitioning.convert_to_partitioned(model, months_ahead)
+            existing = partitioning.existing_partitions(model)
+            first = min(existing) if existing else partitioning.month_start(timezone.now())
+            for name in partitioning.create_partitions(model, first, months_ahead):
+                self.stdout.write(f'{table}: created partition {name}')
+            stray = partitioning.default_partition_rows(model)
+            if stray:
+                self.stderr.write(self.style.WARNING(
+                    f'{table}: {stray} rows are in {partitioning.default_partition_name(model)}, outside '
+                    'every monthly partition (future-dated ones get theirs with a larger --months-ahead)'
+                ))
+        self.stdout.write(self.style.SUCCESS('Partitions are up to date.'))
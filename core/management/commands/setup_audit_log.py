@@ -0,0 +1,28 @@
+import copy
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import AuditLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Let audit log entries have no user on databases created before anonymous actions '
+        '(scanner confirmations) were audited'
+    )
+
+    def handle(self, *args, **options):
+        field = AuditLog._meta.get_field('user')
+        table = AuditLog._meta.db_table
+        with connection.cursor() as cursor:
+            columns = {column.name: column for column in connection.introspection.get_table_description(cursor, table)}
+        if columns[field.column].null_ok:
+            self.stdout.write(f'{table}.{field.column} already allows NULL.')
+            return
+        old_field = copy.copy(field)
+        old_field.null = False
+        # On PostgreSQL this alters the partitioned parent, and with it every partition
+        with connection.schema_editor() as editor:
+            editor.alter_field(AuditLog, old_field, field)
+        self.stdout.write(self.style.SUCCESS(f'{table}.{field.column} now allows NULL.'))
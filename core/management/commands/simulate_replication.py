@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_router import get_options
+
+
+class Command(BaseCommand):
+    help = (
+        'Replicate a SQLite primary into its SQLite replica aliases every --lag seconds, '
+        'so replica routing can be tried locally against a lagging replica'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=2.0, help='Seconds between copies (the simulated lag)')
+        parser.add_argument('--once', action='store_true', help='Copy once and exit')
+
+    def handle(self, *args, **options):
+        aliases = get_options()['ALIASES']
+        if not aliases:
+            raise CommandError('No replicas configured; set DB_REPLICAS.')
+        for alias in ['default', *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(
+                    f'{alias} is not SQLite; on PostgreSQL use recovery_min_apply_delay on the standby instead.'
+                )
+
+        self.stdout.write(f"Replicating to {', '.join(aliases)} every {options['lag']}s.")
+        while True:
+            source = sqlite3.connect(connections['default'].settings_dict['NAME'])
+            try:
+                for alias in aliases:
+                    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            if options['once']:
+                return
+            time.sleep(options['lag'])
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core import slow_queries
+
+
+class Command(BaseCommand):
+    help = 'List the slowest query shapes recorded by the slow-query log, by total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--plans', action='store_true', help='Print the sampled EXPLAIN plans')
+        parser.add_argument('--clear', action='store_true', help='Delete the recorded entries afterwards')
+
+    def handle(self, *args, **options):
+        offenders = slow_queries.top_offenders(options['limit'])
+        if not offenders:
+            self.stdout.write('No slow queries recorded.')
+        for rank, group in enumerate(offenders, start=1):
+            self.stdout.write(self.style.WARNING(
+                f"#{rank} {group['total_ms']:.0f} ms total, {group['count']} calls, "
+                f"avg {group['avg_ms']:.1f} ms, max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f"   {group['shape']}")
+            self.stdout.write(f"   views: {', '.join(group['views'])}")
+            for site in group['call_sites']:
+                self.stdout.write(f'   at {site}')
+            if options['plans']:
+                for plan in group['plans']:
+                    self.stdout.write('   plan:')
+                    for line in plan.splitlines():
+                        self.stdout.write(f'     {line}')
+        if options['clear']:
+            slow_queries.clear()
+            self.stdout.write('Slow-query log cleared.')
@@ -0,0 +1,98 @@
+"""
+Prometheus metrics.
+
+Request, database and domain metrics are defined here and exposed at
+``/metrics``. Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+writable directory before the workers start: every worker then writes its
+samples to memory-mapped files in that directory and the endpoint
+aggregates all of them, so numbers stay correct whichever worker answers
+the scrape. Stock levels are read from the database at scrape time rather
+than kept per worker.
+"""
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+LABELS = ['view', 'method', 'status']
+
+REQUEST_LATENCY = Histogram(
+    'relief_http_request_duration_seconds',
+    'Request latency by resolved URL name',
+    LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    'relief_http_response_size_bytes',
+    'Response body size by resolved URL name',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, float('inf')),
+)
+DB_QUERIES = Histogram(
+    'relief_db_queries_per_request',
+    'Database queries issued per request',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float('inf')),
+)
+DB_TIME = Histogram(
+    'relief_db_time_per_request_seconds',
+    'Time spent in database queries per request',
+    ['view'],
+)
+
+SUBMISSIONS = Counter(
+    'relief_application_submissions_total',
+    'Application submissions by outcome (created, queued, restricted, invalid)',
+    ['outcome'],
+)
+REVIEWS = Counter(
+    'relief_application_reviews_total',
+    'Supervisor review decisions',
+    ['decision'],
+)
+SCANS = Counter(
+    'relief_pickup_scans_total',
+    'QR code verifications by outcome',
+    ['outcome'],
+)
+CONFIRMATIONS = Counter(
+    'relief_pickup_confirmations_total',
+    'Pickups confirmed as collected',
+)
+
+
+class StockCollector:
+    """Current stock per package, read from the database at scrape time"""
+
+    def describe(self):
+        # Keeps registration from running a query at import time
+        return []
+
+    def collect(self):
+        from packages.models import Package
+
+        available = GaugeMetricFamily(
+            'relief_package_available_quantity', 'Units available per package', labels=['package_type']
+        )
+        total = GaugeMetricFamily(
+            'relief_package_total_quantity', 'Units ever stocked per package', labels=['package_type']
+        )
+        for package_type, available_quantity, total_quantity in Package.objects.values_list(
+            'package_type', 'available_quantity', 'total_quantity'
+        ):
+            available.add_metric([package_type], available_quantity)
+            total.add_metric([package_type], total_quantity)
+        yield available
+        yield total
+
+
+REGISTRY.register(StockCollector())
+
+
+def render_latest():
+    """Prometheus text exposition of every metric, across all workers"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(StockCollector())
+    return generate_latest(registry)
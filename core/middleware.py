@@ -0,0 +1,329 @@
+"""
+Request-level middleware: metrics collection, the slow-query log, load
+shedding, read-replica routing (see core.db_router), Idempotency-Key replay
+(see core.idempotency) and HTML compression.
+
+Load shedding for the public endpoints:
+
+Each worker process admits at most ``MAX_CONCURRENCY`` protected requests at
+a time. While the moving average of database query latency is above
+``DB_LATENCY_THRESHOLD_MS`` the limit drops to ``DEGRADED_CONCURRENCY``.
+Requests over the limit are refused immediately with 503 and Retry-After
+instead of queueing behind a slow database until they time out.
+
+All of them run natively under both WSGI and ASGI, so the async views are
+not pushed back onto a thread by the middleware in front of them. Queries
+reach them through one execute wrapper installed on every connection, which
+calls the observers of the current request (held in a context variable, so
+they follow the request onto the threads the async ORM runs queries on).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+
+from . import db_router, idempotency, metrics, slow_queries
+
+_query_observers = ContextVar('query_observers', default=())
+
+
+def _options():
+    options = {
+        'URL_NAMES': [],
+        'MAX_CONCURRENCY': 16,
+        'DEGRADED_CONCURRENCY': 4,
+        'DB_LATENCY_THRESHOLD_MS': 200,
+        'RETRY_AFTER_SECONDS': 5,
+    }
+    options.update(getattr(settings, 'LOAD_SHEDDING', {}))
+    return options
+
+
+def observe_queries(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        for observer in observers:
+            observer(sql, params, many, seconds)
+
+
+def install_query_observer(sender, connection, **kwargs):
+    """connection_created receiver (see CoreConfig.ready)"""
+    if observe_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_queries)
+
+
+@contextmanager
+def observing_queries(observer):
+    """Call ``observer(sql, params, many, seconds)`` for each query in this block"""
+    token = _query_observers.set((*_query_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+class HybridMiddleware:
+    """Base for middleware with a sync ``handle`` and an async ``__acall__``"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            if hasattr(self, 'process_view'):
+                # These hooks never touch the database, so they can run on the
+                # event loop instead of being sent to a thread
+                sync_process_view = self.process_view
+
+                async def process_view(*args):
+                    return sync_process_view(*args)
+                self.process_view = process_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class ConcurrencyLimiter:
+    """Non-blocking in-flight counter whose limit adapts to DB latency"""
+
+    # Weight of the newest sample in the DB latency moving average
+    smoothing = 0.2
+
+    def __init__(self, max_concurrency, degraded_concurrency, latency_threshold_ms):
+        self.max_concurrency = max_concurrency
+        self.degraded_concurrency = degraded_concurrency
+        self.latency_threshold_ms = latency_threshold_ms
+        self.in_flight = 0
+        self.db_latency_ms = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def degraded(self):
+        return self.db_latency_ms > self.latency_threshold_ms
+
+    @property
+    def limit(self):
+        return self.degraded_concurrency if self.degraded else self.max_concurrency
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_db_latency(self, duration_ms):
+        with self._lock:
+            self.db_latency_ms += self.smoothing * (duration_ms - self.db_latency_ms)
+
+
+class LoadSheddingMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        options = _options()
+        self.url_names = set(options['URL_NAMES'])
+        self.retry_after = options['RETRY_AFTER_SECONDS']
+        self.limiter = ConcurrencyLimiter(
+            options['MAX_CONCURRENCY'],
+            options['DEGRADED_CONCURRENCY'],
+            options['DB_LATENCY_THRESHOLD_MS'],
+        )
+        super().__init__(get_response)
+
+    def handle(self, request):
+        # Every query in this worker feeds the latency average
+        try:
+            with observing_queries(self._record_latency):
+                return self.get_response(request)
+        finally:
+            if getattr(request, '_load_shedding_slot', False):
+                self.limiter.release()
+
+    async def __acall__(self, request):
+        try:
+            with observing_queries(self._record_latency):
+                return await self.get_response(request)
+        finally:
+            if getattr(request, '_load_shedding_slot', False):
+                self.limiter.release()
+
+    def _record_latency(self, sql, params, many, seconds):
+        self.limiter.record_db_latency(seconds * 1000)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.url_name not in self.url_names:
+            return None
+        if not self.limiter.try_acquire():
+            response = JsonResponse({
+                'success': False,
+                'message': 'The service is busy right now. Please try again in a few seconds.'
+            }, status=503)
+            response['Retry-After'] = str(self.retry_after)
+            return response
+        request._load_shedding_slot = True
+        return None
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Record latency, response size and DB usage per resolved URL name"""
+
+    def handle(self, request):
+        database = {'queries': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+        with observing_queries(self._query_counter(database)):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, database)
+        return response
+
+    async def __acall__(self, request):
+        database = {'queries': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+        with observing_queries(self._query_counter(database)):
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, database)
+        return response
+
+    def _query_counter(self, database):
+        def count_query(sql, params, many, seconds):
+            database['queries'] += 1
+            database['seconds'] += seconds
+        return count_query
+
+    def _record(self, request, response, elapsed, database):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        labels = (view, request.method, str(response.status_code))
+        metrics.REQUEST_LATENCY.labels(*labels).observe(elapsed)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+        metrics.DB_QUERIES.labels(view).observe(database['queries'])
+        metrics.DB_TIME.labels(view).observe(database['seconds'])
+
+
+class SlowQueryMiddleware(HybridMiddleware):
+    """Log queries over SLOW_QUERY_LOG['THRESHOLD_MS'] (see core.slow_queries)"""
+
+    def __init__(self, get_response):
+        self.options = slow_queries.get_options()
+        super().__init__(get_response)
+
+    def handle(self, request):
+        if not self.options['ENABLED']:
+            return self.get_response(request)
+        with observing_queries(self._timer(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.options['ENABLED']:
+            return await self.get_response(request)
+        with observing_queries(self._timer(request)):
+            return await self.get_response(request)
+
+    def _timer(self, request):
+        def timed_query(sql, params, many, seconds):
+            duration_ms = seconds * 1000
+            if duration_ms < self.options['THRESHOLD_MS'] or slow_queries.is_recording():
+                return
+            match = getattr(request, 'resolver_match', None)
+            view = (match.url_name or match.view_name) if match else 'unresolved'
+            slow_queries.record(view, sql, None if many else params, duration_ms, self.options)
+        return timed_query
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Scope core.db_router's routing state to the request and pin clients that wrote"""
+
+    def handle(self, request):
+        token = db_router.begin_request(request)
+        try:
+            response = self.get_response(request)
+            db_router.pin_after_write(request, response)
+            return response
+        finally:
+            db_router.end_request(token)
+
+    async def __acall__(self, request):
+        token = db_router.begin_request(request)
+        try:
+            response = await self.get_response(request)
+            db_router.pin_after_write(request, response)
+            return response
+        finally:
+            db_router.end_request(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        db_router.route_reads(request.resolver_match.url_name)
+        return None
+
+
+class IdempotencyMiddleware(HybridMiddleware):
+    """Answer retried writes with their first response (see core.idempotency)"""
+
+    def __init__(self, get_response):
+        self.options = idempotency.get_options()
+        super().__init__(get_response)
+
+    def handle(self, request):
+        if not self.options['ENABLED'] or not idempotency.is_keyed(request):
+            return self.get_response(request)
+        try:
+            key, request_hash = idempotency.request_key(request, self.options)
+        except ValueError as exc:
+            return idempotency.error_response(400, str(exc))
+        outcome = idempotency.claim(key, request_hash, self.options)
+        if outcome is not True:
+            return outcome
+        response = self.get_response(request)
+        idempotency.finish(key, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self.options['ENABLED'] or not idempotency.is_keyed(request):
+            return await self.get_response(request)
+        try:
+            key, request_hash = await sync_to_async(idempotency.request_key)(request, self.options)
+        except ValueError as exc:
+            return idempotency.error_response(400, str(exc))
+        outcome = await sync_to_async(idempotency.claim)(key, request_hash, self.options)
+        if outcome is not True:
+            return outcome
+        response = await self.get_response(request)
+        await sync_to_async(idempotency.finish)(key, response)
+        return response
+
+
+class HTMLGZipMiddleware(GZipMiddleware):
+    """
+    Gzip rendered pages. Static files come precompressed from serve_asset
+    and images do not shrink, so only HTML is compressed here; Django's
+    GZipMiddleware pads the output against BREACH.
+    """
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith('text/html'):
+            return response
+        return super().process_response(request, response)
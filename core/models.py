@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .config import bump_version, get_raw
+from .partitioning import PartitionedManager
 
 
 class TimeStampedModel(models.Model):
@@ -59,13 +62,20 @@ class ConfigurationSettings(TimeStampedModel):
     def __str__(self):
         return f"{self.key}: {self.value}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Let every worker refresh its cached snapshot once this is visible
+        transaction.on_commit(bump_version)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(bump_version)
+        return result
+    
     @classmethod
     def get_value(cls, key, default=None):
-        try:
-            setting = cls.objects.get(key=key, is_active=True)
-            return setting.value
-        except cls.DoesNotExist:
-            return default
+        # Served from the per-process snapshot, see core.config
+        return get_raw(key, default)
     
     @classmethod
     def set_value(cls, key, value, description='', user=None):
@@ -94,6 +104,8 @@ class AuditLog(TimeStampedModel):
         ('APPROVE', 'Approve'),
         ('REJECT', 'Reject'),
         ('PICKUP', 'Pickup'),
+        ('RESTOCK', 'Restock'),
+        ('ADJUST_STOCK', 'Stock Adjustment'),
         ('LOGIN', 'Login'),
         ('LOGOUT', 'Logout'),
     ]
@@ -101,6 +113,8 @@ class AuditLog(TimeStampedModel):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='audit_logs'
     )
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
@@ -110,6 +124,10 @@ class AuditLog(TimeStampedModel):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     additional_info = models.JSONField(blank=True, null=True)
+    # Not auto_now_add: core.audit sets it when the action is recorded, before buffering
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = PartitionedManager()
     
     class Meta:
         verbose_name = 'Audit Log'
@@ -122,4 +140,51 @@ class AuditLog(TimeStampedModel):
         ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.action} - {self.model_name}"
+        username = self.user.username if self.user else 'anonymous'
+        return f"{username} - {self.action} - {self.model_name}"
+
+
+class VersionStamp(models.Model):
+    """A version number every worker can see, whatever the cache backend (see core.version_stamps)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.name} {self.version}"
+
+
+class IdempotencyKey(models.Model):
+    """The first response to a request sent with an Idempotency-Key header (see core.idempotency)"""
+    # sha256 of the client's key, the user and the endpoint
+    key = models.CharField(max_length=64, primary_key=True)
+    request_hash = models.CharField(max_length=64)
+    # Null while the first request is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(default=b'')
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.key[:12]} ({self.status_code or 'in flight'})"
+
+
+class SlowQuery(models.Model):
+    """One query over SLOW_QUERY_LOG['THRESHOLD_MS'] (see core.slow_queries)"""
+    shape_id = models.CharField(max_length=12, db_index=True)
+    shape = models.TextField()
+    view = models.CharField(max_length=200)
+    call_site = models.CharField(max_length=300)
+    duration_ms = models.FloatField()
+    # Parameter types only, never values
+    params = models.JSONField(default=list)
+    # EXPLAIN output for the first EXPLAIN_SAMPLES of each shape
+    plan = models.TextField(blank=True)
+    recorded_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = 'Slow Query'
+        verbose_name_plural = 'Slow Queries'
+    
+    def __str__(self):
+        return f"{self.duration_ms:.0f} ms in {self.view}"
@@ -0,0 +1,178 @@
+"""
+Full-page cache for anonymous public pages.
+
+Rendered responses are stored as bytes under a key that includes the package
+catalog version (bumped on any Package/PackageItem or stock change, see
+packages.signals), the runtime config version (stock badges depend on
+LOW_STOCK_THRESHOLD) and the asset build (pages link fingerprinted files).
+After an invalidation only the worker holding the render lock re-renders;
+everyone else is served the previous copy, or waits briefly for the fresh
+one when there is no previous copy yet.
+
+The catalog version is a VersionStamp row (see core.version_stamps), which
+each worker re-reads at most every VERSION_CHECK_SECONDS, so a change
+reaches every worker within that time whatever the cache backend. The pages, render locks and hit/miss
+counters live in the cache. With a per-process backend such as LocMemCache,
+locks and counters are per-process: each worker renders its own copies,
+and ``page_cache_stats`` says so and reports only its own process. Production needs a shared backend such as
+Redis; the core.W002 system check warns without one.
+"""
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from . import version_stamps
+from .assets import manifest_version
+from .config import get_loaded_version as get_config_version
+
+CATALOG_STAMP = 'catalog'
+CSRF_PLACEHOLDER = '__PAGE_CACHE_CSRF_TOKEN__'
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+# Names of decorated views, used by the page_cache_stats command
+registered_pages = []
+
+
+def _options():
+    options = {'TIMEOUT': 600, 'LOCK_TIMEOUT': 10, 'WAIT_SECONDS': 2, 'VERSION_CHECK_SECONDS': 5}
+    options.update(getattr(settings, 'PAGE_CACHE', {}))
+    return options
+
+
+def get_catalog_version():
+    """The shared catalog version, re-read at most every VERSION_CHECK_SECONDS"""
+    return version_stamps.get(CATALOG_STAMP, _options()['VERSION_CHECK_SECONDS'])
+
+
+def bump_catalog_version():
+    """Invalidate every worker's cached catalog pages; call after the change commits"""
+    version_stamps.bump(CATALOG_STAMP)
+
+
+def is_shared_cache():
+    """False for backends that keep a separate cache in every process"""
+    backend = settings.CACHES['default']['BACKEND']
+    return not backend.endswith(('LocMemCache', 'DummyCache'))
+
+
+def _is_cacheable(request):
+    if request.method != 'GET' or request.GET:
+        return False
+    # Flash messages are rendered into the page, so never cache them
+    if 'messages' in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+def _record(name, outcome, saved_ms=0.0):
+    _incr(f'page_cache:stats:{name}:{outcome}')
+    if saved_ms:
+        _incr(f'page_cache:stats:{name}:saved_us', int(saved_ms * 1000))
+
+
+def get_stats(name):
+    """Return hit/miss/stale counters and render time saved for a page"""
+    keys = {
+        outcome: f'page_cache:stats:{name}:{outcome}'
+        for outcome in ('hit', 'stale', 'miss', 'saved_us')
+    }
+    values = cache.get_many(keys.values())
+    stats = {outcome: values.get(key, 0) for outcome, key in keys.items()}
+    served = stats['hit'] + stats['stale']
+    total = served + stats['miss']
+    stats['hit_rate'] = served / total if total else 0.0
+    stats['saved_ms'] = stats.pop('saved_us') / 1000
+    return stats
+
+
+def _build_response(request, entry, outcome):
+    content = entry['content'].replace(
+        CSRF_PLACEHOLDER.encode(), get_token(request).encode()
+    )
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = outcome
+    return response
+
+
+def _render(request, view_func, args, kwargs):
+    started = time.perf_counter()
+    response = view_func(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response = response.render()
+    render_ms = (time.perf_counter() - started) * 1000
+    if response.status_code != 200 or response.streaming:
+        return response, None
+    content = CSRF_INPUT_RE.sub(
+        rb'\g<1>' + CSRF_PLACEHOLDER.encode() + rb'\g<2>', response.content
+    )
+    entry = {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'render_ms': render_ms,
+    }
+    return response, entry
+
+
+def cache_public_page(view_func):
+    """Serve anonymous GETs of ``view_func`` from the page cache"""
+    name = view_func.__name__
+    registered_pages.append(name)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view_func(request, *args, **kwargs)
+
+        options = _options()
+        path = request.path
+        key = f'page_cache:{path}:{get_catalog_version()}:{get_config_version()}:{manifest_version()}'
+        stale_key = f'page_cache:stale:{path}'
+        lock_key = f'page_cache:lock:{path}'
+
+        entry = cache.get(key)
+        if entry is not None:
+            _record(name, 'hit', entry['render_ms'])
+            return _build_response(request, entry, 'HIT')
+
+        if not cache.add(lock_key, 1, options['LOCK_TIMEOUT']):
+            # Someone else is re-rendering: serve the previous copy if we have one
+            stale = cache.get(stale_key)
+            if stale is not None:
+                _record(name, 'stale', stale['render_ms'])
+                return _build_response(request, stale, 'STALE')
+            deadline = time.monotonic() + options['WAIT_SECONDS']
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    _record(name, 'hit', entry['render_ms'])
+                    return _build_response(request, entry, 'HIT')
+            _record(name, 'miss')
+            return view_func(request, *args, **kwargs)
+
+        try:
+            response, entry = _render(request, view_func, args, kwargs)
+            if entry is not None:
+                cache.set(key, entry, options['TIMEOUT'])
+                # Only ever served while a re-render holds the lock
+                cache.set(stale_key, entry, None)
+        finally:
+            cache.delete(lock_key)
+        _record(name, 'miss')
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    return wrapper
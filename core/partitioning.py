@@ -0,0 +1,322 @@
+"""
+Monthly time partitioning for the append-only tables (``PARTITIONING``).
+
+On PostgreSQL the model table becomes a native ``PARTITION BY RANGE
+(created_at)`` parent with one ``<table>_pYYYYMM`` partition per month, so
+every query filtered on ``created_at`` is pruned by the planner and the ORM
+keeps working unchanged. A ``<table>_default`` partition catches rows no
+month covers yet (``partition_tables`` not run in time), and they move to
+their month when its partition is created. Elsewhere the model table holds
+the current month and closed months are rotated into ``<table>_pYYYYMM``
+tables of the same shape; ``Model.objects.created_between()`` reads only
+the tables that overlap the requested range. Plain ORM queries see only the
+model table there, so work that must reach every row, whatever its month,
+goes through ``Model.objects.partitions()``.
+
+Retention archives whole expired partitions to gzip JSONL and drops them,
+instead of deleting rows one by one. Both steps are driven by the
+``partition_tables`` and ``apply_retention`` management commands.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+PARTITION_RE = r'^%s_p(\d{4})(\d{2})$'
+
+
+def get_options():
+    options = {'MODELS': {}, 'MONTHS_AHEAD': 3, 'ARCHIVE_DIR': os.path.join(settings.BASE_DIR, 'archive')}
+    options.update(getattr(settings, 'PARTITIONING', {}))
+    return options
+
+
+def partitioned_models():
+    """(model, retention months) for every model listed in PARTITIONING['MODELS']"""
+    return [
+        (apps.get_model(label), model_options.get('RETENTION_MONTHS'))
+        for label, model_options in get_options()['MODELS'].items()
+    ]
+
+
+def month_start(value):
+    return timezone.make_aware(datetime(value.year, value.month, 1), timezone.get_default_timezone())
+
+
+def add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return month_start(datetime(index // 12, index % 12 + 1, 1))
+
+
+def partition_name(model, start):
+    return f'{model._meta.db_table}_p{start:%Y%m}'
+
+
+def existing_partitions(model):
+    """{month start: table name} for the model's partitions, oldest first"""
+    pattern = re.compile(PARTITION_RE % re.escape(model._meta.db_table))
+    found = {}
+    for table in connection.introspection.table_names():
+        match = pattern.match(table)
+        if match:
+            found[month_start(datetime(int(match[1]), int(match[2]), 1))] = table
+    return dict(sorted(found.items()))
+
+
+def uses_native_partitions():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(model):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def _literal(value):
+    # Partition bounds are DDL, which cannot take bind parameters
+    return "'%s'" % value.isoformat()
+
+
+def _column_list(model):
+    return ', '.join(connection.ops.quote_name(field.column) for field in model._meta.local_fields)
+
+
+# PostgreSQL
+
+def convert_to_partitioned(model, months_ahead):
+    """Rebuild a plain table as a range-partitioned parent, copying its rows"""
+    table = model._meta.db_table
+    legacy = f'{table}_legacy'
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.schema_editor() as editor, connection.cursor() as cursor:
+        editor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+        editor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE ({qn("created_at")})'
+        )
+        cursor.execute(f'SELECT MIN({qn("created_at")}) FROM {qn(legacy)}')
+        oldest = cursor.fetchone()[0] or timezone.now()
+        create_partitions(model, month_start(oldest), months_ahead)
+        columns = _column_list(model)
+        editor.execute(
+            f'INSERT INTO {qn(table)} ({columns}) OVERRIDING SYSTEM VALUE '
+            f'SELECT {columns} FROM {qn(legacy)}'
+        )
+        editor.execute(f'DROP TABLE {qn(legacy)}')
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM " + qn(table),
+            [table]
+        )
+        # The partition key must be part of the primary key
+        editor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn("id")}, {qn("created_at")})')
+        for sql in editor._model_indexes_sql(model):
+            editor.execute(sql)
+        for field in model._meta.local_fields:
+            if field.remote_field and field.db_constraint:
+                editor.execute(editor._create_fk_sql(model, field, '_fk_%(to_table)s_%(to_column)s'))
+
+
+def default_partition_name(model):
+    return f'{model._meta.db_table}_default'
+
+
+def default_partition_rows(model):
+    """Rows in the DEFAULT partition: ones no monthly partition covers"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(default_partition_name(model))}')
+        return cursor.fetchone()[0]
+
+
+def create_partitions(model, first, months_ahead):
+    """
+    Create the DEFAULT partition if missing, and the monthly partitions from
+    ``first`` to ``months_ahead`` past the current month
+    """
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    default = default_partition_name(model)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {qn(default)} PARTITION OF {qn(table)} DEFAULT')
+    existing = existing_partitions(model)
+    last = add_months(month_start(timezone.now()), months_ahead)
+    columns = _column_list(model)
+    created = []
+    start = first
+    while start <= last:
+        end = add_months(start, 1)
+        if start not in existing:
+            name = partition_name(model, start)
+            # A month cannot be attached while DEFAULT holds rows for it, so they move first
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {qn(default)} WHERE {qn("created_at")} >= %s '
+                    f'AND {qn("created_at")} < %s RETURNING {columns}) '
+                    f'INSERT INTO {qn(name)} ({columns}) SELECT {columns} FROM moved',
+                    [start, end]
+                )
+                cursor.execute(
+                    f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} '
+                    f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})'
+                )
+            created.append(name)
+        start = end
+    return created
+
+
+# Table-per-period fallback
+
+_period_models = {}
+
+
+def shadow_model(model, table, class_name):
+    """An unmanaged model class with the same fields as ``model``, stored in ``table``"""
+    attrs = {'__module__': model.__module__}
+    for field in model._meta.local_fields:
+        _, _, args, kwargs = field.deconstruct()
+        if field.is_relation:
+            # Shadow tables never get reverse accessors or FK constraints
+            kwargs.update(related_name='+', db_constraint=False)
+        attrs[field.name] = field.__class__(*args, **kwargs)
+    attrs['Meta'] = type('Meta', (), {
+        'app_label': model._meta.app_label,
+        'db_table': table,
+        'managed': False,
+        'ordering': model._meta.ordering,
+        'indexes': [models.Index(fields=index.fields) for index in model._meta.indexes],
+    })
+    return type(class_name, (models.Model,), attrs)
+
+
+def period_model(model, start):
+    """An unmanaged model class with the same fields as ``model``, stored in its month's table"""
+    name = partition_name(model, start)
+    if name not in _period_models:
+        _period_models[name] = shadow_model(model, name, f'{model.__name__}P{start:%Y%m}')
+    return _period_models[name]
+
+
+def rotate(model):
+    """Move rows from closed months out of the model table into their period tables"""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    current = month_start(timezone.now())
+    existing = existing_partitions(model)
+    columns = _column_list(model)
+    moved = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT MIN({qn("created_at")}) FROM {qn(table)} WHERE {qn("created_at")} < %s',
+            [connection.ops.adapt_datetimefield_value(current)]
+        )
+        oldest = cursor.fetchone()[0]
+    if oldest is None:
+        return moved
+    if isinstance(oldest, str):
+        oldest = datetime.fromisoformat(oldest)
+    start = month_start(oldest)
+    while start < current:
+        end = add_months(start, 1)
+        bounds = [connection.ops.adapt_datetimefield_value(start), connection.ops.adapt_datetimefield_value(end)]
+        where = f'{qn("created_at")} >= %s AND {qn("created_at")} < %s'
+        if start not in existing:
+            # Outside the move's transaction: SQLite cannot alter its schema inside one
+            with connection.schema_editor() as editor:
+                editor.create_model(period_model(model, start))
+        name = partition_name(model, start)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {qn(name)} ({columns}) SELECT {columns} FROM {qn(table)} WHERE {where}', bounds
+            )
+            if cursor.rowcount:
+                moved[name] = cursor.rowcount
+            cursor.execute(f'DELETE FROM {qn(table)} WHERE {where}', bounds)
+        start = end
+    return moved
+
+
+class PartitionedManager(models.Manager):
+    def partitions(self, **filters):
+        """
+        One queryset per table holding the model's rows, each filtered by
+        ``filters``: the model table, plus every rotated month's table on the
+        fallback backend (natively, the model table covers them all)
+        """
+        querysets = [self.get_queryset().filter(**filters)]
+        if not uses_native_partitions():
+            querysets += [
+                period_model(self.model, period_start).objects.filter(**filters)
+                for period_start in existing_partitions(self.model)
+            ]
+        return querysets
+
+    def created_between(self, start, end, **filters):
+        """
+        Rows with start <= created_at < end matching ``filters``, reading
+        only the partitions that overlap the range. On the fallback backend
+        the result is a UNION, so it can be ordered and sliced but not
+        filtered further.
+        """
+        in_range = {'created_at__gte': start, 'created_at__lt': end, **filters}
+        queryset = self.get_queryset().filter(**in_range)
+        if uses_native_partitions():
+            return queryset
+        parts = [
+            period_model(self.model, period_start).objects.filter(**in_range).order_by()
+            for period_start in existing_partitions(self.model)
+            if period_start < end and add_months(period_start, 1) > start
+        ]
+        if not parts:
+            return queryset
+        # The model table itself only holds months that have not been rotated yet
+        return queryset.order_by().union(*parts, all=True)
+
+
+# Retention
+
+def expired_partitions(model, retention_months):
+    cutoff = add_months(month_start(timezone.now()), -retention_months)
+    return [
+        (start, name) for start, name in existing_partitions(model).items()
+        if add_months(start, 1) <= cutoff
+    ]
+
+
+def archive_partition(model, name, archive_dir, chunk_size=5000):
+    """Write every row of partition ``name`` to ``<archive_dir>/<table>/<name>.jsonl.gz``"""
+    qn = connection.ops.quote_name
+    directory = os.path.join(archive_dir, model._meta.db_table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.jsonl.gz')
+    columns = [field.column for field in model._meta.local_fields]
+    rows = 0
+    # A server-side cursor on PostgreSQL, so a large partition is streamed rather than loaded whole
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive, connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f'SELECT {_column_list(model)} FROM {qn(name)} ORDER BY {qn("id")}'
+        )
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for row in chunk:
+                archive.write(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n')
+            rows += len(chunk)
+    with open(path + '.tmp', 'rb') as written:
+        os.fsync(written.fileno())
+    os.replace(path + '.tmp', path)
+    return path, rows
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {connection.ops.quote_name(name)}')
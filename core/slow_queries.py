@@ -0,0 +1,181 @@
+"""
+Slow-query log.
+
+``core.middleware.SlowQueryMiddleware`` wraps every query of a request. Queries slower than
+``SLOW_QUERY_LOG['THRESHOLD_MS']`` are recorded with their normalized SQL
+shape, the view and project source line that issued them, the duration and
+redacted parameters (types only). The first ``EXPLAIN_SAMPLES`` occurrences
+of each SELECT shape also get an EXPLAIN plan (ANALYZE on PostgreSQL when
+``EXPLAIN_ANALYZE`` is on).
+
+Entries go to the SlowQuery table, so the staff page and the
+``slow_queries`` command see every worker's entries. Only the newest
+``BUFFER_SIZE`` are kept. An entry is written in a savepoint of the request's
+transaction, so a request that rolls back loses its entries too.
+"""
+import hashlib
+import re
+import threading
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+# Trim the table back to BUFFER_SIZE once every this many entries
+TRIM_EVERY = 50
+
+# Set while we run our own EXPLAIN or INSERT so it is not timed and logged itself
+_state = threading.local()
+
+
+def get_options():
+    options = {
+        'ENABLED': True,
+        'THRESHOLD_MS': 100,
+        'EXPLAIN_SAMPLES': 3,
+        'EXPLAIN_ANALYZE': False,
+        'BUFFER_SIZE': 500,
+    }
+    options.update(getattr(settings, 'SLOW_QUERY_LOG', {}))
+    return options
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Collapse literals and IN-lists so equivalent queries share one shape"""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def shape_id(shape):
+    return hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+def redact(params):
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+# Our own query wrappers sit between the caller and the database
+WRAPPER_FILES = ('core/middleware.py', 'core/slow_queries.py')
+
+
+def call_site():
+    """Innermost frame from project code (not Django, packages or query wrappers)"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename.replace('\\', '/')
+        if not frame.filename.startswith(base_dir) or 'site-packages' in filename:
+            continue
+        if filename.endswith(WRAPPER_FILES):
+            continue
+        return f'{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+def is_recording():
+    return getattr(_state, 'recording', False)
+
+
+def explain(sql, params, analyze):
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    elif vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        # Savepoint, so a failed EXPLAIN cannot poison the request's transaction
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as exc:  # A failed EXPLAIN must never break the request
+        return f'EXPLAIN failed: {exc}'
+
+
+def _should_explain(sid, sql, options):
+    """Only the first EXPLAIN_SAMPLES SELECTs of each shape get a plan"""
+    from .models import SlowQuery
+
+    if not options['EXPLAIN_SAMPLES'] or not sql.lstrip().upper().startswith('SELECT'):
+        return False
+    return SlowQuery.objects.filter(shape_id=sid).exclude(plan='').count() < options['EXPLAIN_SAMPLES']
+
+
+def record(view, sql, params, duration_ms, options):
+    from .models import SlowQuery
+
+    shape = normalize(sql)
+    sid = shape_id(shape)
+    _state.recording = True
+    try:
+        plan = explain(sql, params, options['EXPLAIN_ANALYZE']) if _should_explain(sid, sql, options) else ''
+        with transaction.atomic():
+            entry = SlowQuery.objects.create(
+                shape_id=sid, shape=shape, view=view, call_site=call_site(),
+                duration_ms=round(duration_ms, 2), params=redact(params), plan=plan,
+                recorded_at=timezone.now(),
+            )
+            if entry.pk % TRIM_EVERY == 0:
+                trim(options['BUFFER_SIZE'])
+    except Exception:  # Logging a slow query must never break the request
+        pass
+    finally:
+        _state.recording = False
+
+
+def trim(size):
+    """Delete all but the newest ``size`` entries"""
+    from .models import SlowQuery
+
+    oldest_kept = SlowQuery.objects.order_by('-id').values_list('id', flat=True)[size - 1:size].first()
+    if oldest_kept is not None:
+        SlowQuery.objects.filter(id__lt=oldest_kept).delete()
+
+
+def top_offenders(limit=20):
+    """Recorded shapes ranked by total time"""
+    from .models import SlowQuery
+
+    ranked = list(
+        SlowQuery.objects.values('shape_id')
+        .annotate(count=Count('id'), total_ms=Sum('duration_ms'), max_ms=Max('duration_ms'))
+        .order_by('-total_ms')[:limit]
+    )
+    details = defaultdict(lambda: {'views': set(), 'call_sites': set(), 'plans': []})
+    for entry in SlowQuery.objects.filter(shape_id__in=[group['shape_id'] for group in ranked]).order_by('id'):
+        detail = details[entry.shape_id]
+        detail['shape'] = entry.shape
+        detail['views'].add(entry.view)
+        detail['call_sites'].add(entry.call_site)
+        if entry.plan:
+            detail['plans'].append(entry.plan)
+    for group in ranked:
+        detail = details[group['shape_id']]
+        group['shape'] = detail['shape']
+        group['avg_ms'] = group['total_ms'] / group['count']
+        group['views'] = sorted(detail['views'])
+        group['call_sites'] = sorted(detail['call_sites'])
+        group['plans'] = detail['plans']
+    return ranked
+
+
+def clear():
+    from .models import SlowQuery
+
+    SlowQuery.objects.all().delete()
@@ -0,0 +1,49 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+
+from core import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name):
+    """URL of the fingerprinted build of static file ``name``; plain {% static %} until it is built"""
+    return assets.asset_url(name) or static(name)
+
+
+class PageScriptNode(template.Node):
+    def __init__(self, script):
+        self.script = script
+        self.source_hash = assets.content_hash(script)
+
+    def render(self, context):
+        url = assets.bundle_url(self.source_hash)
+        if url:
+            return mark_safe(f'<script src="{url}"></script>')
+        return mark_safe(f'<script>{self.script}</script>')
+
+
+@register.tag
+def pagescript(parser, token):
+    """
+    A page's inline script, served as a cached bundle once build_assets has
+    extracted it::
+
+        {% pagescript %}
+        document.getElementById('scan').focus();
+        {% endpagescript %}
+
+    The body must be plain JavaScript: values from the context go in data-
+    attributes or {{ value|json_script }} so the bundle is the same for
+    every request.
+    """
+    nodelist = parser.parse(('endpagescript',))
+    parser.delete_first_token()
+    if any(not isinstance(node, template.base.TextNode) for node in nodelist):
+        raise template.TemplateSyntaxError(
+            'pagescript blocks cannot contain template tags or variables; '
+            'pass values through data- attributes or json_script.'
+        )
+    return PageScriptNode(''.join(node.s for node in nodelist))
@@ -1,3 +1,738 @@
-from django.test import TestCase
+import base64
+import copy
+import datetime
+import gzip
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import JsonResponse
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from applications import async_views as application_async_views, views as application_views
+from applications import rounds
+from applications.models import Application, DistributionRound
+from packages import async_views as package_async_views
+from packages.models import Package
+from packages.views import PackageListView
+from pickups import async_views as pickup_async_views, views as pickup_views
+from notifications.models import Notification
+from pickups.models import Pickup
+
+from . import (
+    assets, audit, benchmarks, config, dataset, idempotency, metrics, page_cache, partitioning, slow_queries
+)
+from .cold_storage import cold_model, cold_table_exists
+from .middleware import (
+    ConcurrencyLimiter, IdempotencyMiddleware, LoadSheddingMiddleware, ReplicaRoutingMiddleware, SlowQueryMiddleware,
+)
+from .models import AuditLog, ConfigurationSettings, SlowQuery, VersionStamp
+from .throttling import IPTokenBucketThrottle
+
+
+def p99(samples):
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.99) - 1]
+
+
+@override_settings(LOAD_SHEDDING={
+    'URL_NAMES': ['verify_qr_code'],
+    'MAX_CONCURRENCY': 4,
+    'DEGRADED_CONCURRENCY': 1,
+    'DB_LATENCY_THRESHOLD_MS': 200,
+})
+class LoadSheddingTests(SimpleTestCase):
+    clients = 200
+    service_seconds = 0.02
+    db_capacity = 4
+
+    def run_overload(self, shed):
+        """
+        Every client arrives at once at a database that serves db_capacity
+        requests at a time; (latencies on a simulated clock, statuses)
+        """
+        middleware = LoadSheddingMiddleware(lambda request: None)
+        factory = RequestFactory()
+        admitted, statuses = 0, []
+        for _ in range(self.clients):
+            request = factory.post('/api/pickups/verify/')
+            request.resolver_match = resolve('/api/pickups/verify/')
+            refused = middleware.process_view(request, None, (), {}) if shed else None
+            statuses.append(refused.status_code if refused else 200)
+            admitted += refused is None
+        # Admitted requests are served db_capacity at a time in arrival order; refused ones return at once
+        latencies = [(position // self.db_capacity + 1) * self.service_seconds for position in range(admitted)]
+        return latencies + [0.0] * (self.clients - admitted), statuses
+
+    def test_limiter_keeps_p99_bounded_under_overload(self):
+        queued, _ = self.run_overload(shed=False)
+        shed, statuses = self.run_overload(shed=True)
+
+        # Without shedding the tail waits for the whole backlog to drain
+        self.assertGreater(p99(queued), 0.5)
+        # With shedding nobody waits longer than one service time
+        self.assertLessEqual(p99(shed), self.service_seconds)
+        self.assertEqual(statuses.count(200), 4)
+        self.assertEqual(statuses.count(503), self.clients - 4)
+
+    def test_refused_requests_carry_retry_after(self):
+        middleware = LoadSheddingMiddleware(lambda request: None)
+        middleware.limiter.in_flight = middleware.limiter.limit
+        request = RequestFactory().post('/api/pickups/verify/')
+        request.resolver_match = resolve('/api/pickups/verify/')
+        response = middleware.process_view(request, None, (), {})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_limit_drops_when_database_is_slow(self):
+        limiter = ConcurrencyLimiter(4, 1, latency_threshold_ms=200)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(20):
+            limiter.record_db_latency(800)
+        self.assertEqual(limiter.limit, 1)
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+
+
+@override_settings(THROTTLE_BUCKETS={
+    'check_application_status': {
+        'ip': {'rate': '60/min', 'burst': 10},
+        'phone': {'rate': '1/min', 'burst': 2},
+    },
+})
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_phone_bucket_is_shared_across_formats(self):
+        url = '/api/applications/check-status/'
+        for phone in ('08012345678', '+2348012345678'):
+            response = self.client.post(url, {'phone': phone})
+            self.assertEqual(response.status_code, 404)
+        response = self.client.post(url, {'phone': '2348012345678'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_concurrent_requests_never_share_a_token(self):
+        request = RequestFactory().post('/api/applications/check-status/')
+        request.resolver_match = resolve('/api/applications/check-status/')
+        barrier = threading.Barrier(30)
+        allowed = []
+
+        def client():
+            barrier.wait()
+            allowed.append(IPTokenBucketThrottle().allow_request(request, None))
+
+        threads = [threading.Thread(target=client) for _ in range(30)]
+        # One window throughout, wherever the test happens to start
+        with mock.patch('core.throttling.time.time', return_value=1000.0):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(allowed.count(True), 10)
+        throttle = IPTokenBucketThrottle()
+        with mock.patch('core.throttling.time.time', return_value=1004.0):
+            self.assertFalse(throttle.allow_request(request, None))
+        self.assertEqual(throttle.wait(), 6.0)
+
+    def test_forwarded_for_does_not_open_a_new_ip_bucket(self):
+        url = '/api/applications/check-status/'
+        statuses = [
+            self.client.post(url, {'reference': 'GCR0000000'}, HTTP_X_FORWARDED_FOR=f'10.0.0.{index}').status_code
+            for index in range(11)
+        ]
+        self.assertEqual(statuses[-1], 429)
+
+        with self.settings(THROTTLE_CLIENT_HEADER='X-Loadtest-Client'):
+            response = self.client.post(url, {'reference': 'GCR0000000'}, HTTP_X_LOADTEST_CLIENT='7')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(AUDIT_LOG={'MAX_ENTRIES': 50, 'MAX_AGE_SECONDS': 60})
+class AuditLogWriterTests(TestCase):
+    def setUp(self):
+        audit.flush()
+        # Whatever a test leaves buffered is written while its database still exists
+        self.addCleanup(audit.flush)
+        self.package = Package.objects.create(
+            name='Basic', package_type='small_basic', description='', cash_amount=0,
+            items_included={}, available_quantity=5
+        )
+        self.request = RequestFactory().post('/', HTTP_USER_AGENT='tests', REMOTE_ADDR='10.0.0.1')
+        self.request.user = User.objects.create_user('auditor')
+
+    def restock(self, quantity=1):
+        before = audit.snapshot(self.package, ['available_quantity', 'total_quantity'])
+        self.package.available_quantity += quantity
+        self.package.total_quantity += quantity
+        audit.record(self.request, 'RESTOCK', self.package, audit.diff(before, self.package), quantity=quantity)
+
+    def test_entries_are_buffered_until_commit_and_diffed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restock(3)
+            self.assertEqual(audit.pending(), 0)
+        self.assertEqual(audit.pending(), 1)
+        self.assertEqual(audit.flush(), 1)
+        entry = AuditLog.objects.get()
+        self.assertEqual(entry.changes, {'available_quantity': [5, 8], 'total_quantity': [0, 3]})
+        self.assertEqual(entry.model_name, 'packages.Package')
+        self.assertEqual(entry.ip_address, '10.0.0.1')
+        self.assertEqual(entry.additional_info, {'quantity': 3})
+
+    def test_rolled_back_actions_leave_no_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.restock()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(audit.pending(), 0)
+
+    def test_entries_keep_the_time_and_address_of_the_action(self):
+        self.request.META['HTTP_X_FORWARDED_FOR'] = '203.0.113.9'
+        recorded_at = timezone.now() - datetime.timedelta(seconds=30)
+        with mock.patch('core.audit.timezone.now', return_value=recorded_at):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.restock()
+        audit.flush()
+        entry = AuditLog.objects.get()
+        self.assertEqual(entry.created_at, recorded_at)
+        self.assertEqual(entry.ip_address, '10.0.0.1')
+
+    def test_size_threshold_flushes_in_one_insert(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for _ in range(50):
+                self.restock()
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(AuditLog.objects.count(), 50)
+        self.assertEqual(audit.pending(), 0)
+
+    def test_overhead_per_action_is_under_a_millisecond(self):
+        actions = 2000
+        started = time.perf_counter()
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(actions):
+                self.restock()
+        audit.flush()
+        per_action_ms = (time.perf_counter() - started) * 1000 / actions
+        self.assertEqual(AuditLog.objects.count(), actions)
+        self.assertLess(per_action_ms, 1.0)
+
+
+class AuditLogSetupTests(TransactionTestCase):
+    def setUp(self):
+        audit.flush()
+
+    def user_column_allows_null(self):
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(cursor, AuditLog._meta.db_table)
+        return next(column.null_ok for column in columns if column.name == 'user_id')
+
+    def test_the_user_column_is_made_nullable(self):
+        field = AuditLog._meta.get_field('user')
+        required = copy.copy(field)
+        required.null = False
+        with connection.schema_editor() as editor:
+            editor.alter_field(AuditLog, field, required)
+        self.addCleanup(call_command, 'setup_audit_log', stdout=StringIO())
+        self.assertFalse(self.user_column_allows_null())
+
+        call_command('setup_audit_log', stdout=StringIO())
+        self.assertTrue(self.user_column_allows_null())
+        package = Package.objects.create(
+            name='Basic', package_type='small_basic', cash_amount=0, items_included={}, available_quantity=5
+        )
+        audit.record(None, 'PICKUP', package, via='scanner')
+        self.assertEqual(audit.flush(), 1)
+        self.assertIsNone(AuditLog.objects.get().user)
+        output = StringIO()
+        call_command('setup_audit_log', stdout=output)
+        self.assertIn('already allows NULL', output.getvalue())
+
+
+class PartitionFallbackTests(TransactionTestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        self.addCleanup(self.drop_partitions)
+        override = override_settings(PARTITIONING={
+            'MODELS': {'core.AuditLog': {'RETENTION_MONTHS': 3}, 'notifications.Notification': {}},
+            'ARCHIVE_DIR': self.archive_dir,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def drop_partitions(self):
+        for model in (AuditLog, Notification):
+            for name in partitioning.existing_partitions(model).values():
+                partitioning.drop_partition(name)
+
+    def log_at(self, created_at):
+        entry = AuditLog.objects.create(action='VIEW', model_name='tests')
+        AuditLog.objects.filter(pk=entry.pk).update(created_at=created_at)
+
+    def test_rotation_range_reads_and_retention(self):
+        current = partitioning.month_start(timezone.now())
+        last_month = partitioning.add_months(current, -1)
+        expired = partitioning.add_months(current, -5)
+        for created_at in (timezone.now(), last_month, expired, expired + datetime.timedelta(days=2)):
+            self.log_at(created_at)
+
+        call_command('partition_tables', stdout=StringIO())
+        self.assertEqual(AuditLog.objects.count(), 1)
+        # Every closed month since the oldest row gets a table, empty or not
+        self.assertEqual(
+            list(partitioning.existing_partitions(AuditLog)),
+            [partitioning.add_months(current, offset) for offset in range(-5, 0)]
+        )
+        everything = AuditLog.objects.created_between(expired, partitioning.add_months(current, 1))
+        self.assertEqual(len(everything), 4)
+        self.assertEqual(len(AuditLog.objects.created_between(last_month, current)), 1)
+
+        call_command('apply_retention', stdout=StringIO())
+        self.assertEqual(
+            list(partitioning.existing_partitions(AuditLog)),
+            [partitioning.add_months(current, offset) for offset in range(-3, 0)]
+        )
+        archive = f'{self.archive_dir}/core_auditlog/core_auditlog_p{expired:%Y%m}.jsonl.gz'
+        with gzip.open(archive, 'rt') as lines:
+            self.assertEqual([json.loads(line)['model_name'] for line in lines], ['tests', 'tests'])
+
+    def test_archiving_a_round_reaches_rotated_notifications(self):
+        distribution_round = DistributionRound.objects.create(name='August', opens_on=timezone.localdate())
+        application = Application.objects.create(
+            first_name='Ada', last_name='Obi', phone='08012345678', address='3 Ring Road, Ibadan',
+            family_size=2, employment_status='employed', tec_member='no', selected_package='small_basic',
+            preferred_date=timezone.localdate(), preferred_time='morning', terms_agreement=True,
+            round=distribution_round,
+        )
+        for created_at in (timezone.now(), partitioning.add_months(partitioning.month_start(timezone.now()), -1)):
+            notification = Notification.objects.create(
+                application=application, notification_type='SMS', recipient=application.phone, message='Approved'
+            )
+            Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        call_command('partition_tables', stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 1)
+        self.addCleanup(self.empty_cold_tables)
+
+        moved = rounds.close_round(distribution_round)
+        self.assertEqual(moved['notifications_notification'], 2)
+        self.assertEqual(sum(queryset.count() for queryset in Notification.objects.partitions()), 0)
+        self.assertEqual(cold_model(Notification).objects.count(), 2)
+
+    def empty_cold_tables(self):
+        for model in rounds.ARCHIVED_MODELS:
+            if cold_table_exists(model):
+                cold_model(model).objects.all().delete()
+
+
+@override_settings(READ_REPLICAS={'ALIASES': ['replica1'], 'URL_NAMES': ['application_list', 'submit_application']})
+class ReplicaRoutingTests(TransactionTestCase):
+    # Not TestCase: its wrapping transaction would keep every read on the primary
+
+    def route(self, method, path, cookies=None, write=False):
+        """Run a request through the middleware; returns (alias reads went to, response)"""
+        routed = {}
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            if write:
+                Package.objects.create(
+                    name='Senior', package_type='senior', cash_amount=5000,
+                    total_quantity=1, available_quantity=1, items_included={},
+                )
+            routed['reads'] = Package.objects.all().db
+            with transaction.atomic():
+                routed['in_transaction'] = Package.objects.all().db
+            return JsonResponse({'success': True})
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        return routed, middleware(request)
+
+    def test_reads_follow_writes_to_the_primary(self):
+        routed, _ = self.route('get', '/api/applications/list/')
+        self.assertEqual(routed, {'reads': 'replica1', 'in_transaction': 'default'})
+        routed, _ = self.route('get', '/api/pickups/list/')
+        self.assertEqual(routed['reads'], 'default')
+
+        routed, response = self.route('post', '/api/applications/submit/', write=True)
+        self.assertEqual(routed['reads'], 'default')
+        pin = response.cookies['primary_until']
+        routed, _ = self.route('get', '/api/applications/list/', cookies={'primary_until': pin.value})
+        self.assertEqual(routed['reads'], 'default')
+        routed, _ = self.route('get', '/api/applications/list/', cookies={'primary_until': str(time.time() - 1)})
+        self.assertEqual(routed['reads'], 'replica1')
+
+
+class AsyncPublicViewTests(TestCase):
+    """The async views must answer exactly as the DRF views do"""
+
+    def setUp(self):
+        Package.objects.create(
+            name='Family', package_type='family', cash_amount=20000,
+            total_quantity=5, available_quantity=5, items_included={},
+        )
+
+    def assertSameResponse(self, sync_view, async_view, method, path, data=None, **kwargs):
+        options = {'data': json.dumps(data), 'content_type': 'application/json'} if data is not None else {}
+        expected = sync_view(getattr(RequestFactory(), method)(path, **options), **kwargs)
+        expected.render()
+        actual = async_to_sync(async_view)(getattr(AsyncRequestFactory(), method)(path, **options), **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+        # DRF lists a function view's methods in set order
+        self.assertEqual(set(actual['Allow'].split(', ')), set(expected['Allow'].split(', ')))
+
+    def test_async_views_match_sync_views(self):
+        self.assertSameResponse(
+            PackageListView.as_view(), package_async_views.available_packages, 'get', '/api/packages/available/'
+        )
+        self.assertSameResponse(
+            pickup_views.pickup_status, pickup_async_views.pickup_status,
+            'get', '/api/pickups/status/NOPE/', pickup_code='NOPE',
+        )
+        for data in ({}, {'phone': '123'}, {'phone': '08000000000'}, {'reference': 'GCR-MISSING'}):
+            self.assertSameResponse(
+                application_views.check_application_status, application_async_views.check_application_status,
+                'post', '/api/applications/check-status/', data=data,
+            )
+        self.assertSameResponse(
+            application_views.check_application_status, application_async_views.check_application_status,
+            'get', '/api/applications/check-status/',
+        )
+
+    def test_head_and_options_match_sync_views(self):
+        for method in ('head', 'options'):
+            self.assertSameResponse(
+                pickup_views.pickup_status, pickup_async_views.pickup_status,
+                method, '/api/pickups/status/NOPE/', pickup_code='NOPE',
+            )
+            self.assertSameResponse(
+                pickup_views.today_pickup_queue, pickup_async_views.today_pickup_queue, method, '/api/pickups/today-queue/'
+            )
+            self.assertSameResponse(
+                application_views.check_application_status, application_async_views.check_application_status,
+                method, '/api/applications/check-status/',
+            )
+
+
+class AssetPipelineTests(TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        override = override_settings(ASSETS={
+            **settings.ASSETS, 'OUTPUT_DIR': self.output_dir, 'SOURCE_PATTERNS': ['css/*.css'],
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_minify_js_keeps_strings_templates_and_regexes(self):
+        source = (
+            "// comment\n"
+            "const a = 'x // not a comment';   /* gone */\n"
+            "    const b = `line ${a.map(i => `<li>${i}</li>`).join('')} /* kept */`;\n"
+            "const c = text.replace(/\\/\\*/g, '');\n"
+        )
+        self.assertEqual(assets.minify_js(source), (
+            "const a = 'x // not a comment';\n"
+            "const b = `line ${a.map(i => `<li>${i}</li>`).join('')} /* kept */`;\n"
+            "const c = text.replace(/\\/\\*/g, '');\n"
+        ))
+
+    def test_page_scripts_are_served_as_precompressed_bundles(self):
+        page = Template("{% load assets %}{% pagescript %}\n  go();  // start\n{% endpagescript %}")
+        self.assertEqual(page.render(Context()), '<script>\n  go();  // start\n</script>')
+
+        with mock.patch.object(assets, 'find_page_scripts', return_value=[
+            ('pages/demo.html', page.nodelist[1].source_hash, page.nodelist[1].script),
+        ]):
+            manifest, _ = assets.build()
+        url = re.search(r'src="([^"]+)"', page.render(Context())).group(1)
+        self.assertTrue(url.startswith('/assets/bundles/pages-demo.'))
+        self.assertEqual(Template("{% load assets %}{% asset 'css/style.css' %}").render(Context()),
+                         '/assets/' + manifest['files']['css/style.css'])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'go();\n')
+        response = self.client.get(url)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), b'go();\n')
+        self.assertEqual(self.client.get('/assets/manifest.json').status_code, 404)
+        self.assertEqual(self.client.get('/assets/../settings.py').status_code, 400)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.status = 201
+
+        def view(request):
+            self.calls += 1
+            return JsonResponse({'success': True, 'call': self.calls}, status=self.status)
+        self.middleware = IdempotencyMiddleware(view)
+
+    def request(self, data, key='retry-1'):
+        request = RequestFactory().post(
+            '/api/pickups/confirm/', data, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        request.user = AnonymousUser()
+        return request
+
+    def test_retries_replay_the_first_response(self):
+        first = self.middleware(self.request({'pickup_id': 1}))
+        retry = self.middleware(self.request({'pickup_id': 1}))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+        self.assertEqual(self.middleware(self.request({'pickup_id': 2})).status_code, 422)
+        self.middleware(self.request({'pickup_id': 2}, key='retry-2'))
+        self.assertEqual(self.calls, 2)
+
+    def test_duplicate_of_a_request_in_flight_gets_409_at_once(self):
+        options = idempotency.get_options()
+        key, request_hash = idempotency.request_key(self.request({'pickup_id': 1}), options)
+        self.assertIs(idempotency.claim(key, request_hash, options), True)
+
+        response = self.middleware(self.request({'pickup_id': 1}))
+        self.assertEqual((self.calls, response.status_code, response['Retry-After']), (0, 409, '1'))
+
+        # Retrying the same key once the first request has finished replays its response
+        idempotency.finish(key, JsonResponse({'success': True, 'call': 'first'}))
+        response = self.middleware(self.request({'pickup_id': 1}))
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(json.loads(response.content)['call'], 'first')
+
+    def test_anonymous_keys_are_scoped_to_the_client(self):
+        self.middleware(self.request({'pickup_id': 1}))
+        other_client = self.request({'pickup_id': 2})
+        other_client.META['REMOTE_ADDR'] = '203.0.113.9'
+        response = self.middleware(other_client)
+        self.assertEqual((self.calls, response.status_code), (2, 201))
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_failed_requests_are_not_replayed(self):
+        self.status = 503
+        self.middleware(self.request({'pickup_id': 1}))
+        self.status = 200
+        response = self.middleware(self.request({'pickup_id': 1}))
+        self.assertEqual((self.calls, response.status_code), (2, 200))
+
+
+class GenerateDatasetTests(TestCase):
+    def test_generates_consistent_repeatable_rounds(self):
+        call_command(
+            'generate_dataset', applications=300, rounds=3, workers=1, seed=7,
+            today=datetime.date(2026, 3, 10), stdout=StringIO()
+        )
+        applications = Application.objects.filter(round__name__startswith=dataset.ROUND_PREFIX)
+        self.assertEqual(applications.count(), 300)
+        self.assertFalse(applications.filter(status__in=['APPROVED', 'PICKED_UP'], pickup__isnull=True).exists())
+        self.assertTrue(all(application_views.is_valid_nigerian_phone(phone) for phone in applications.values_list('phone', flat=True)))
+        repeats = applications.values('phone').annotate(rounds=Count('round', distinct=True)).filter(rounds__gt=1)
+        self.assertTrue(repeats.exists())
+        self.assertEqual(Pickup.objects.values('pickup_code').distinct().count(), Pickup.objects.count())
+
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', applications=10, stdout=StringIO())
+
+
+class BenchmarkTests(TestCase):
+    def test_runs_against_seeded_data_and_flags_regressions(self):
+        results = benchmarks.run(['is_valid_nigerian_phone', 'CalendarEntrySerializer'], sizes=[20], repeat=1)
+        figures = results['CalendarEntrySerializer']['20']
+        self.assertEqual(results['is_valid_nigerian_phone']['20']['items'], 20)
+        self.assertEqual(figures['queries'], 1)
+        self.assertEqual(benchmarks.compare(results, results), [])
+
+        baseline = {'CalendarEntrySerializer': {'20': {**figures, 'queries': 0, 'per_item_us': 1.0}}}
+        slower = {'CalendarEntrySerializer': {'20': {**figures, 'per_item_us': 10.0}}}
+        messages = [message for _, _, message in benchmarks.compare(baseline, slower, tolerance=0.25, min_delta_us=5)]
+        self.assertEqual(len(messages), 2)
+        self.assertIn('queries 0 -> 1', messages[0])
+        # 4.5 us slower is under MIN_DELTA_US, however large the percentage
+        noise = {'CalendarEntrySerializer': {'20': {**figures, 'queries': 0, 'per_item_us': 5.5}}}
+        self.assertEqual(benchmarks.compare(baseline, noise, min_delta_us=5), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        Package.objects.create(
+            name='Senior', package_type='senior', cash_amount=5000,
+            total_quantity=7, available_quantity=3, items_included={},
+        )
+        User.objects.create_user('scraper', password='scrape-pass', is_staff=True)
+        User.objects.create_user('applicant', password='apply-pass')
+
+    def basic_auth(self, credentials):
+        return {'HTTP_AUTHORIZATION': 'Basic ' + base64.b64encode(credentials.encode()).decode()}
+
+    def test_only_staff_can_scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Basic realm="metrics"')
+        for headers in (
+            self.basic_auth('scraper:wrong'), self.basic_auth('applicant:apply-pass'),
+            {'HTTP_AUTHORIZATION': 'Basic not-base64!'}, {'HTTP_AUTHORIZATION': 'Bearer scrape-pass'},
+        ):
+            self.assertEqual(self.client.get('/metrics', **headers).status_code, 401)
+        self.assertEqual(self.client.get('/metrics', **self.basic_auth('scraper:scrape-pass')).status_code, 200)
+
+        self.client.login(username='scraper', password='scrape-pass')
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_exports_request_and_stock_series(self):
+        labels = {'view': 'available_packages', 'method': 'GET', 'status': '200'}
+        before = metrics.REGISTRY.get_sample_value('relief_http_request_duration_seconds_count', labels) or 0
+        self.client.get('/api/packages/available/')
+
+        body = self.client.get('/metrics', **self.basic_auth('scraper:scrape-pass')).content.decode()
+        self.assertIn(
+            'relief_http_request_duration_seconds_count'
+            f'{{method="GET",status="200",view="available_packages"}} {before + 1.0}', body
+        )
+        self.assertIn('relief_db_queries_per_request_count{view="available_packages"}', body)
+        self.assertIn('relief_package_available_quantity{package_type="senior"} 3.0', body)
+        self.assertIn('relief_package_total_quantity{package_type="senior"} 7.0', body)
+
+
+@override_settings(RELIEF_APP_CONFIG={'CONFIG_CACHE_CHECK_SECONDS': 5, 'CONFIG_CACHE_MAX_AGE_SECONDS': 300})
+class RuntimeConfigTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        config.bump_version()
+        ConfigurationSettings.objects.create(key='QR_CODE_EXPIRY_DAYS', value='7')
+
+    def age_snapshot(self, seconds):
+        for key in ('loaded_at', 'checked_at'):
+            config._snapshot[key] -= seconds
+
+    def test_snapshot_is_served_without_queries_until_a_save_commits(self):
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 7)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            ConfigurationSettings.set_value('QR_CODE_EXPIRY_DAYS', '10')
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 7)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 10)
+
+    def test_other_workers_saves_are_seen_within_the_bounds(self):
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 7)
+        # Another worker's save: the row and the shared stamp change, this snapshot does not
+        ConfigurationSettings.objects.filter(key='QR_CODE_EXPIRY_DAYS').update(value='10')
+        VersionStamp.objects.update_or_create(name=config.CONFIG_STAMP, defaults={'version': 1})
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 7)
+        self.age_snapshot(6)
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 10)
+
+        # A row changed without save() never moves the stamp; the maximum age still forces a reload
+        ConfigurationSettings.objects.filter(key='QR_CODE_EXPIRY_DAYS').update(value='12')
+        self.age_snapshot(6)
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 10)
+        self.age_snapshot(300)
+        self.assertEqual(config.get_setting('QR_CODE_EXPIRY_DAYS', 3), 12)
+
+
+class LoadtestCommandTests(TestCase):
+    def test_refuses_production_and_deactivates_its_staff_user(self):
+        with override_settings(DEBUG=False), self.assertRaises(CommandError):
+            call_command('loadtest', password='secret', stdout=StringIO())
+        with override_settings(DEBUG=True), self.assertRaises(CommandError):
+            call_command('loadtest', password='', stdout=StringIO())
+        self.assertFalse(User.objects.filter(username='loadtest').exists())
+
+        with override_settings(DEBUG=True), mock.patch('core.loadtest.run', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('loadtest', password='secret', stdout=StringIO())
+        user = User.objects.get(username='loadtest')
+        self.assertFalse(user.is_active)
+        self.assertFalse(user.has_usable_password())
+
+
+@override_settings(SLOW_QUERY_LOG={'THRESHOLD_MS': 100, 'EXPLAIN_SAMPLES': 2})
+class SlowQueryLogTests(TestCase):
+    def test_only_slow_queries_are_recorded_and_sampled_for_plans(self):
+        timed_query = SlowQueryMiddleware(lambda request: None)._timer(RequestFactory().get('/'))
+        sql = 'SELECT "core_auditlog"."id" FROM "core_auditlog" WHERE "core_auditlog"."id" = %s'
+        timed_query(sql, [1], False, 0.05)
+        self.assertFalse(SlowQuery.objects.exists())
+
+        for value in range(4):
+            timed_query(sql, [value], False, 0.2)
+        timed_query('UPDATE "core_auditlog" SET "action" = %s', ['x'], False, 0.3)
+        [select, update] = slow_queries.top_offenders()
+        self.assertEqual((select['count'], select['total_ms'], select['views']), (4, 800, ['unresolved']))
+        self.assertEqual(len(select['plans']), 2)
+        self.assertEqual(update['plans'], [])
+        self.assertEqual(SlowQuery.objects.filter(shape_id=select['shape_id']).first().params, ['int'])
+
+        slow_queries.trim(2)
+        self.assertEqual(SlowQuery.objects.count(), 2)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.package = Package.objects.create(
+            name='Medium Basic', package_type='medium_basic', cash_amount=8000,
+            total_quantity=10, available_quantity=10, items_included={},
+        )
+
+    def test_catalog_changes_invalidate_the_cached_page(self):
+        self.assertEqual(self.client.get('/packages/')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/packages/')['X-Page-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.name = 'Medium Family Basic'
+            self.package.save()
+        response = self.client.get('/packages/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Medium Family Basic')
+
+    def test_other_workers_changes_are_seen_within_the_check_interval(self):
+        self.client.get('/packages/')
+        # Another worker bumps the stamp; this one still holds the old version
+        VersionStamp.objects.update_or_create(name=page_cache.CATALOG_STAMP, defaults={'version': 1})
+        self.assertEqual(self.client.get('/packages/')['X-Page-Cache'], 'HIT')
+        with self.settings(PAGE_CACHE={'VERSION_CHECK_SECONDS': 0}):
+            self.assertEqual(self.client.get('/packages/')['X-Page-Cache'], 'MISS')
+
+    def test_stats_say_when_they_are_per_process(self):
+        self.client.get('/packages/')
+        output = StringIO()
+        call_command('page_cache_stats', stdout=output)
+        self.assertIn('PER-PROCESS (LocMemCache)', output.getvalue())
+        self.assertRegex(output.getvalue(), r'packages\s+0\s+0\s+1')
+
+        with mock.patch('core.management.commands.page_cache_stats.is_shared_cache', return_value=True):
+            output = StringIO()
+            call_command('page_cache_stats', stdout=output)
+        self.assertIn('shared by every worker', output.getvalue())
@@ -0,0 +1,44 @@
+"""
+Version numbers every worker can see, whatever the cache backend.
+
+Each stamp is a ``VersionStamp`` row. Writers bump it after their change
+commits; readers keep this process's copy and re-read the row at most
+every ``check_seconds``, so a change reaches every worker within that time.
+Cache keys that include a stamp are invalidated everywhere by one bump.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+
+# name -> (version, monotonic time it was read)
+_seen = {}
+
+
+def get(name, check_seconds):
+    """The stamp's version (None if never bumped), re-read at most every ``check_seconds``"""
+    from .models import VersionStamp
+
+    now = time.monotonic()
+    seen = _seen.get(name)
+    if seen is None or now - seen[1] >= check_seconds:
+        version = VersionStamp.objects.filter(name=name).values_list('version', flat=True).first()
+        seen = _seen[name] = (version, now)
+    return seen[0]
+
+
+async def aget(name, check_seconds):
+    """get for async code; only a due re-read leaves the event loop"""
+    seen = _seen.get(name)
+    if seen is not None and time.monotonic() - seen[1] < check_seconds:
+        return seen[0]
+    return await sync_to_async(get)(name, check_seconds)
+
+
+def bump(name):
+    """Give the stamp a new version; call after the change commits"""
+    from .models import VersionStamp
+
+    version = time.time_ns()
+    VersionStamp.objects.update_or_create(name=name, defaults={'version': version})
+    _seen[name] = (version, time.monotonic())
+    return version
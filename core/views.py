@@ -1,7 +1,19 @@
+import base64
+import mimetypes
+from pathlib import Path
+
+from django.contrib.auth import authenticate
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
 from packages.models import Package
+from . import assets
+from . import metrics as relief_metrics
+from .page_cache import cache_public_page
 
 
+@cache_public_page
 def home(request):
     """Home page with featured packages"""
     # Get featured packages (available ones, limited to first 3)
@@ -16,6 +28,7 @@ def home(request):
     return render(request, 'pages/home.html', context)
 
 
+@cache_public_page
 def packages(request):
     """Packages listing page with all available packages"""
     packages = Package.objects.filter(is_active=True).order_by('name')
@@ -26,6 +39,7 @@ def packages(request):
     return render(request, 'pages/packages.html', context)
 
 
+@cache_public_page
 def apply(request):
     """Application form page"""
     # Get available packages for the application form
@@ -48,3 +62,66 @@ def status(request):
 def pickup(request):
     """Pickup details page"""
     return render(request, 'pages/pickup.html')
+
+
+def _is_staff_request(request):
+    if request.user.is_authenticated:
+        return request.user.is_staff
+    # Scrapers authenticate with HTTP Basic as a staff user
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'basic':
+        return False
+    try:
+        username, _, password = base64.b64decode(credentials).decode().partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return False
+    user = authenticate(request, username=username, password=password)
+    return bool(user and user.is_staff)
+
+
+def metrics(request):
+    """Prometheus metrics - staff only"""
+    if not _is_staff_request(request):
+        response = HttpResponse('Staff credentials required.', status=401)
+        response['WWW-Authenticate'] = 'Basic realm="metrics"'
+        return response
+    return HttpResponse(
+        relief_metrics.render_latest(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+# Encodings build_assets precompresses, best first
+ASSET_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@require_safe
+def serve_asset(request, path):
+    """Fingerprinted build output: precompressed variant, cached for a year"""
+    options = assets.get_options()
+    if path == 'manifest.json' or path.endswith(('.gz', '.br')):
+        raise Http404
+    # Paths escaping OUTPUT_DIR raise SuspiciousFileOperation (400)
+    full_path = Path(safe_join(options['OUTPUT_DIR'], path))
+    if not full_path.is_file():
+        raise Http404
+
+    accepted = {
+        coding.split(';')[0].strip()
+        for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    encoding, file_path = None, full_path
+    for coding, suffix in ASSET_ENCODINGS:
+        candidate = full_path.with_name(full_path.name + suffix)
+        if coding in accepted and candidate.is_file():
+            encoding, file_path = coding, candidate
+            break
+
+    content_type = mimetypes.guess_type(full_path.name)[0] or 'application/octet-stream'
+    response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    # Names change with content, so a copy never needs revalidating
+    response['Cache-Control'] = f"public, max-age={options['MAX_AGE']}, immutable"
+    return response
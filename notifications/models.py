@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from core.models import TimeStampedModel
+from core.partitioning import PartitionedManager
 
 
 class Notification(TimeStampedModel):
@@ -26,6 +27,8 @@ class Notification(TimeStampedModel):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     sent_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True)
+
+    objects = PartitionedManager()
     
     class Meta:
         verbose_name = 'Notification'
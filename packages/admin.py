@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Package, PackageItem
+from .models import Package, PackageItem, SiteStock, StockMovement
 
 
 class PackageItemInline(admin.TabularInline):
@@ -14,3 +14,39 @@ class PackageAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     inlines = [PackageItemInline]
     readonly_fields = ['created_at', 'updated_at']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Existing stock moves through the ledger (restock/adjust endpoints)
+        if obj is not None:
+            return self.readonly_fields + ['total_quantity', 'available_quantity']
+        return self.readonly_fields
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = [
+        'created_at', 'package', 'site', 'kind', 'available_change', 'total_change', 'created_by', 'reference'
+    ]
+    list_filter = ['kind', 'package', 'site']
+    search_fields = ['reference', 'note']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+
+@admin.register(SiteStock)
+class SiteStockAdmin(admin.ModelAdmin):
+    list_display = ['package', 'site', 'available_quantity', 'updated_at']
+    list_filter = ['site', 'package']
+    readonly_fields = ['site', 'package', 'available_quantity', 'updated_at']
+    
+    def has_add_permission(self, request):
+        # Rows appear with the first transfer or count at a site
+        return False
@@ -0,0 +1,13 @@
+"""Async version of the public package list (see core.async_api)"""
+from core.async_api import paginate, public_api
+
+from .models import Package
+from .serializers import PackageListSerializer
+
+
+@public_api(['GET'])
+async def available_packages(request):
+    """List available packages for application form"""
+    # Items are fetched up front; the serializer must not query from the event loop
+    queryset = Package.objects.filter(is_active=True).prefetch_related('package_items')
+    return await paginate(request, queryset, PackageListSerializer)
@@ -0,0 +1,192 @@
+"""
+Stock-out forecasting per package from historical demand.
+
+Demand is the number of approvals per day per ``package_type`` (approval is
+what draws a package from stock), with submissions per day alongside to
+turn the pending backlog into expected approvals. Rates are taken from a
+(packages x days) matrix in one vectorized pass: exponential smoothing as a
+single matrix-vector product, and the rolling rate as a window mean.
+
+Only closed days are used. The smoothed levels and the last
+``ROLLING_WINDOW_DAYS`` of counts are cached, so when a new day closes only
+that day is queried and folded in.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Package
+
+STATE_KEY = 'package_forecast:state'
+APPROVED_STATUSES = ['APPROVED', 'PICKED_UP']
+
+
+def get_options():
+    options = {
+        'METHOD': 'smoothing',          # or 'rolling'
+        'HISTORY_DAYS': 90,
+        'SMOOTHING_ALPHA': 0.3,
+        'ROLLING_WINDOW_DAYS': 14,
+        'LEAD_TIME_DAYS': 7,
+        'COVER_DAYS': 28,
+    }
+    options.update(getattr(settings, 'PACKAGE_FORECAST', {}))
+    return options
+
+
+def daily_counts(package_types, start, end):
+    """
+    (approvals, submissions) as (packages x days) arrays for the closed days
+    ``start``..``end``, one GROUP BY query each, plus one each over the
+    applications of archived rounds
+    """
+    from applications.models import Application
+    from core.cold_storage import cold_model, cold_table_exists
+
+    days = (end - start).days + 1
+    index = {package_type: row for row, package_type in enumerate(package_types)}
+    approvals = np.zeros((len(package_types), max(days, 0)))
+    submissions = np.zeros_like(approvals)
+    if days <= 0:
+        return approvals, submissions
+    # A closed round's demand is still history the forecast needs
+    models = [Application] + ([cold_model(Application)] if cold_table_exists(Application) else [])
+    for model in models:
+        series = [
+            (approvals, 'reviewed_at', model.objects.filter(status__in=APPROVED_STATUSES)),
+            (submissions, 'created_at', model.objects.all()),
+        ]
+        for matrix, field, queryset in series:
+            rows = (
+                queryset.filter(**{f'{field}__date__gte': start, f'{field}__date__lte': end})
+                .annotate(day=TruncDate(field)).values('selected_package', 'day')
+                .annotate(count=Count('id')).values_list('selected_package', 'day', 'count')
+            )
+            for package_type, day, count in rows:
+                if package_type in index:
+                    matrix[index[package_type], (day - start).days] += count
+    return approvals, submissions
+
+
+def smooth(counts, alpha, level=None):
+    """
+    Exponentially smoothed level per row after the last column, seeded with
+    ``level`` (or the first column), as one matrix-vector product
+    """
+    if counts.shape[1] == 0:
+        return level
+    if level is None:
+        level, counts = counts[:, 0], counts[:, 1:]
+    days = counts.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+    return counts @ weights + level * (1 - alpha) ** days
+
+
+def _build_state(package_types, options, through):
+    start = through - timedelta(days=options['HISTORY_DAYS'] - 1)
+    approvals, submissions = daily_counts(package_types, start, through)
+    window = options['ROLLING_WINDOW_DAYS']
+    return {
+        'package_types': package_types,
+        'options': options,
+        'through': through,
+        'level': smooth(approvals, options['SMOOTHING_ALPHA']),
+        'recent': approvals[:, -window:],
+        'approved': approvals.sum(axis=1),
+        'submitted': submissions.sum(axis=1),
+    }
+
+
+def _advance(state, through):
+    """Fold the days closed since the state was built into it"""
+    options = state['options']
+    start = state['through'] + timedelta(days=1)
+    if (through - start).days + 1 >= options['HISTORY_DAYS']:
+        return _build_state(state['package_types'], options, through)
+    approvals, submissions = daily_counts(state['package_types'], start, through)
+    state.update(
+        through=through,
+        level=smooth(approvals, options['SMOOTHING_ALPHA'], state['level']),
+        recent=np.hstack([state['recent'], approvals])[:, -options['ROLLING_WINDOW_DAYS']:],
+        approved=state['approved'] + approvals.sum(axis=1),
+        submitted=state['submitted'] + submissions.sum(axis=1),
+    )
+    return state
+
+
+def get_state():
+    """Cached smoothing state up to yesterday, rebuilt or advanced as needed"""
+    options = get_options()
+    package_types = sorted(Package.objects.values_list('package_type', flat=True))
+    through = timezone.localdate() - timedelta(days=1)
+    state = cache.get(STATE_KEY)
+    if state is None or state['package_types'] != package_types or state['options'] != options:
+        state = _build_state(package_types, options, through)
+    elif state['through'] < through:
+        state = _advance(state, through)
+    else:
+        return state
+    cache.set(STATE_KEY, state, None)
+    return state
+
+
+def forecast():
+    """Daily demand rate, predicted days to stock-out and restock quantity per package"""
+    from applications.models import Application
+
+    state = get_state()
+    options = state['options']
+    packages = {package.package_type: package for package in Package.objects.all()}
+    pending = dict(
+        Application.objects.filter(status='PENDING').values('selected_package')
+        .annotate(count=Count('id')).values_list('selected_package', 'count')
+    )
+    package_types = state['package_types']
+    stock = np.array([packages[package_type].available_quantity for package_type in package_types], dtype=float)
+    backlog = np.array([pending.get(package_type, 0) for package_type in package_types], dtype=float)
+
+    smoothed = state['level'] if len(package_types) else np.zeros(0)
+    rolling = state['recent'].mean(axis=1) if state['recent'].size else np.zeros(len(package_types))
+    rate = rolling if options['METHOD'] == 'rolling' else smoothed
+    # Share of submissions that end up approved, to discount the pending backlog
+    approval_ratio = np.divide(
+        state['approved'], state['submitted'], out=np.ones(len(package_types)), where=state['submitted'] > 0
+    )
+    expected_backlog = backlog * np.minimum(approval_ratio, 1)
+    free_stock = stock - expected_backlog
+    days_to_stockout = np.divide(
+        np.maximum(free_stock, 0), rate, out=np.full(len(package_types), np.inf), where=rate > 0
+    )
+    target = rate * (options['LEAD_TIME_DAYS'] + options['COVER_DAYS'])
+    restock = np.ceil(np.maximum(target - free_stock, 0))
+
+    results = []
+    for row, package_type in enumerate(package_types):
+        package = packages[package_type]
+        results.append({
+            'package_id': package.id,
+            'package_type': package_type,
+            'name': package.name,
+            'is_active': package.is_active,
+            'available_quantity': package.available_quantity,
+            'pending_applications': int(backlog[row]),
+            'daily_demand': round(float(rate[row]), 2),
+            'smoothed_daily_demand': round(float(smoothed[row]), 2),
+            'rolling_daily_demand': round(float(rolling[row]), 2),
+            'days_to_stockout': None if math.isinf(days_to_stockout[row]) else round(float(days_to_stockout[row]), 1),
+            'recommended_restock': int(restock[row]),
+        })
+    results.sort(key=lambda result: (result['days_to_stockout'] is None, result['days_to_stockout'] or 0))
+    return {
+        'method': options['METHOD'],
+        'history_through': state['through'].isoformat(),
+        'lead_time_days': options['LEAD_TIME_DAYS'],
+        'cover_days': options['COVER_DAYS'],
+        'packages': results,
+    }
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+from packages.models import Package, SiteStock, StockMovement
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute stock levels from the StockMovement ledger in one aggregate query and '
+        'report packages whose counters have drifted'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Reset drifted counters to the ledger totals'
+        )
+        parser.add_argument(
+            '--open-balances', action='store_true',
+            help='Record the current counters as opening balances for packages with no ledger entries '
+                 '(databases created before the ledger)'
+        )
+
+    def handle(self, *args, **options):
+        packages = Package.objects.annotate(
+            movements=Count('stock_movements'),
+            ledger_available=Coalesce(Sum('stock_movements__available_change'), Value(0)),
+            ledger_total=Coalesce(Sum('stock_movements__total_change'), Value(0)),
+        ).order_by('name')
+
+        drifted = 0
+        for package in packages:
+            if not package.movements and (package.available_quantity or package.total_quantity):
+                if options['open_balances']:
+                    StockMovement.objects.create(
+                        package=package, kind='ADJUSTMENT', available_change=package.available_quantity,
+                        total_change=package.total_quantity, note='Opening balance (reconcile_stock)'
+                    )
+                    self.stdout.write(f'{package.name}: recorded opening balance.')
+                else:
+                    # Never reset these to an empty ledger
+                    self.stdout.write(self.style.WARNING(
+                        f'{package.name}: no ledger entries; rerun with --open-balances to adopt its counters.'
+                    ))
+                continue
+            available_drift = package.available_quantity - package.ledger_available
+            total_drift = package.total_quantity - package.ledger_total
+            if not available_drift and not total_drift:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(
+                f'{package.name}: available {package.available_quantity} vs ledger {package.ledger_available} '
+                f'({available_drift:+d}), total {package.total_quantity} vs ledger {package.ledger_total} '
+                f'({total_drift:+d})'
+            ))
+            if options['fix']:
+                package.available_quantity = package.ledger_available
+                package.total_quantity = package.ledger_total
+                package.save(update_fields=['available_quantity', 'total_quantity', 'updated_at'])
+
+        # Per-site stock rows against the site movements, again in one aggregate
+        ledger = {
+            (row['site'], row['package']): row['available']
+            for row in StockMovement.objects.filter(site__isnull=False).values('site', 'package')
+            .annotate(available=Sum('available_change'))
+        }
+        for stock in SiteStock.objects.select_related('site', 'package'):
+            expected = ledger.get((stock.site_id, stock.package_id), 0)
+            if stock.available_quantity == expected:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(
+                f'{stock.package.name} at {stock.site.name}: available {stock.available_quantity} '
+                f'vs ledger {expected} ({stock.available_quantity - expected:+d})'
+            ))
+            if options['fix']:
+                stock.available_quantity = expected
+                stock.save(update_fields=['available_quantity', 'updated_at'])
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Stock counters match the ledger.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Reset {drifted} packages to their ledger totals.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{drifted} packages have drifted from the ledger; rerun with --fix.'))
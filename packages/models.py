@@ -1,8 +1,17 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from core.config import get_setting
+from core.page_cache import bump_catalog_version, get_catalog_version
 from core.models import TimeStampedModel
 from django.contrib.auth.models import User
 
 
+class InsufficientStock(Exception):
+    pass
+
+
 class Package(TimeStampedModel):
     PACKAGE_TYPES = [
         ('small_basic', 'Small Family Basic'),
@@ -40,7 +49,7 @@ class Package(TimeStampedModel):
     
     @property
     def is_low_stock(self):
-        threshold = 10  # Could be configurable
+        threshold = get_setting('LOW_STOCK_THRESHOLD', 10)
         return self.available_quantity <= threshold
     
     @property
@@ -143,17 +152,217 @@ class Package(TimeStampedModel):
         else:
             return 'bi-clock'
     
-    def allocate(self):
-        if self.available_quantity > 0:
-            self.available_quantity -= 1
-            self.save()
-            return True
-        return False
-    
-    def restock(self, quantity):
-        self.available_quantity += quantity
-        self.total_quantity += quantity
-        self.save()
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.available_quantity or self.total_quantity:
+                StockMovement.objects.create(
+                    package=self, kind='ADJUSTMENT', available_change=self.available_quantity,
+                    total_change=self.total_quantity, note='Opening balance'
+                )
+    
+    def move_stock(self, kind, available_change, total_change=0, user=None, note='', reference='', site=None):
+        """
+        Change the stock counters and append the movement to the ledger in one
+        transaction; the only way quantities should change after creation.
+        With ``site``, the movement is against that site's stock row instead.
+        """
+        if site is not None:
+            return self._move_site_stock(site, kind, available_change, total_change, user, note, reference)
+        with transaction.atomic():
+            locked = Package.objects.select_for_update().only(
+                'available_quantity', 'total_quantity'
+            ).get(pk=self.pk)
+            available = locked.available_quantity + available_change
+            total = locked.total_quantity + total_change
+            # Stock held at sites is only drawn through those sites
+            unsited = locked.available_quantity - self._held_at_sites()
+            if unsited + available_change < 0 or total < 0:
+                raise InsufficientStock(f'{self.name} has only {unsited} units available outside the sites.')
+            movement = StockMovement.objects.create(
+                package=self, kind=kind, available_change=available_change, total_change=total_change,
+                created_by=user, note=note, reference=reference
+            )
+            self.available_quantity = available
+            self.total_quantity = total
+            self.save(update_fields=['available_quantity', 'total_quantity', 'updated_at'])
+        return movement
+    
+    def _move_site_stock(self, site, kind, available_change, total_change, user, note, reference,
+                         update_package=True):
+        with transaction.atomic():
+            SiteStock.objects.get_or_create(site=site, package=self)
+            stock = SiteStock.objects.select_for_update().get(site=site, package=self)
+            available = stock.available_quantity + available_change
+            if available < 0:
+                raise InsufficientStock(f'{site.name} has only {stock.available_quantity} {self.name} left.')
+            movement = StockMovement.objects.create(
+                package=self, site=site, kind=kind, available_change=available_change,
+                total_change=total_change, created_by=user, note=note, reference=reference
+            )
+            stock.available_quantity = available
+            stock.save(update_fields=['available_quantity', 'updated_at'])
+            if update_package and (available_change or total_change):
+                # In the ledger's transaction; the site check above keeps the total non-negative
+                _apply_to_counters(self.pk, available_change, total_change)
+        self.available_quantity += available_change
+        self.total_quantity += total_change
+        return movement
+    
+    def allocate(self, user=None, reference='', site=None):
+        try:
+            self.move_stock('ALLOCATION', -1, user=user, reference=reference, site=site)
+        except InsufficientStock:
+            return False
+        return True
+    
+    def release(self, user=None, reference='', site=None):
+        """Return an allocated unit to stock"""
+        self.move_stock('RELEASE', 1, user=user, reference=reference, site=site)
+    
+    def restock(self, quantity, user=None, note=''):
+        self.move_stock('RESTOCK', quantity, quantity, user=user, note=note)
+    
+    def adjust(self, counted_quantity, user=None, note='', site=None):
+        """Correct the available stock (of ``site`` if given) to a physical count"""
+        with transaction.atomic():
+            if site is not None:
+                SiteStock.objects.get_or_create(site=site, package=self)
+                recorded = SiteStock.objects.select_for_update().values_list(
+                    'available_quantity', flat=True
+                ).get(site=site, package=self)
+            else:
+                recorded = Package.objects.select_for_update().values_list(
+                    'available_quantity', flat=True
+                ).get(pk=self.pk)
+            return self.move_stock('ADJUSTMENT', counted_quantity - recorded, user=user, note=note, site=site)
+    
+    def transfer(self, site, quantity, user=None, note=''):
+        """Send stock not yet held at any site to ``site``"""
+        with transaction.atomic():
+            available = Package.objects.select_for_update().values_list(
+                'available_quantity', flat=True
+            ).get(pk=self.pk)
+            held = self._held_at_sites()
+            if quantity > available - held:
+                raise InsufficientStock(f'Only {available - held} {self.name} are not already at a site.')
+            # Net zero for the organisation-wide counters
+            StockMovement.objects.create(
+                package=self, kind='TRANSFER', available_change=-quantity, created_by=user,
+                note=note, reference=site.code
+            )
+            return self._move_site_stock(site, 'TRANSFER', quantity, 0, user, note, '', update_package=False)
+    
+    def _held_at_sites(self):
+        return SiteStock.objects.filter(package=self).aggregate(held=Sum('available_quantity'))['held'] or 0
+    
+    def get_contents_display(self):
+        """Items, package items and cash as one line, for the scanner"""
+        contents = []
+        if isinstance(self.items_included, list):
+            contents.extend(self.items_included)
+        elif isinstance(self.items_included, dict):
+            # Handle dictionary format like {'rice': '3 Congo of Rice'}
+            contents.extend(self.items_included.values())
+        for item in self.package_items.all():
+            contents.append(f"{item.quantity} {item.item_name}")
+        if self.cash_amount and self.cash_amount > 0:
+            contents.append(f"₦{self.cash_amount:,} Cash")
+        return ', '.join(contents) or self.description
+
+
+def _apply_to_counters(package_id, available_change, total_change):
+    Package.objects.filter(pk=package_id).update(
+        available_quantity=F('available_quantity') + available_change,
+        total_quantity=F('total_quantity') + total_change,
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(bump_catalog_version)
+
+
+def active_package_ids():
+    """{package_type: id} of the active packages, cached until the catalog changes"""
+    key = f'package_ids:{get_catalog_version()}'
+    package_ids = cache.get(key)
+    if package_ids is None:
+        package_ids = dict(Package.objects.filter(is_active=True).values_list('package_type', 'id'))
+        cache.set(key, package_ids)
+    return package_ids
+
+
+def package_contents_display(package):
+    """``package.get_contents_display()``, cached until the catalog changes"""
+    key = f'package_contents:{package.pk}:{get_catalog_version()}'
+    contents = cache.get(key)
+    if contents is None:
+        contents = package.get_contents_display()
+        cache.set(key, contents)
+    return contents
+
+
+class StockMovement(models.Model):
+    """Append-only stock ledger; the Package counters are its running totals"""
+    KIND_CHOICES = [
+        ('RESTOCK', 'Restock'),
+        ('ALLOCATION', 'Allocation'),
+        ('RELEASE', 'Release'),
+        ('ADJUSTMENT', 'Adjustment'),
+        ('TRANSFER', 'Transfer'),
+    ]
+    
+    package = models.ForeignKey(Package, on_delete=models.PROTECT, related_name='stock_movements')
+    site = models.ForeignKey(
+        'pickups.DistributionSite',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        help_text='Blank for stock not held at a site'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    available_change = models.IntegerField()
+    total_change = models.IntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    reference = models.CharField(max_length=100, blank=True, help_text='Pickup code, application reference, etc.')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Stock Movement'
+        verbose_name_plural = 'Stock Movements'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.available_change:+d} {self.package_id}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Stock movements are append-only; record a new adjustment instead.')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Stock movements are append-only; record a new adjustment instead.')
+
+
+class SiteStock(models.Model):
+    """
+    Stock held at one distribution site. Package counters stay organisation-wide;
+    stock not at any site is the difference.
+    """
+    site = models.ForeignKey('pickups.DistributionSite', on_delete=models.PROTECT, related_name='stock')
+    package = models.ForeignKey(Package, on_delete=models.PROTECT, related_name='site_stock')
+    available_quantity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Site Stock'
+        verbose_name_plural = 'Site Stock'
+        unique_together = ['site', 'package']
+    
+    def __str__(self):
+        return f"{self.package} at {self.site}: {self.available_quantity}"
 
 
 class PackageItem(models.Model):
@@ -19,6 +19,16 @@ class PackageSerializer(serializers.ModelSerializer):
             'is_active', 'is_available', 'is_low_stock', 'package_items'
         ]
         read_only_fields = ['is_available', 'is_low_stock']
+    
+    def validate(self, attrs):
+        # Quantities are set once at creation; after that they move through the stock ledger
+        if self.instance is not None:
+            for field in ('total_quantity', 'available_quantity'):
+                if field in attrs and attrs[field] != getattr(self.instance, field):
+                    raise serializers.ValidationError({
+                        field: 'Stock levels change only through restock or stock adjustment.'
+                    })
+        return attrs
 
 
 class PackageListSerializer(serializers.ModelSerializer):
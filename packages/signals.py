@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.page_cache import bump_catalog_version
+from .models import Package, PackageItem
+
+
+@receiver([post_save, post_delete], sender=Package)
+@receiver([post_save, post_delete], sender=PackageItem)
+def invalidate_catalog_pages(sender, **kwargs):
+    """Any catalog change invalidates the cached public pages"""
+    transaction.on_commit(bump_catalog_version)
@@ -1,3 +1,150 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from applications.models import Application
+from applications.serializers import ApplicationSubmissionSerializer
+
+from . import forecast
+from .models import Package, PackageItem, StockMovement, active_package_ids, package_contents_display
+
+
+class StockForecastTests(TestCase):
+    def setUp(self):
+        Package.objects.create(
+            name='Emergency', package_type='emergency', cash_amount=5000,
+            total_quantity=40, available_quantity=40, items_included={},
+        )
+        Package.objects.create(
+            name='Senior', package_type='senior', cash_amount=5000,
+            total_quantity=10, available_quantity=10, items_included={},
+        )
+        today = timezone.localdate()
+        for days_ago, package_type, approvals in [(6, 'emergency', 2), (4, 'emergency', 5), (2, 'emergency', 3),
+                                                  (1, 'emergency', 4), (2, 'senior', 1)]:
+            moment = timezone.make_aware(datetime.combine(today - timedelta(days=days_ago), time(12)))
+            for number in range(approvals):
+                application = Application.objects.create(
+                    first_name='Test', last_name='Applicant', phone=f'080{days_ago}{number:07d}',
+                    address='1 Test Street', family_size=3, employment_status='employed', tec_member='no',
+                    selected_package=package_type, preferred_date=today, preferred_time='morning',
+                    terms_agreement=True, status='APPROVED', reviewed_at=moment,
+                )
+                Application.objects.filter(id=application.id).update(created_at=moment)
+
+    def test_smoothing_matches_recursive_definition(self):
+        counts = np.array([[2., 0, 5, 0, 3, 4], [0, 0, 0, 1, 0, 0]])
+        level = counts[:, 0]
+        for column in counts.T[1:]:
+            level = 0.3 * column + 0.7 * level
+        np.testing.assert_allclose(forecast.smooth(counts, 0.3), level)
+
+    def test_incremental_update_matches_full_rebuild(self):
+        options = forecast.get_options()
+        package_types = ['emergency', 'senior']
+        yesterday = timezone.localdate() - timedelta(days=1)
+        stale = forecast._build_state(package_types, options, yesterday - timedelta(days=3))
+        advanced = forecast._advance(stale, yesterday)
+        rebuilt = forecast._build_state(package_types, options, yesterday)
+        for key in ('level', 'recent', 'approved', 'submitted'):
+            np.testing.assert_allclose(advanced[key], rebuilt[key])
+
+        result = {row['package_type']: row for row in forecast.forecast()['packages']}
+        self.assertEqual(result['emergency']['rolling_daily_demand'], round(14 / 14, 2))
+        self.assertGreater(result['emergency']['recommended_restock'], 0)
+        self.assertIsNotNone(result['senior']['days_to_stockout'])
+
+
+class StockLedgerTests(TestCase):
+    def test_quantities_move_only_through_the_ledger(self):
+        package = Package.objects.create(
+            name='Senior', package_type='senior', cash_amount=5000,
+            total_quantity=3, available_quantity=2, items_included={},
+        )
+        package.restock(5)
+        self.assertTrue(package.allocate())
+        package.adjust(4, note='Two damaged')
+        self.assertEqual((package.available_quantity, package.total_quantity), (4, 8))
+        self.assertEqual(
+            list(package.stock_movements.order_by('id').values_list('kind', 'available_change')),
+            [('ADJUSTMENT', 2), ('RESTOCK', 5), ('ALLOCATION', -1), ('ADJUSTMENT', -2)]
+        )
+
+        staff = User.objects.create_user('stock', password='x', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.patch(
+            f'/api/packages/manage/{package.id}/', {'available_quantity': 100}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        Package.objects.filter(id=package.id).update(available_quantity=9)
+        output = StringIO()
+        call_command('reconcile_stock', '--fix', stdout=output)
+        self.assertIn('available 9 vs ledger 4 (+5)', output.getvalue())
+        package.refresh_from_db()
+        self.assertEqual(package.available_quantity, 4)
+        self.assertEqual(StockMovement.objects.count(), 4)
+
+
+class PackageLinkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.package = Package.objects.create(
+            name='Emergency', package_type='emergency', cash_amount=5000,
+            total_quantity=10, available_quantity=10, items_included={'rice': '1 bag of rice'},
+        )
+
+    def application(self, phone, selected_package):
+        return Application.objects.create(
+            first_name='Test', last_name='Applicant', phone=phone, address='1 Test Street', family_size=3,
+            employment_status='employed', tec_member='no', selected_package=selected_package,
+            preferred_date=timezone.localdate(), preferred_time='morning', terms_agreement=True,
+        )
+
+    def test_cached_lookups_follow_catalog_changes(self):
+        self.assertEqual(active_package_ids(), {'emergency': self.package.id})
+        self.assertEqual(package_contents_display(self.package), '1 bag of rice, ₦5,000 Cash')
+        with self.assertNumQueries(0):
+            active_package_ids()
+            package_contents_display(self.package)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PackageItem.objects.create(package=self.package, item_name='Beans', quantity='2kg')
+        self.assertEqual(package_contents_display(self.package), '1 bag of rice, 2kg Beans, ₦5,000 Cash')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.is_active = False
+            self.package.save()
+        self.assertEqual(active_package_ids(), {})
+
+    def test_submissions_are_linked_to_the_active_package(self):
+        data = {
+            'first_name': 'Bola', 'last_name': 'Ade', 'phone': '08012345678', 'address': '7 Bodija, Ibadan',
+            'family_size': 3, 'employment_status': 'unemployed', 'tec_member': 'no',
+            'selected_package': 'emergency', 'preferred_date': timezone.localdate().isoformat(),
+            'preferred_time': 'morning', 'terms_agreement': True,
+        }
+        serializer = ApplicationSubmissionSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['package_id'], self.package.id)
+
+        serializer = ApplicationSubmissionSerializer(data={**data, 'selected_package': 'senior'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('selected_package', serializer.errors)
 
-# Create your tests here.
+    def test_backfill_links_existing_applications(self):
+        linked = [self.application(f'0801000000{number}', 'emergency') for number in range(3)]
+        self.application('08010000009', 'retired_package')
+        output = StringIO()
+        call_command('link_application_packages', '--chunk-size', '2', stdout=output)
+        self.assertIn('Linked 3 applications', output.getvalue())
+        self.assertIn("1 applications reference unknown package 'retired_package'", output.getvalue())
+        self.assertEqual(
+            set(Application.objects.filter(package=self.package).values_list('id', flat=True)),
+            {application.id for application in linked}
+        )
@@ -1,9 +1,13 @@
 from django.urls import path
-from . import views
+from core.async_api import pick_view
+from . import async_views, views
 
 urlpatterns = [
-    path('available/', views.PackageListView.as_view(), name='available_packages'),
+    path('available/', pick_view(views.PackageListView.as_view(), async_views.available_packages), name='available_packages'),
     path('manage/', views.PackageManagementView.as_view(), name='package_management'),
     path('manage/<int:pk>/', views.PackageDetailView.as_view(), name='package_detail'),
+    path('forecast/', views.stock_forecast, name='stock_forecast'),
     path('<int:package_id>/restock/', views.restock_package, name='restock_package'),
+    path('<int:package_id>/adjust/', views.adjust_stock, name='adjust_stock'),
+    path('<int:package_id>/transfer/', views.transfer_stock, name='transfer_stock'),
 ]
\ No newline at end of file
@@ -1,7 +1,10 @@
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from .models import Package
+from core import audit
+from pickups.models import DistributionSite
+from . import forecast
+from .models import InsufficientStock, Package
 from .serializers import PackageSerializer, PackageListSerializer
 
 
@@ -59,7 +62,9 @@ def restock_package(request, package_id):
                 'message': 'Quantity must be greater than 0.'
             }, status=400)
         
-        package.restock(quantity)
+        before = audit.snapshot(package, ['available_quantity', 'total_quantity'])
+        package.restock(quantity, user=request.user, note=request.data.get('notes', ''))
+        audit.record(request, 'RESTOCK', package, audit.diff(before, package), quantity=quantity)
         
         return Response({
             'success': True,
@@ -77,3 +82,128 @@ def restock_package(request, package_id):
             'success': False,
             'message': 'Invalid quantity provided.'
         }, status=400)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def adjust_stock(request, package_id):
+    """Correct available stock to a physical count"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=403)
+    
+    try:
+        package = Package.objects.get(id=package_id)
+        counted_quantity = int(request.data.get('counted_quantity'))
+        reason = request.data.get('reason', '').strip()
+        
+        if counted_quantity < 0:
+            return Response({
+                'success': False,
+                'message': 'Counted quantity cannot be negative.'
+            }, status=400)
+        if not reason:
+            return Response({
+                'success': False,
+                'message': 'A reason is required for stock adjustments.'
+            }, status=400)
+        
+        site = None
+        if request.data.get('site'):
+            site = DistributionSite.objects.get(code=request.data['site'])
+        
+        before = audit.snapshot(package, ['available_quantity', 'total_quantity'])
+        movement = package.adjust(counted_quantity, user=request.user, note=reason[:255], site=site)
+        audit.record(
+            request, 'ADJUST_STOCK', package, audit.diff(before, package),
+            change=movement.available_change, reason=reason, site=site.code if site else None
+        )
+        
+        return Response({
+            'success': True,
+            'message': f'Stock adjusted by {movement.available_change:+d}. Total available: {package.available_quantity}',
+            'available_quantity': package.available_quantity
+        })
+        
+    except Package.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Package not found.'
+        }, status=404)
+    except DistributionSite.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Distribution site not found.'
+        }, status=404)
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'message': 'Invalid counted quantity provided.'
+        }, status=400)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def transfer_stock(request, package_id):
+    """Send stock not yet at a site to a distribution site"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=403)
+    
+    try:
+        package = Package.objects.get(id=package_id)
+        site = DistributionSite.objects.get(code=request.data.get('site', ''), is_active=True)
+        quantity = int(request.data.get('quantity', 0))
+        
+        if quantity <= 0:
+            return Response({
+                'success': False,
+                'message': 'Quantity must be greater than 0.'
+            }, status=400)
+        
+        package.transfer(site, quantity, user=request.user, note=request.data.get('notes', ''))
+        audit.record(request, 'UPDATE', package, quantity=quantity, transferred_to=site.code)
+        
+        return Response({
+            'success': True,
+            'message': f'Sent {quantity} units of {package.name} to {site.name}.',
+            'site_quantity': package.site_stock.get(site=site).available_quantity
+        })
+        
+    except Package.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Package not found.'
+        }, status=404)
+    except DistributionSite.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Distribution site not found.'
+        }, status=404)
+    except InsufficientStock as error:
+        return Response({
+            'success': False,
+            'message': str(error)
+        }, status=400)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Invalid quantity provided.'
+        }, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def stock_forecast(request):
+    """Predicted days to stock-out and recommended restock per package"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=403)
+    
+    return Response({'success': True, **forecast.forecast()})
@@ -1,14 +1,23 @@
 from django.contrib import admin
-from .models import Pickup
+from .models import DistributionSite, Pickup
 
 
 @admin.register(Pickup)
 class PickupAdmin(admin.ModelAdmin):
-    list_display = ['pickup_code', 'get_applicant_name', 'scheduled_date', 'scheduled_time', 'status']
-    list_filter = ['status', 'scheduled_date']
+    list_display = ['pickup_code', 'get_applicant_name', 'site', 'scheduled_date', 'scheduled_time', 'status']
+    list_filter = ['status', 'site', 'scheduled_date']
     search_fields = ['pickup_code', 'application__first_name', 'application__last_name']
     readonly_fields = ['pickup_code', 'qr_code_image', 'created_at', 'updated_at']
     
     def get_applicant_name(self, obj):
         return obj.application.get_full_name()
     get_applicant_name.short_description = 'Applicant Name'
+
+
+
+@admin.register(DistributionSite)
+class DistributionSiteAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'is_active', 'is_default']
+    list_filter = ['is_active']
+    search_fields = ['name', 'code', 'address']
+    prepopulated_fields = {'code': ['name']}
@@ -0,0 +1,31 @@
+"""Async versions of the public pickup endpoints (see core.async_api)"""
+from core.async_api import json_response, public_api
+from core.config import aget_setting
+from core.throttling import PUBLIC_THROTTLES
+
+from .models import Pickup
+from .views import PICKUP_NOT_FOUND, pickup_status_body, queue_entry, todays_queue
+
+
+@public_api(['GET'])
+async def today_pickup_queue(request):
+    """Get today's pickup queue for sidebar display"""
+    pickup_data = [queue_entry(pickup) async for pickup in todays_queue(request)]
+    
+    return json_response({
+        'success': True,
+        'pickups': pickup_data,
+        'total_count': len(pickup_data)
+    })
+
+
+@public_api(['GET'], PUBLIC_THROTTLES)
+async def pickup_status(request, pickup_code):
+    """Check pickup status by code - for applicants"""
+    try:
+        pickup = await Pickup.objects.select_related('application').aget(pickup_code=pickup_code)
+    except Pickup.DoesNotExist:
+        return json_response(PICKUP_NOT_FOUND, status=404)
+    
+    expiry_days = await aget_setting('QR_CODE_EXPIRY_DAYS', 7)
+    return json_response(pickup_status_body(pickup, pickup.expired_after(expiry_days)))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from packages.models import StockMovement
+from pickups.models import DistributionSite, Pickup
+
+
+class Command(BaseCommand):
+    help = (
+        'Add the distribution site columns and index on databases created before sites existed, '
+        'optionally creating the default site and assigning upcoming unassigned pickups to it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--default-code', help='Code of the default site, created if missing')
+        parser.add_argument('--default-name', help='Name for a newly created default site')
+        parser.add_argument(
+            '--assign', action='store_true',
+            help='Assign unassigned pickups scheduled from today onwards to the default site'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Pickup, StockMovement):
+            self.add_site_column(model)
+        self.add_missing_indexes(Pickup)
+
+        site = None
+        if options['default_code']:
+            site, created = DistributionSite.objects.get_or_create(
+                code=options['default_code'],
+                defaults={'name': options['default_name'] or options['default_code']}
+            )
+            DistributionSite.objects.exclude(id=site.id).filter(is_default=True).update(is_default=False)
+            if not site.is_default:
+                site.is_default = True
+                site.save(update_fields=['is_default', 'updated_at'])
+            self.stdout.write(f"{'Created' if created else 'Using'} default site {site.name} ({site.code}).")
+        if options['assign']:
+            site = site or DistributionSite.get_default()
+            if site is None:
+                self.stderr.write('No default site; pass --default-code.')
+                return
+            assigned = Pickup.objects.filter(
+                site__isnull=True, scheduled_date__gte=timezone.localdate(), status__in=['SCHEDULED', 'CONFIRMED']
+            ).update(site=site)
+            self.stdout.write(self.style.SUCCESS(f'Assigned {assigned} upcoming pickups to {site.name}.'))
+
+    def add_site_column(self, model):
+        field = model._meta.get_field('site')
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        if field.column not in columns:
+            with connection.schema_editor() as editor:
+                editor.add_field(model, field)
+            self.stdout.write(f'Added {table}.{field.column}.')
+
+    def add_missing_indexes(self, model):
+        # Checked after add_field, which rebuilds the table with its indexes on SQLite
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for index in model._meta.indexes:
+            if index.name not in constraints:
+                with connection.schema_editor() as editor:
+                    editor.add_index(model, index)
+                self.stdout.write(f'Added index {index.name}.')
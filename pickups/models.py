@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from core.config import get_setting
 from core.models import TimeStampedModel
 import qrcode
 from io import BytesIO
@@ -8,6 +9,31 @@ from django.core.files.base import ContentFile
 import uuid
 
 
+class AlreadyCompleted(Exception):
+    pass
+
+
+class DistributionSite(TimeStampedModel):
+    """A venue packages are collected from; scanner stations are scoped to one"""
+    name = models.CharField(max_length=100)
+    code = models.SlugField(max_length=30, unique=True, help_text='Sent by scanner stations as X-Distribution-Site')
+    address = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    is_default = models.BooleanField(default=False, help_text='New pickups are scheduled here unless told otherwise')
+    
+    class Meta:
+        verbose_name = 'Distribution Site'
+        verbose_name_plural = 'Distribution Sites'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def get_default(cls):
+        return cls.objects.filter(is_active=True, is_default=True).first()
+
+
 class Pickup(TimeStampedModel):
     STATUS_CHOICES = [
         ('SCHEDULED', 'Scheduled'),
@@ -23,6 +49,21 @@ class Pickup(TimeStampedModel):
         related_name='pickup'
     )
     pickup_code = models.CharField(max_length=50, unique=True, blank=True)
+    # Copied from the application, so round-scoped pickup queries need no join
+    round = models.ForeignKey(
+        'applications.DistributionRound',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='pickups'
+    )
+    site = models.ForeignKey(
+        DistributionSite,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='pickups'
+    )
     qr_code_image = models.ImageField(upload_to='qr_codes/', blank=True)
     
     scheduled_date = models.DateField()
@@ -47,7 +88,9 @@ class Pickup(TimeStampedModel):
         indexes = [
             models.Index(fields=['pickup_code']),
             models.Index(fields=['scheduled_date', 'scheduled_time']),
-            models.Index(fields=['status']),
+            models.Index(fields=['round', 'status', 'scheduled_date'], name='pickup_round_status_idx'),
+            # Each scanner station's queue is its own (site, day) slice
+            models.Index(fields=['site', 'scheduled_date', 'status'], name='pickup_site_day_status_idx'),
         ]
     
     def __str__(self):
@@ -56,6 +99,10 @@ class Pickup(TimeStampedModel):
     def save(self, *args, **kwargs):
         if not self.pickup_code:
             self.pickup_code = self.generate_pickup_code()
+        if self._state.adding and self.site_id is None:
+            self.site = DistributionSite.get_default()
+        if self._state.adding and self.round_id is None:
+            self.round_id = self.application.round_id
         super().save(*args, **kwargs)
         if not self.qr_code_image:
             self.generate_qr_code()
@@ -94,20 +141,38 @@ class Pickup(TimeStampedModel):
         self.save(update_fields=['qr_code_image'])
     
     def complete_pickup(self, supervisor_user):
-        self.status = 'COMPLETED'
-        self.picked_up_at = timezone.now()
-        self.picked_up_by = supervisor_user
-        self.save()
-        
-        # Update application status
-        self.application.status = 'PICKED_UP'
-        self.application.save()
+        """
+        Raises AlreadyCompleted when another confirmation got there first, and
+        InsufficientStock when the pickup's site has none of its package left
+        """
+        user = supervisor_user if supervisor_user and supervisor_user.is_authenticated else None
+        with transaction.atomic():
+            # Re-checked under the row lock: two scanners (or a retry under a
+            # new Idempotency-Key) must not both draw stock for one collection
+            if Pickup.objects.select_for_update().get(pk=self.pk).status == 'COMPLETED':
+                raise AlreadyCompleted('This pickup has already been completed.')
+            if self.site_id and self.application.package_id:
+                # Draws on this site's stock row only
+                self.application.package.move_stock(
+                    'ALLOCATION', -1, user=user, reference=self.pickup_code, site=self.site
+                )
+            self.status = 'COMPLETED'
+            self.picked_up_at = timezone.now()
+            self.picked_up_by = user
+            self.save()
+            
+            # Update application status
+            self.application.status = 'PICKED_UP'
+            self.application.save()
     
     @property
     def is_expired(self):
-        # QR codes expire after 7 days or on scheduled date + 1 day
+        return self.expired_after(get_setting('QR_CODE_EXPIRY_DAYS', 7))
+    
+    def expired_after(self, expiry_days):
+        # QR codes expire after QR_CODE_EXPIRY_DAYS (7 by default) or on scheduled date + 1 day
         expiry_date = max(
             self.scheduled_date + timezone.timedelta(days=1),
-            self.created_at.date() + timezone.timedelta(days=7)
+            self.created_at.date() + timezone.timedelta(days=expiry_days)
         )
         return timezone.now().date() > expiry_date
@@ -15,6 +15,23 @@ class PickupSerializer(serializers.ModelSerializer):
         read_only_fields = ['pickup_code', 'qr_code_image', 'picked_up_at']
 
 
+class CalendarEntrySerializer(serializers.ModelSerializer):
+    """A pickup in the schedule's day/slot drill-down, without the full application"""
+    applicant_name = serializers.CharField(source='application.get_full_name', read_only=True)
+    reference_number = serializers.CharField(source='application.reference_number', read_only=True)
+    phone = serializers.CharField(source='application.phone', read_only=True)
+    selected_package = serializers.CharField(source='application.selected_package', read_only=True)
+    package_name = serializers.CharField(source='application.package.name', read_only=True, default=None)
+    site = serializers.CharField(source='site.name', read_only=True, default=None)
+    
+    class Meta:
+        model = Pickup
+        fields = [
+            'id', 'pickup_code', 'scheduled_date', 'scheduled_time', 'status', 'picked_up_at',
+            'applicant_name', 'reference_number', 'phone', 'selected_package', 'package_name', 'site'
+        ]
+
+
 class QRCodeVerificationSerializer(serializers.Serializer):
     pickup_code = serializers.CharField(max_length=50)
     
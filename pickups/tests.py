@@ -1,3 +1,140 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from applications.models import Application
+from core import audit
+from packages.models import Package, SiteStock, StockMovement
+
+from .models import AlreadyCompleted, DistributionSite, Pickup
+from .views import lookup_application
+
+
+class DistributionSiteTests(TestCase):
+    def setUp(self):
+        # Scanner confirmations are audited; write them while the test database exists
+        self.addCleanup(audit.flush)
+        self.package = Package.objects.create(
+            name='Senior', package_type='senior', cash_amount=5000,
+            total_quantity=10, available_quantity=10, items_included={},
+        )
+        self.north = DistributionSite.objects.create(name='North', code='north', is_default=True)
+        self.south = DistributionSite.objects.create(name='South', code='south')
+
+    def schedule(self, phone, site=None):
+        application = Application.objects.create(
+            first_name='Musa', last_name='Adamu', phone=phone, address='5 Dugbe, Ibadan',
+            family_size=2, employment_status='retired', tec_member='no', selected_package='senior',
+            package=self.package, preferred_date=timezone.localdate(), preferred_time='morning',
+            terms_agreement=True, status='APPROVED',
+        )
+        return Pickup.objects.create(
+            application=application, site=site, scheduled_date=application.preferred_date,
+            scheduled_time='morning'
+        )
+
+    def test_stations_only_see_and_confirm_their_own_site(self):
+        at_north = self.schedule('08011111111')
+        at_south = self.schedule('08022222222', site=self.south)
+        self.assertEqual(at_north.site, self.north)
+        self.package.transfer(self.north, 1)
+
+        queue = self.client.get('/api/pickups/today-queue/', HTTP_X_DISTRIBUTION_SITE='north').json()
+        self.assertEqual([pickup['id'] for pickup in queue['pickups']], [at_north.id])
+        response = self.client.post(
+            '/api/pickups/verify/', {'pickup_code': at_south.pickup_code}, HTTP_X_DISTRIBUTION_SITE='north'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/pickups/confirm/', {'pickup_id': at_north.id}, HTTP_X_DISTRIBUTION_SITE='north'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SiteStock.objects.get(site=self.north, package=self.package).available_quantity, 0)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.available_quantity, 9)
+
+        # South never received stock
+        response = self.client.post(
+            '/api/pickups/confirm/', {'pickup_id': at_south.id}, HTTP_X_DISTRIBUTION_SITE='south'
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_a_pickup_is_only_allocated_stock_once(self):
+        pickup = self.schedule('08044444444')
+        self.package.transfer(self.north, 2)
+        # Two confirmations that both read the pickup before either completed it
+        first, second = Pickup.objects.get(pk=pickup.pk), Pickup.objects.get(pk=pickup.pk)
+        first.complete_pickup(None)
+        with self.assertRaises(AlreadyCompleted):
+            second.complete_pickup(None)
+
+        response = self.client.post(
+            '/api/pickups/confirm/', {'pickup_id': pickup.id}, HTTP_X_DISTRIBUTION_SITE='north'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(StockMovement.objects.filter(kind='ALLOCATION', reference=pickup.pickup_code).count(), 1)
+        self.assertEqual(SiteStock.objects.get(site=self.north, package=self.package).available_quantity, 1)
+
+    def test_unsited_draws_leave_site_stock_alone(self):
+        self.package.transfer(self.north, 8)
+        self.assertTrue(self.package.allocate())
+        self.assertTrue(self.package.allocate())
+        # The other eight are at North: an unsited draw may not take them
+        self.assertFalse(self.package.allocate())
+        for _ in range(8):
+            self.assertTrue(self.package.allocate(site=self.north))
+        self.assertFalse(self.package.allocate(site=self.north))
+        # The counters moved with each ledger row, not after commit
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.available_quantity, 0)
+        self.assertEqual(StockMovement.objects.filter(kind='ALLOCATION').count(), 10)
+
+    def test_scanner_lookup_is_one_query(self):
+        pickup = self.schedule('08033333333', site=self.south)
+        staff = User.objects.create_user('scanner', password='x', is_staff=True)
+
+        def lookup(**params):
+            request = APIRequestFactory().get('/api/pickups/lookup/', params)
+            force_authenticate(request, user=staff)
+            return lookup_application(request)
+
+        lookup(phone='08033333333')  # warm the config, round and catalog caches
+        with self.assertNumQueries(1):
+            response = lookup(reference=pickup.application.reference_number)
+        self.assertEqual(response.data['data']['pickup']['pickup_code'], pickup.pickup_code)
+        self.assertEqual(response.data['data']['pickup']['site'], 'South')
+        self.assertEqual(response.data['data']['package_name'], 'Senior')
+
+        with self.assertNumQueries(1):
+            response = lookup(phone='08033333333')
+        self.assertEqual(response.data['data']['reference_number'], pickup.application.reference_number)
+        self.assertEqual(lookup(reference='GCR-NONE').status_code, 404)
+        self.assertEqual(lookup().status_code, 400)
+
+    def test_calendar_counts_in_one_query_and_drills_down(self):
+        for phone in ('08044444444', '08055555555', '08066666666'):
+            self.schedule(phone)
+        Pickup.objects.filter(application__phone='08066666666').update(status='COMPLETED', scheduled_time='afternoon')
+        self.client.force_login(User.objects.create_user('supervisor', password='x', is_staff=True))
+        today = timezone.localdate().isoformat()
+
+        self.client.get('/api/pickups/calendar/')  # warm the config caches
+        with self.assertNumQueries(3):  # session, user and the one GROUP BY
+            calendar = self.client.get(f'/api/pickups/calendar/?from={today}&to={today}').json()['data']
+        day = calendar['days'][0]
+        self.assertEqual(calendar['totals']['total'], 3)
+        self.assertEqual([slot['time'] for slot in day['slots']], ['afternoon', 'morning'])
+        self.assertEqual(day['slots'][1]['by_status'], {'SCHEDULED': 2})
 
-# Create your tests here.
+        with mock.patch.object(PageNumberPagination, 'page_size', 1):
+            page = self.client.get(f'/api/pickups/calendar/{today}/?time=morning').json()
+        self.assertEqual(page['count'], 2)
+        self.assertIsNotNone(page['next'])
+        self.assertEqual(page['results'][0]['applicant_name'], 'Musa Adamu')
+        self.assertEqual(self.client.get('/api/pickups/calendar/?from=2025-02-30').status_code, 400)
@@ -1,13 +1,18 @@
 from django.urls import path
-from . import views
+from core.async_api import pick_view
+from . import async_views, views
 
 urlpatterns = [
     path('list/', views.PickupListView.as_view(), name='pickup_list'),
     path('<int:pk>/', views.PickupDetailView.as_view(), name='pickup_detail'),
     path('verify/', views.verify_qr_code, name='verify_qr_code'),
     path('confirm/', views.confirm_pickup, name='confirm_pickup'),
-    path('today-queue/', views.today_pickup_queue, name='today_pickup_queue'),
+    path('today-queue/', pick_view(views.today_pickup_queue, async_views.today_pickup_queue), name='today_pickup_queue'),
     path('recent/', views.recent_scans, name='recent_scans'),
+    path('lookup/', views.lookup_application, name='lookup_application'),
+    path('calendar/', views.pickup_calendar, name='pickup_calendar'),
+    path('calendar/<str:day>/', views.PickupCalendarDayView.as_view(), name='pickup_calendar_day'),
+    path('sites/', views.distribution_sites, name='distribution_sites'),
     path('<int:pickup_id>/complete/', views.complete_pickup, name='complete_pickup'),
-    path('status/<str:pickup_code>/', views.pickup_status, name='pickup_status'),
+    path('status/<str:pickup_code>/', pick_view(views.pickup_status, async_views.pickup_status), name='pickup_status'),
 ]
\ No newline at end of file
@@ -1,14 +1,101 @@
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count
 from django.utils import timezone
-from .models import Pickup
-from .serializers import PickupSerializer, QRCodeVerificationSerializer
+from django.utils.dateparse import parse_date
+from core import audit, metrics
+from core.throttling import PUBLIC_THROTTLES
+from applications.models import Application, DistributionRound, round_filter
+from applications.views import requested_round
+from packages.models import InsufficientStock, package_contents_display
+from .models import AlreadyCompleted, DistributionSite, Pickup
+from .serializers import CalendarEntrySerializer, PickupSerializer, QRCodeVerificationSerializer
+
+# Fields whose before/after values go into the pickup audit entry
+COMPLETION_FIELDS = ['status', 'picked_up_at', 'picked_up_by', 'notes']
+
+# Longest range /calendar/ aggregates in one request
+CALENDAR_MAX_DAYS = 93
+
+
+def station_site_code(request):
+    """The scanner station's distribution site code, '' for an unscoped station"""
+    return (request.headers.get('X-Distribution-Site') or request.GET.get('site') or '').strip()
+
+
+def wrong_site_response(pickup):
+    return Response({
+        'success': False,
+        'message': f'This pickup is scheduled at {pickup.site.name}, not this site.'
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def at_station(pickup, site_code):
+    """Pickups not assigned to a site (made before sites existed) are valid anywhere"""
+    return not site_code or pickup.site_id is None or pickup.site.code == site_code
+
+
+def package_display_name(application):
+    if application.package:
+        return application.package.name
+    package_names = {
+        'small_basic': 'Small Family Basic',
+        'medium_basic': 'Medium Family Basic', 
+        'large_basic': 'Large Family Basic',
+        'emergency': 'Emergency Relief',
+        'senior': 'Senior Citizen Special'
+    }
+    return package_names.get(application.selected_package, application.selected_package)
+
+
+def package_contents(application):
+    if application.package:
+        return package_contents_display(application.package)
+    # Fallback for applications not yet linked to a package
+    fallback = {
+        'small_basic': '5kg Rice, 2kg Beans, 1L Vegetable Oil, 1kg Salt, ₦5,000 Cash',
+        'medium_basic': '10kg Rice, 5kg Beans, 2L Vegetable Oil, 1kg Salt, 1kg Sugar, ₦8,000 Cash',
+        'large_basic': '25kg Rice, 10kg Beans, 3L Vegetable Oil, 2kg Salt, 2kg Sugar, ₦15,000 Cash',
+        'emergency': 'Emergency Relief Package + ₦10,000 Cash',
+        'senior': 'Senior Citizen Special Package + ₦6,000 Cash'
+    }
+    return fallback.get(application.selected_package, 'Package contents not specified')
+
+
+def time_display(time_slot):
+    time_slots = {
+        'morning': '9:00 AM - 12:00 PM',
+        'afternoon': '1:00 PM - 4:00 PM', 
+        'evening': '4:00 PM - 6:00 PM'
+    }
+    return time_slots.get(time_slot, time_slot)
+
+
+def scan_data(pickup):
+    """What the scanner shows for a pickup; needs application__package and site loaded"""
+    return {
+        'pickup_id': pickup.id,
+        'pickup_code': pickup.pickup_code,
+        'applicant_name': pickup.application.get_full_name(),
+        'phone': pickup.application.phone,
+        'reference_number': pickup.application.reference_number,
+        'package_name': package_display_name(pickup.application),
+        'package_contents': package_contents(pickup.application),
+        'scheduled_date': pickup.scheduled_date.strftime('%Y-%m-%d'),
+        'scheduled_time': time_display(pickup.scheduled_time),
+        'expiry_date': (pickup.scheduled_date + timezone.timedelta(days=7)).strftime('%Y-%m-%d'),
+        'status': pickup.status,
+        'is_expired': pickup.is_expired,
+        'site': pickup.site.name if pickup.site else None
+    }
 
 
 class PickupListView(generics.ListAPIView):
     """List all pickups - for supervisors"""
-    queryset = Pickup.objects.all()
+    queryset = Pickup.objects.select_related('application__package')
     serializer_class = PickupSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -17,7 +104,7 @@ class PickupListView(generics.ListAPIView):
         if not self.request.user.is_staff:
             return Pickup.objects.none()
             
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().filter(**requested_round(self.request))
         status_filter = self.request.query_params.get('status', None)
         date_filter = self.request.query_params.get('date', None)
         
@@ -25,13 +112,15 @@ class PickupListView(generics.ListAPIView):
             queryset = queryset.filter(status=status_filter)
         if date_filter:
             queryset = queryset.filter(scheduled_date=date_filter)
+        if self.request.query_params.get('site'):
+            queryset = queryset.filter(site__code=self.request.query_params['site'])
             
         return queryset.order_by('scheduled_date', 'scheduled_time')
 
 
 class PickupDetailView(generics.RetrieveAPIView):
     """Get single pickup details - for supervisors"""
-    queryset = Pickup.objects.all()
+    queryset = Pickup.objects.select_related('application__package')
     serializer_class = PickupSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -42,8 +131,113 @@ class PickupDetailView(generics.RetrieveAPIView):
         return super().get_queryset()
 
 
+def parse_calendar_day(value):
+    """A YYYY-MM-DD date, or None"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def status_counts(rows):
+    """{'total': n, 'by_status': {...}} from (status, count) rows; cancelled pickups are not counted in total"""
+    by_status = {}
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['count']
+    total = sum(count for pickup_status, count in by_status.items() if pickup_status != 'CANCELLED')
+    return {'total': total, 'by_status': by_status}
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def pickup_calendar(request):
+    """Pickup counts per day and time slot by status, aggregated in the database"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    # Defaults to the current week, Monday to Sunday
+    today = timezone.localdate()
+    week_start = today - timezone.timedelta(days=today.weekday())
+    start = parse_calendar_day(request.query_params.get('from') or week_start.isoformat())
+    end = start and parse_calendar_day(
+        request.query_params.get('to') or (start + timezone.timedelta(days=6)).isoformat()
+    )
+    if start is None or end is None:
+        return Response({
+            'success': False,
+            'message': "'from' and 'to' must be dates (YYYY-MM-DD)."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if end < start or (end - start).days >= CALENDAR_MAX_DAYS:
+        return Response({
+            'success': False,
+            'message': f"'to' must be on or after 'from' and at most {CALENDAR_MAX_DAYS} days later."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    pickups = Pickup.objects.filter(scheduled_date__range=(start, end))
+    if request.query_params.get('site'):
+        pickups = pickups.filter(site__code=request.query_params['site'])
+    # One GROUP BY over the (scheduled_date, scheduled_time) index
+    rows = list(
+        pickups.values('scheduled_date', 'scheduled_time', 'status')
+        .annotate(count=Count('id')).order_by('scheduled_date', 'scheduled_time', 'status')
+    )
+    
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row['scheduled_date'], {}).setdefault(row['scheduled_time'], []).append(row)
+    days = []
+    for offset in range((end - start).days + 1):
+        day = start + timezone.timedelta(days=offset)
+        slots = by_day.get(day, {})
+        days.append({
+            'date': day,
+            **status_counts(row for slot_rows in slots.values() for row in slot_rows),
+            'slots': [
+                {'time': time_slot, 'display': time_display(time_slot), **status_counts(slot_rows)}
+                for time_slot, slot_rows in slots.items()
+            ]
+        })
+    
+    return Response({
+        'success': True,
+        'data': {
+            'from': start,
+            'to': end,
+            'totals': status_counts(rows),
+            'days': days
+        }
+    })
+
+
+class PickupCalendarDayView(generics.ListAPIView):
+    """Paginated pickups of one calendar day, optionally one ?time= slot - for supervisors"""
+    serializer_class = CalendarEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        # Only allow staff users to access this endpoint
+        if not self.request.user.is_staff:
+            return Pickup.objects.none()
+        
+        day = parse_calendar_day(self.kwargs['day'])
+        if day is None:
+            raise ValidationError({'day': 'Must be a date (YYYY-MM-DD).'})
+        queryset = Pickup.objects.select_related('application__package', 'site').filter(scheduled_date=day)
+        if self.request.query_params.get('time'):
+            queryset = queryset.filter(scheduled_time=self.request.query_params['time'])
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        if self.request.query_params.get('site'):
+            queryset = queryset.filter(site__code=self.request.query_params['site'])
+        return queryset.order_by('scheduled_time', 'id')
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(PUBLIC_THROTTLES)
 def verify_qr_code(request):
     """Verify QR code for pickup - used by scanner"""
     pickup_code = request.data.get('pickup_code', '').strip()
@@ -55,113 +249,44 @@ def verify_qr_code(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        pickup = Pickup.objects.select_related('application').get(pickup_code=pickup_code)
+        pickup = Pickup.objects.select_related('application__package', 'site').get(pickup_code=pickup_code)
+        
+        if not at_station(pickup, station_site_code(request)):
+            metrics.SCANS.labels(outcome='wrong_site').inc()
+            return wrong_site_response(pickup)
         
         # Check if pickup is valid
         if pickup.status == 'COMPLETED':
+            metrics.SCANS.labels(outcome='already_collected').inc()
             return Response({
                 'success': False,
                 'message': 'This package has already been collected.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         if pickup.status == 'CANCELLED':
+            metrics.SCANS.labels(outcome='cancelled').inc()
             return Response({
                 'success': False,
                 'message': 'This pickup has been cancelled.'
             }, status=status.HTTP_400_BAD_REQUEST)
             
         if pickup.is_expired:
+            metrics.SCANS.labels(outcome='expired').inc()
             return Response({
                 'success': False,
                 'message': f'This QR code has expired. Valid until {pickup.scheduled_date + timezone.timedelta(days=1)}.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get package details
-        def get_package_name(package_type):
-            package_names = {
-                'small_basic': 'Small Family Basic',
-                'medium_basic': 'Medium Family Basic', 
-                'large_basic': 'Large Family Basic',
-                'emergency': 'Emergency Relief',
-                'senior': 'Senior Citizen Special'
-            }
-            return package_names.get(package_type, package_type)
-        
-        def get_package_contents(package_type):
-            # Get real package contents from packages app
-            try:
-                from packages.models import Package
-                package = Package.objects.filter(package_type=package_type, is_active=True).first()
-                if package:
-                    contents = []
-                    
-                    # Add items from items_included JSON field if available
-                    if hasattr(package, 'items_included') and package.items_included:
-                        if isinstance(package.items_included, list):
-                            contents.extend(package.items_included)
-                        elif isinstance(package.items_included, dict):
-                            # Handle dictionary format like {'rice': '3 Congo of Rice'}
-                            for key, value in package.items_included.items():
-                                contents.append(value)
-                    
-                    # Add items from related PackageItem model if available  
-                    if hasattr(package, 'package_items'):
-                        package_items = package.package_items.all()
-                        for item in package_items:
-                            contents.append(f"{item.quantity} {item.item_name}")
-                    
-                    # Add cash amount if specified
-                    if package.cash_amount and package.cash_amount > 0:
-                        contents.append(f"₦{package.cash_amount:,} Cash")
-                    
-                    if contents:
-                        return ', '.join(contents)
-                    elif package.description:
-                        return package.description
-                        
-            except ImportError:
-                pass
-            except Exception as e:
-                print(f"Error fetching package contents: {e}")
-            
-            # Fallback to hardcoded values if package not found
-            package_contents = {
-                'small_basic': '5kg Rice, 2kg Beans, 1L Vegetable Oil, 1kg Salt, ₦5,000 Cash',
-                'medium_basic': '10kg Rice, 5kg Beans, 2L Vegetable Oil, 1kg Salt, 1kg Sugar, ₦8,000 Cash',
-                'large_basic': '25kg Rice, 10kg Beans, 3L Vegetable Oil, 2kg Salt, 2kg Sugar, ₦15,000 Cash',
-                'emergency': 'Emergency Relief Package + ₦10,000 Cash',
-                'senior': 'Senior Citizen Special Package + ₦6,000 Cash'
-            }
-            return package_contents.get(package_type, 'Package contents not specified')
-        
-        def get_time_display(time_slot):
-            time_slots = {
-                'morning': '9:00 AM - 12:00 PM',
-                'afternoon': '1:00 PM - 4:00 PM', 
-                'evening': '4:00 PM - 6:00 PM'
-            }
-            return time_slots.get(time_slot, time_slot)
+        metrics.SCANS.labels(outcome='valid').inc()
         
         # Return pickup details for verification
         return Response({
             'success': True,
-            'data': {
-                'pickup_id': pickup.id,
-                'pickup_code': pickup.pickup_code,
-                'applicant_name': pickup.application.get_full_name(),
-                'phone': pickup.application.phone,
-                'reference_number': pickup.application.reference_number,
-                'package_name': get_package_name(pickup.application.selected_package),
-                'package_contents': get_package_contents(pickup.application.selected_package),
-                'scheduled_date': pickup.scheduled_date.strftime('%Y-%m-%d'),
-                'scheduled_time': get_time_display(pickup.scheduled_time),
-                'expiry_date': (pickup.scheduled_date + timezone.timedelta(days=7)).strftime('%Y-%m-%d'),
-                'status': pickup.status,
-                'is_expired': pickup.is_expired
-            }
+            'data': scan_data(pickup)
         })
         
     except Pickup.DoesNotExist:
+        metrics.SCANS.labels(outcome='not_found').inc()
         return Response({
             'success': False,
             'message': 'Invalid pickup code. Please check the code and try again.'
@@ -173,7 +298,7 @@ def verify_qr_code(request):
 def complete_pickup(request, pickup_id):
     """Mark pickup as completed"""
     try:
-        pickup = Pickup.objects.get(id=pickup_id)
+        pickup = Pickup.objects.select_related('application__package', 'site').get(id=pickup_id)
         
         if pickup.status == 'COMPLETED':
             return Response({
@@ -188,9 +313,23 @@ def complete_pickup(request, pickup_id):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Mark as completed
-        pickup.complete_pickup(request.user)
+        before = audit.snapshot(pickup, COMPLETION_FIELDS)
+        try:
+            pickup.complete_pickup(request.user)
+        except AlreadyCompleted:
+            return Response({
+                'success': False,
+                'message': 'This pickup has already been completed.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as error:
+            return Response({
+                'success': False,
+                'message': f'{error} Transfer stock to this site first.'
+            }, status=status.HTTP_409_CONFLICT)
         pickup.notes = request.data.get('notes', '')
         pickup.save()
+        audit.record(request, 'PICKUP', pickup, audit.diff(before, pickup))
+        metrics.CONFIRMATIONS.inc()
         
         return Response({
             'success': True,
@@ -212,6 +351,7 @@ def complete_pickup(request, pickup_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(PUBLIC_THROTTLES)
 def confirm_pickup(request):
     """Confirm/complete a pickup - used by scanner"""
     pickup_id = request.data.get('pickup_id')
@@ -224,7 +364,10 @@ def confirm_pickup(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        pickup = Pickup.objects.select_related('application').get(id=pickup_id)
+        pickup = Pickup.objects.select_related('application__package', 'site').get(id=pickup_id)
+        
+        if not at_station(pickup, station_site_code(request)):
+            return wrong_site_response(pickup)
         
         if pickup.status == 'COMPLETED':
             return Response({
@@ -239,9 +382,23 @@ def confirm_pickup(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Complete the pickup
-        pickup.complete_pickup(request.user)
+        before = audit.snapshot(pickup, COMPLETION_FIELDS)
+        try:
+            pickup.complete_pickup(request.user)
+        except AlreadyCompleted:
+            return Response({
+                'success': False,
+                'message': 'This package has already been collected.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as error:
+            return Response({
+                'success': False,
+                'message': f'{error} Transfer stock to this site first.'
+            }, status=status.HTTP_409_CONFLICT)
         pickup.notes = notes
         pickup.save()
+        audit.record(request, 'PICKUP', pickup, audit.diff(before, pickup), via='scanner')
+        metrics.CONFIRMATIONS.inc()
         
         return Response({
             'success': True,
@@ -250,7 +407,10 @@ def confirm_pickup(request):
                 'pickup_code': pickup.pickup_code,
                 'applicant_name': pickup.application.get_full_name(),
                 'completed_at': pickup.picked_up_at.isoformat() if pickup.picked_up_at else None,
-                'completed_by': request.user.get_full_name() or request.user.username
+                'completed_by': (
+                    pickup.picked_up_by.get_full_name() or pickup.picked_up_by.username
+                    if pickup.picked_up_by else 'Scanner station'
+                )
             }
         })
         
@@ -261,28 +421,35 @@ def confirm_pickup(request):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
-@api_view(['GET'])
+def todays_queue(request):
+    """Today's open pickups, at the station's site if it has one"""
+    pickups = Pickup.objects.select_related('application').filter(
+        scheduled_date=timezone.now().date(),
+        status__in=['SCHEDULED', 'CONFIRMED']
+    )
+    site_code = station_site_code(request)
+    if site_code:
+        pickups = pickups.filter(site__code=site_code)
+    return pickups.order_by('scheduled_time')
+
+
+def queue_entry(pickup):
+    return {
+        'id': pickup.id,
+        'applicant_name': pickup.application.get_full_name(),
+        'reference_number': pickup.application.reference_number,
+        'pickup_code': pickup.pickup_code,
+        'scheduled_time': pickup.scheduled_time,
+        'status': pickup.status,
+        'package_type': pickup.application.selected_package
+    }
+
+
+@api_view(['GET', 'HEAD'])
 @permission_classes([permissions.AllowAny])
 def today_pickup_queue(request):
     """Get today's pickup queue for sidebar display"""
-    today = timezone.now().date()
-    
-    pickups = Pickup.objects.select_related('application').filter(
-        scheduled_date=today,
-        status__in=['SCHEDULED', 'CONFIRMED']
-    ).order_by('scheduled_time')
-    
-    pickup_data = []
-    for pickup in pickups:
-        pickup_data.append({
-            'id': pickup.id,
-            'applicant_name': pickup.application.get_full_name(),
-            'reference_number': pickup.application.reference_number,
-            'pickup_code': pickup.pickup_code,
-            'scheduled_time': pickup.scheduled_time,
-            'status': pickup.status,
-            'package_type': pickup.application.selected_package
-        })
+    pickup_data = [queue_entry(pickup) for pickup in todays_queue(request)]
     
     return Response({
         'success': True,
@@ -297,9 +464,13 @@ def recent_scans(request):
     """Get recent pickup scans for scanner page"""
     limit = int(request.GET.get('limit', 10))
     
-    recent_pickups = Pickup.objects.select_related('application').filter(
-        status='COMPLETED'
-    ).order_by('-picked_up_at')[:limit]
+    recent_pickups = Pickup.objects.select_related('application', 'picked_up_by').filter(
+        status='COMPLETED', **round_filter(DistributionRound.current())
+    )
+    site_code = station_site_code(request)
+    if site_code:
+        recent_pickups = recent_pickups.filter(site__code=site_code)
+    recent_pickups = recent_pickups.order_by('-picked_up_at')[:limit]
     
     scan_data = []
     for pickup in recent_pickups:
@@ -322,27 +493,104 @@ def recent_scans(request):
 
 
 @api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def lookup_application(request):
+    """Application, pickup and package contents by ?reference= or ?phone= - for the scanner's manual entry"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    reference_number = request.query_params.get('reference', '').strip()
+    phone_number = request.query_params.get('phone', '').strip()
+    if not reference_number and not phone_number:
+        return Response({
+            'success': False,
+            'message': 'Either reference or phone is required.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # One query on an indexed column, joining everything the scanner shows
+    applications = Application.objects.select_related('package', 'pickup__site')
+    if reference_number:
+        application = applications.filter(reference_number=reference_number).first()
+    else:
+        # Most recent in the current round, via application_round_phone_idx
+        application = applications.filter(
+            phone=phone_number, **round_filter(DistributionRound.current())
+        ).order_by('-created_at').first()
+    
+    if application is None:
+        return Response({
+            'success': False,
+            'message': 'No application found for this reference number.' if reference_number
+            else 'No application found for this phone number in the current round.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        pickup = application.pickup
+    except ObjectDoesNotExist:
+        pickup = None
+    
+    return Response({
+        'success': True,
+        'data': {
+            'application_id': application.id,
+            'reference_number': application.reference_number,
+            'applicant_name': application.get_full_name(),
+            'phone': application.phone,
+            'address': application.address,
+            'family_size': application.family_size,
+            'status': application.status,
+            'preferred_date': application.preferred_date,
+            'preferred_time': time_display(application.preferred_time),
+            'package_name': package_display_name(application),
+            'package_contents': package_contents(application),
+            'pickup': scan_data(pickup) if pickup else None
+        }
+    })
+
+
+def pickup_status_body(pickup, is_expired):
+    return {
+        'success': True,
+        'pickup': {
+            'pickup_code': pickup.pickup_code,
+            'status': pickup.status,
+            'scheduled_date': pickup.scheduled_date,
+            'scheduled_time': pickup.scheduled_time,
+            'is_expired': is_expired,
+            'applicant_name': pickup.application.get_full_name(),
+            'selected_package': pickup.application.selected_package
+        }
+    }
+
+
+PICKUP_NOT_FOUND = {
+    'success': False,
+    'message': 'Pickup not found.'
+}
+
+
+@api_view(['GET', 'HEAD'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(PUBLIC_THROTTLES)
 def pickup_status(request, pickup_code):
     """Check pickup status by code - for applicants"""
     try:
-        pickup = Pickup.objects.get(pickup_code=pickup_code)
-        
-        return Response({
-            'success': True,
-            'pickup': {
-                'pickup_code': pickup.pickup_code,
-                'status': pickup.status,
-                'scheduled_date': pickup.scheduled_date,
-                'scheduled_time': pickup.scheduled_time,
-                'is_expired': pickup.is_expired,
-                'applicant_name': pickup.application.get_full_name(),
-                'selected_package': pickup.application.selected_package
-            }
-        })
+        pickup = Pickup.objects.select_related('application').get(pickup_code=pickup_code)
+        return Response(pickup_status_body(pickup, pickup.is_expired))
         
     except Pickup.DoesNotExist:
-        return Response({
-            'success': False,
-            'message': 'Pickup not found.'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response(PICKUP_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def distribution_sites(request):
+    """Active distribution sites, for configuring scanner stations"""
+    sites = DistributionSite.objects.filter(is_active=True).values('code', 'name', 'address', 'is_default')
+    return Response({
+        'success': True,
+        'sites': list(sites)
+    })
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reliefproj.settings')
+# Serve the public read endpoints from their async views (see core.async_api)
+os.environ.setdefault('ASYNC_PUBLIC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,6 +56,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.HTMLGZipMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,10 +66,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.IdempotencyMiddleware',
+    'core.middleware.LoadSheddingMiddleware',
+    'core.middleware.SlowQueryMiddleware',
 ]
 
 ROOT_URLCONF = 'reliefproj.urls'
 
+# Route the public read endpoints to their async views; asgi.py turns this
+# on, WSGI servers keep the sync views (see core.async_api)
+ASYNC_PUBLIC_VIEWS = config('ASYNC_PUBLIC_VIEWS', default=False, cast=bool)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -100,6 +110,28 @@ DATABASES = {
     }
 }
 
+# Read replicas (see core.db_router): DB_REPLICAS lists each replica's host,
+# or its database file on SQLite; they share the primary's other settings
+for number, location in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST': location,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    # Read-only views whose reads may go to a replica
+    'URL_NAMES': [
+        'application_list', 'demographics_report', 'check_application_status', 'pickup_list',
+        'pickup_status', 'available_packages', 'stock_forecast',
+    ],
+    # How long a client stays on the primary after writing; keep above the worst replica lag
+    'STICKY_SECONDS': config('REPLICA_STICKY_SECONDS', default=5, cast=int),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,6 +191,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app; X-Forwarded-For is trusted only this far
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
@@ -188,6 +222,14 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
 # Cache Configuration
+# Throttle buckets, page cache and config version stamps all live here, so
+# give the per-process fallback more room than LocMemCache's default 300
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
 # CACHES = {
 #     'default': {
 #         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -201,7 +243,158 @@ RELIEF_APP_CONFIG = {
     'QR_CODE_EXPIRY_DAYS': config('QR_CODE_EXPIRY_DAYS', default=7, cast=int),
     'LOW_STOCK_THRESHOLD': config('LOW_STOCK_THRESHOLD', default=10, cast=int),
     'PICKUP_REMINDER_HOURS': [24, 2],   # Reminder hours before pickup
-    'AUTO_APPROVE_EMERGENCY': False,     # Auto-approve emergency applications
+    # Auto-approve emergency applications meeting PRIORITY_SCORING's AUTO_APPROVE_* criteria
+    'AUTO_APPROVE_EMERGENCY': config('AUTO_APPROVE_EMERGENCY', default=False, cast=bool),
+    # Accept submissions into the write-behind queue (see applications.submission_queue)
+    'ASYNC_SUBMISSIONS': config('ASYNC_SUBMISSIONS', default=False, cast=bool),
+    # Values above can be overridden at runtime via ConfigurationSettings.
+    # Workers re-check the shared version stamp this often (seconds)...
+    'CONFIG_CACHE_CHECK_SECONDS': config('CONFIG_CACHE_CHECK_SECONDS', default=5, cast=int),
+    # ...and reload unconditionally after this long, bounding staleness
+    'CONFIG_CACHE_MAX_AGE_SECONDS': config('CONFIG_CACHE_MAX_AGE_SECONDS', default=300, cast=int),
+}
+
+# Token-bucket throttles for the public endpoints, keyed by URL name.
+# rate is the sustained rate, burst the bucket size, counted atomically in the
+# cache per burst/rate-second window (see core.throttling)
+THROTTLE_BUCKETS = {
+    'submit_application': {
+        'ip': {'rate': '30/hour', 'burst': 10},
+        'phone': {'rate': '5/hour', 'burst': 3},
+    },
+    'check_application_status': {
+        'ip': {'rate': '60/min', 'burst': 20},
+        'phone': {'rate': '10/min', 'burst': 5},
+    },
+    'verify_qr_code': {
+        'ip': {'rate': '120/min', 'burst': 30},
+    },
+    'confirm_pickup': {
+        'ip': {'rate': '60/min', 'burst': 20},
+    },
+    'pickup_status': {
+        'ip': {'rate': '30/min', 'burst': 10},
+    },
+}
+
+# Load tests only: key the per-IP buckets on this request header instead,
+# so one machine can stand in for many clients. Anyone can send a header,
+# so leave it empty anywhere real traffic arrives
+THROTTLE_CLIENT_HEADER = config('THROTTLE_CLIENT_HEADER', default='')
+
+# Per-worker concurrency limit for the public endpoints (see core.middleware)
+LOAD_SHEDDING = {
+    'URL_NAMES': list(THROTTLE_BUCKETS),
+    'MAX_CONCURRENCY': config('LOAD_SHEDDING_MAX_CONCURRENCY', default=16, cast=int),
+    'DEGRADED_CONCURRENCY': config('LOAD_SHEDDING_DEGRADED_CONCURRENCY', default=4, cast=int),
+    'DB_LATENCY_THRESHOLD_MS': config('LOAD_SHEDDING_DB_LATENCY_MS', default=200, cast=int),
+    'RETRY_AFTER_SECONDS': 5,
+}
+
+# Idempotency-Key replay for the mutating API endpoints (see core.idempotency)
+IDEMPOTENCY = {
+    'ENABLED': config('IDEMPOTENCY_ENABLED', default=True, cast=bool),
+    'TTL_SECONDS': config('IDEMPOTENCY_TTL_SECONDS', default=24 * 3600, cast=int),  # How long first responses are replayed
+    'LOCK_SECONDS': 60,      # A first request still running after this long is treated as abandoned
+}
+
+# Micro-benchmarks of the hot functions, run by `manage.py benchmark` (see core.benchmarks)
+BENCHMARKS = {
+    'SIZES': [100, 1000, 5000],   # Generated applications each benchmark runs against
+    'TOLERANCE': config('BENCHMARK_TOLERANCE', default=0.25, cast=float),  # Allowed slowdown per item
+    'BASELINE': config('BENCHMARK_BASELINE', default=str(BASE_DIR / 'benchmarks' / 'baseline.json')),
+}
+
+# Write-behind submission queue, drained by `manage.py drain_submissions`
+SUBMISSION_QUEUE = {
+    'BATCH_SIZE': 500,           # Queued submissions inserted per drain transaction
+    'REFERENCE_ATTEMPTS': 20,    # Reference numbers tried before answering 503
+}
+
+# Slow-query log with sampled EXPLAIN plans (see core.slow_queries)
+SLOW_QUERY_LOG = {
+    'ENABLED': config('SLOW_QUERY_LOG_ENABLED', default=True, cast=bool),
+    'THRESHOLD_MS': config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=int),
+    'EXPLAIN_SAMPLES': 3,        # Plans captured for the first N occurrences of each query shape
+    'EXPLAIN_ANALYZE': config('SLOW_QUERY_EXPLAIN_ANALYZE', default=False, cast=bool),
+    'BUFFER_SIZE': 500,          # Newest entries kept in the SlowQuery table
+}
+
+# Buffered audit trail writer (see core.audit)
+AUDIT_LOG = {
+    'MAX_ENTRIES': config('AUDIT_LOG_MAX_ENTRIES', default=100, cast=int),          # Flush when this many are buffered
+    'MAX_AGE_SECONDS': config('AUDIT_LOG_MAX_AGE_SECONDS', default=2.0, cast=float),  # ... or the oldest is this old
+}
+
+# Monthly partitions for the append-only tables (see core.partitioning)
+PARTITIONING = {
+    'MODELS': {
+        'core.AuditLog': {'RETENTION_MONTHS': config('AUDIT_LOG_RETENTION_MONTHS', default=24, cast=int)},
+        'notifications.Notification': {'RETENTION_MONTHS': config('NOTIFICATION_RETENTION_MONTHS', default=12, cast=int)},
+    },
+    'MONTHS_AHEAD': 3,           # Partitions created ahead of time on PostgreSQL
+    'ARCHIVE_DIR': config('PARTITION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive')),
+}
+
+# Duplicate-household detection (see applications.dedup)
+HOUSEHOLD_DEDUP = {
+    'THRESHOLD': 0.75,           # Match score needed to put two applications in one cluster
+    'MAX_BLOCK_SIZE': 500,       # Blocking keys shared by more applications are skipped
+    'CHUNK_SIZE': 1000,          # New applications keyed and scored per transaction
+}
+
+# Need-priority score for the review queue (see applications.priority).
+# After changing weights run `manage.py rescore_applications`.
+PRIORITY_SCORING = {
+    'WEIGHTS': {
+        'per_member': 2,             # Per household member, up to MAX_COUNTED_MEMBERS
+        'per_child': 3,
+        'per_elderly': 4,
+        'special_needs': 10,         # Any special needs given
+        'emergency_package': 15,
+        'unemployed': 8,
+    },
+    'MAX_COUNTED_MEMBERS': 10,
+    'AUTO_APPROVE_PACKAGES': ['emergency'],
+    'AUTO_APPROVE_MIN_SCORE': config('AUTO_APPROVE_MIN_SCORE', default=40, cast=int),
+}
+
+# Stock-out forecasting (see packages.forecast)
+PACKAGE_FORECAST = {
+    'METHOD': 'smoothing',           # 'smoothing' (exponential) or 'rolling' (window mean)
+    'HISTORY_DAYS': 90,              # Days of approvals the forecast starts from
+    'SMOOTHING_ALPHA': 0.3,          # Weight of the most recent day
+    'ROLLING_WINDOW_DAYS': 14,
+    'LEAD_TIME_DAYS': 7,             # Days between ordering and stock arriving
+    'COVER_DAYS': 28,                # Demand a restock should cover after it arrives
+}
+
+# Closing a distribution round moves its rows to *_archive tables in
+# batches of this many applications (see applications.rounds)
+DISTRIBUTION_ROUNDS = {
+    'ARCHIVE_BATCH_SIZE': config('ROUND_ARCHIVE_BATCH_SIZE', default=1000, cast=int),
+    'VERSION_CHECK_SECONDS': 5,   # How stale a worker's cached current round may be
+}
+
+# Anonymous full-page cache for home/packages/apply (see core.page_cache)
+PAGE_CACHE = {
+    'TIMEOUT': config('PAGE_CACHE_TIMEOUT', default=600, cast=int),
+    'LOCK_TIMEOUT': 10,   # Max seconds one worker may spend re-rendering
+    'WAIT_SECONDS': 2,    # How long others wait when no previous copy exists
+    'VERSION_CHECK_SECONDS': 5,   # Workers re-read the catalog version this often
+}
+
+# Fingerprinted, minified and precompressed static files plus per-page
+# script bundles, built by `manage.py build_assets` (see core.assets)
+ASSETS = {
+    'ENABLED': config('ASSETS_ENABLED', default=True, cast=bool),
+    'URL': '/assets/',
+    'SOURCE_DIR': BASE_DIR / 'static',
+    'SOURCE_PATTERNS': ['css/*.css', 'js/*.js', 'images/*'],
+    'OUTPUT_DIR': config('ASSETS_OUTPUT_DIR', default=str(BASE_DIR / 'static_dist')),
+    'IMAGE_MAX_WIDTH': 1920,   # Wider images are scaled down
+    'JPEG_QUALITY': 80,
+    'MAX_AGE': 365 * 24 * 3600,
 }
 
 # Contact Information
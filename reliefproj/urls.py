@@ -63,6 +63,16 @@ class SupervisorReportsView(StaffRequiredMixin, TemplateView):
 class SupervisorNotificationsView(StaffRequiredMixin, TemplateView):
     template_name = 'supervisor/notifications.html'
 
+class SupervisorSlowQueriesView(StaffRequiredMixin, TemplateView):
+    template_name = 'supervisor/slow_queries.html'
+    
+    def get_context_data(self, **kwargs):
+        from core.slow_queries import get_options, top_offenders
+        context = super().get_context_data(**kwargs)
+        context['offenders'] = top_offenders(limit=50)
+        context['threshold_ms'] = get_options()['THRESHOLD_MS']
+        return context
+
 # Custom staff login view
 class StaffLoginView(LoginView):
     template_name = 'auth/staff_login.html'
@@ -115,6 +125,12 @@ urlpatterns = [
     path('status/', views.status, name='status'),
     path('pickup/', views.pickup, name='pickup'),
     
+    # Fingerprinted, precompressed static files from build_assets
+    path(settings.ASSETS['URL'].strip('/') + '/<path:path>', views.serve_asset, name='serve_asset'),
+    
+    # Prometheus scrape endpoint (staff only)
+    path('metrics', views.metrics, name='metrics'),
+    
     # Supervisor routes
     path('supervisor/', SupervisorDashboardView.as_view(), name='supervisor_dashboard'),
     path('supervisor/applications/', SupervisorApplicationsView.as_view(), name='supervisor_applications'),
@@ -123,6 +139,7 @@ urlpatterns = [
     path('supervisor/scanner/', SupervisorScannerView.as_view(), name='supervisor_scanner'),
     path('supervisor/reports/', SupervisorReportsView.as_view(), name='supervisor_reports'),
     path('supervisor/notifications/', SupervisorNotificationsView.as_view(), name='supervisor_notifications'),
+    path('supervisor/slow-queries/', SupervisorSlowQueriesView.as_view(), name='supervisor_slow_queries'),
 ]
 
 if settings.DEBUG:
@@ -392,11 +392,39 @@ function validateEmail(email) {
     return emailRegex.test(email);
 }
 
+// Writes that may be retried: a request that got no response (network
+// error) is resent with the same Idempotency-Key, so the server answers with
+// the first attempt's response instead of applying it twice
+const pendingIdempotencyKeys = {};
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+async function idempotentFetch(url, options = {}) {
+    const request = `${options.method || 'POST'} ${url} ${options.body || ''}`;
+    pendingIdempotencyKeys[request] = pendingIdempotencyKeys[request] || newIdempotencyKey();
+    const response = await fetch(url, {
+        ...options,
+        headers: { ...(options.headers || {}), 'Idempotency-Key': pendingIdempotencyKeys[request] }
+    });
+    // Answered: doing it again is a new request. A 409 means the first attempt
+    // is still running, so a retry must keep its key
+    if (response.status !== 409) {
+        delete pendingIdempotencyKeys[request];
+    }
+    return response;
+}
+
 // Export for use in other scripts
 window.CommunityRelief = {
     MultiStepForm,
     PackageFilter,
     StatusCheckerOld,  // Renamed to avoid conflicts
     validatePhone,
-    validateEmail
+    validateEmail,
+    idempotentFetch
 };
\ No newline at end of file
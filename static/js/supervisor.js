@@ -410,15 +410,19 @@ class PackageManager {
         `;
     }
     
-    async updateStock(packageId, newQuantity) {
+    async updateStock(packageId, newQuantity, currentQuantity, reason, notes) {
         try {
-            const response = await fetch(`/api/packages/${packageId}/restock/`, {
+            // Restocks add the difference; anything else records the new count as an adjustment
+            const restock = reason === 'restock' && newQuantity > currentQuantity;
+            const response = await fetch(`/api/packages/${packageId}/${restock ? 'restock' : 'adjust'}/`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': this.getCSRFToken()
                 },
-                body: JSON.stringify({ quantity: newQuantity })
+                body: JSON.stringify(restock
+                    ? { quantity: newQuantity - currentQuantity, notes: notes }
+                    : { counted_quantity: newQuantity, reason: notes ? `${reason}: ${notes}` : reason })
             });
             
             const result = await response.json();